@@ -8,6 +8,7 @@
 # - TouristFlowPredictor
 # - IncidentPredictor
 
+import json
 from datetime import datetime
 import numpy as np
 import pandas as pd
@@ -15,6 +16,10 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 from .config import settings
+from .services.streaming_analytics import StreamingAnalytics
+from .services.efir_ids import SnowflakeIdGenerator
+from .services.tourist_store import parse_location_id
+import shapely
 from shapely.geometry import Point, Polygon
 
 # Computer Vision imports
@@ -163,7 +168,15 @@ class MultilingualEmergencyProcessor:
     return info
 
 class AutomatedEFIRGenerator:
-  def __init__(self):
+  def __init__(self, id_generator=None, efir_log=None, efir_repository=None, search_index=None):
+    # Complaint numbers are snowflake ids, unique across workers even within the same millisecond
+    self.id_generator = id_generator if id_generator is not None else SnowflakeIdGenerator()
+    # Every generated EFIR is appended here when set (EFIRLog)
+    self.efir_log = efir_log
+    # ... and queued for a bulk write to MongoDB (EFIRRepository)
+    self.efir_repository = efir_repository
+    # ... and made searchable by description and circumstances (EFIRSearchIndex)
+    self.search_index = search_index
     self.efir_template = {
       'complaint_number': '',
       'date_time': '',
@@ -181,7 +194,7 @@ class AutomatedEFIRGenerator:
     efir = self.efir_template.copy()
     
     # Generate unique complaint number
-    efir['complaint_number'] = f"EFIR{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    efir['complaint_number'] = f"EFIR{self.id_generator.next_id()}"
     efir['date_time'] = datetime.now().isoformat()
     
     # Fill complainant details
@@ -210,6 +223,12 @@ class AutomatedEFIRGenerator:
       'nearby_landmarks': incident_data.get('nearby_landmarks', [])
     }
     
+    if self.efir_log is not None:
+      self.efir_log.append(efir)
+    if self.efir_repository is not None:
+      self.efir_repository.add(efir)
+    if self.search_index is not None:
+      self.search_index.add(efir)
     return efir
     
   def _generate_incident_description(self, incident_data):
@@ -226,15 +245,20 @@ class AutomatedEFIRGenerator:
     return description
 
 class RealTimeTourismAnalytics:
+  def __init__(self, stream=None, timeseries=None):
+    # Fed with every ping, alert and EFIR (StreamingAnalytics); reads cost O(1)
+    self.stream = stream if stream is not None else StreamingAnalytics()
+    # Minute/hour/day rollups of the same counts and sampled gauges (TimeSeriesStore)
+    self.timeseries = timeseries
+  
   def get_dashboard_metrics(self):
-    return {
-      'active_tourists': 12,
-      'recent_alerts': 3,
-      'high_risk_tourists': 2,
-      'avg_response_time_minutes': 5,
-      'system_status': 'operational',
-      'last_updated': datetime.now().isoformat(),
-    }
+    return self.stream.get_metrics()
+  
+  def get_history(self, metric, start, end=None, step=None, agg=None):
+    """Past values of a metric, e.g. alerts per 5 minutes over the last week (gauges: last reading)"""
+    if self.timeseries is None:
+      raise KeyError(metric)
+    return self.timeseries.query(metric, start, end, step, agg)
 
 class TouristSafetyScoreModel:
   def __init__(self):
@@ -311,9 +335,14 @@ class TouristSafetyScoreModel:
     return max(1, min(10, int(score)))
 
 class GeoFencingSystem:
-  def __init__(self):
+  def __init__(self, alert_dispatcher=None, alert_throttle=None):
+    # Delivers alerts off the request path (AlertDispatcher)
+    self.alert_dispatcher = alert_dispatcher
+    # Suppresses repeats of the same tourist/zone alert (AlertThrottle)
+    self.alert_throttle = alert_throttle
     self.risk_zones = {}
     self.safe_zones = {}
+    self._prepared_zones = None  # (zone_ids, polygons, risk levels) of active zones, built on demand
     
   def add_risk_zone(self, zone_id, coordinates, risk_level):
     """Add a risk zone with coordinates and risk level"""
@@ -322,58 +351,122 @@ class GeoFencingSystem:
       'risk_level': risk_level,    # 1-10 scale
       'active': True
     }
+    self._prepared_zones = None
+  
+  def remove_risk_zone(self, zone_id):
+    """Remove a risk zone; returns False if there was none with this id"""
+    if self.risk_zones.pop(zone_id, None) is None:
+      return False
+    self._prepared_zones = None
+    return True
+  
+  def _active_zone_polygons(self):
+    """Prepared polygons of the active zones, rebuilt only after the zones change"""
+    if self._prepared_zones is None:
+      zone_ids = [zone_id for zone_id, zone in self.risk_zones.items() if zone['active']]
+      polygons = [Polygon([(coord[1], coord[0]) for coord in self.risk_zones[zone_id]['coordinates']])
+                  for zone_id in zone_ids]
+      for polygon in polygons:
+        shapely.prepare(polygon)
+      risk_levels = np.array([self.risk_zones[zone_id]['risk_level'] for zone_id in zone_ids])
+      self._prepared_zones = (zone_ids, polygons, risk_levels)
+    return self._prepared_zones
+  
+  def zones_for_points(self, lats, lngs):
+    """
+    Vectorized zone lookup for many locations
+    
+    Returns:
+      (zone_ids, inside, risk) where inside[i, j] is True if point i is in zone_ids[j]
+      and risk[i] is the highest risk level of the zones containing point i (1 if none)
+    """
+    zone_ids, polygons, risk_levels = self._active_zone_polygons()
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    inside = np.zeros((len(lats), len(zone_ids)), dtype=bool)
+    for j, polygon in enumerate(polygons):
+      inside[:, j] = shapely.contains_xy(polygon, lngs, lats)
+    risk = np.where(inside, risk_levels, 1).max(axis=1, initial=1)
+    return zone_ids, inside, risk
+  
+  def zones_at(self, lat, lng):
+    """Ids of the active risk zones containing a location"""
+    point = Point(lng, lat)
+    zone_ids, polygons, _ = self._active_zone_polygons()
+    return [zone_id for zone_id, polygon in zip(zone_ids, polygons) if polygon.contains(point)]
+  
+  def zones_risk(self, zone_ids):
+    """Highest risk level among the given zones (1 if none)"""
+    return max([self.risk_zones[zone_id]['risk_level'] for zone_id in zone_ids], default=1)
   
   def check_location_risk(self, lat, lng):
     """Check if location is in any risk zone"""
-    point = Point(lng, lat)
-    max_risk = 1
-    
-    for zone_id, zone_data in self.risk_zones.items():
-      if not zone_data['active']:
-        continue
-        
-      polygon = Polygon([(coord[1], coord[0]) for coord in zone_data['coordinates']])
-      if polygon.contains(point):
-        max_risk = max(max_risk, zone_data['risk_level'])
-    
-    return max_risk
+    return self.zones_risk(self.zones_at(lat, lng))
   
-  def generate_alert(self, tourist_id, lat, lng, risk_level):
-    """Generate geo-fence alert"""
+  def generate_alert(self, tourist_id, lat, lng, risk_level, zone_ids=None):
+    """Generate geo-fence alert; repeats for the same tourist and zones are suppressed, not sent"""
+    if zone_ids is None:
+      zone_ids = self.zones_at(lat, lng)
     alert_data = {
       'tourist_id': tourist_id,
       'timestamp': datetime.now(),
       'location': [lat, lng],
       'risk_level': risk_level,
-      'alert_type': 'geo_fence_breach'
+      'zone_ids': list(zone_ids),
+      'alert_type': 'geo_fence_breach',
+      'suppressed': False
     }
     
+    if self.alert_throttle is not None:
+      decision = self.alert_throttle.check(tourist_id, '+'.join(sorted(map(str, zone_ids))), risk_level)
+      if not decision.allowed:
+        alert_data['suppressed'] = True
+        return alert_data
+      alert_data['repeats_suppressed'] = decision.suppressed
+    
     # Send to emergency contacts and police
     self._send_emergency_alert(alert_data)
     
     return alert_data
   
   def _send_emergency_alert(self, alert_data):
-    """Send emergency alert via SMS/notification"""
+    """Queue the alert for SMS/push/webhook delivery; never waits for the send"""
     message = f"ALERT: Tourist {alert_data['tourist_id']} entered high-risk zone (Risk: {alert_data['risk_level']}/10)"
+    if alert_data.get('repeats_suppressed'):
+      message += f" [{alert_data['repeats_suppressed']} repeats suppressed]"
     
-    # Send SMS via Twilio
-    try:
-      from twilio.rest import Client
-      twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-      twilio_client.messages.create(
-        body=message,
-        from_=settings.TWILIO_PHONE_NUMBER,  # Your Twilio number
-        to=settings.EMERGENCY_CONTACT_NUMBER  # Emergency contact number
-      )
-    except Exception as e:
-      print(f"SMS Alert failed: {e}")
+    if self.alert_dispatcher is None:
+      print(f"No alert dispatcher configured, alert not sent: {message}")
+      return
+    self.alert_dispatcher.dispatch(alert_data, message)
 
 class TouristFlowPredictor:
-  def __init__(self):
+  # Locations the flow model was trained on
+  DEFAULT_LOCATION_IDS = list(range(1, 11))
+  
+  def __init__(self, weather_service=None, event_calendar=None):
     self.model = GradientBoostingRegressor(n_estimators=100, random_state=42)
     self.scaler = StandardScaler()
     self.is_trained = False
+    self.weather_service = weather_service
+    self.event_calendar = event_calendar
+    self.location_coordinates = {}  # location_id -> (lat, lng)
+    
+  def register_location(self, location_id, latitude, longitude):
+    """Register coordinates for a location so forecasts can use its weather"""
+    self.location_coordinates[location_id] = (latitude, longitude)
+  
+  def load_locations(self, path):
+    """Register every location in a JSON list of {location_id, name, latitude, longitude}; returns how many"""
+    try:
+      with open(path) as f:
+        locations = json.load(f)
+    except (OSError, ValueError) as e:
+      print(f"Could not load locations from {path}, flow forecasts will not use weather: {e}")
+      return 0
+    for location in locations:
+      self.register_location(int(location['location_id']), float(location['latitude']), float(location['longitude']))
+    return len(locations)
     
   def prepare_time_features(self, timestamp):
     """Extract time-based features"""
@@ -383,52 +476,149 @@ class TouristFlowPredictor:
       dt.week, int(dt.strftime('%j'))  # day of year
     ]
   
+  def prepare_time_feature_matrix(self, times):
+    """Time features for a DatetimeIndex, one row per timestamp (same columns as prepare_time_features)"""
+    return np.column_stack([
+      times.hour, times.day, times.month, times.weekday,
+      times.isocalendar().week.to_numpy(dtype=int), times.dayofyear
+    ])
+  
+  def _load_model(self):
+    """Load the trained model and scaler once; returns False if they are not available"""
+    if not self.is_trained:
+      try:
+        self.model = joblib.load(settings.FLOW_MODEL_PATH)
+        self.scaler = joblib.load(settings.FLOW_SCALER_PATH)
+        self.is_trained = True
+      except:
+        return False
+    return True
+  
   def predict_tourist_flow(self, location_id, timestamp):
     """Predict tourist flow for a location at given time"""
-    time_features = self.prepare_time_features(timestamp)
+    dt = pd.to_datetime(timestamp)
+    time_features = self.prepare_time_features(dt)
     
     # Add location-specific features
     features = time_features + [
       location_id,
-      self._get_weather_score(timestamp),
-      self._get_event_score(location_id, timestamp)
+      self._get_weather_score(dt, location_id),
+      self._get_event_score(location_id, dt)
     ]
     
     features = np.array(features).reshape(1, -1)
     
     # Load or fit scaler if needed
-    if not self.is_trained:
-      try:
-        self.model = joblib.load(settings.FLOW_MODEL_PATH)
-        self.scaler = joblib.load(settings.FLOW_SCALER_PATH)
-        self.is_trained = True
-      except:
-        # Return default value if model not available
-        return 50
+    if not self._load_model():
+      # Return default value if model not available
+      return 50
     
     features_scaled = self.scaler.transform(features)
     
     predicted_flow = self.model.predict(features_scaled)[0]
     return max(0, int(predicted_flow))
   
-  def _get_weather_score(self, timestamp):
-    """Get weather favorability score (1-10)"""
-    # Integrate with weather API
-    return 7  # Placeholder
+  def predict_flow_grid(self, location_ids=None, start=None, hours=24):
+    """
+    Predict tourist flow for every location over the next `hours` hours in one model call
+    
+    Returns:
+      (times, grid) where times is an hourly DatetimeIndex starting at `start` (floored to the hour)
+      and grid is an int array of shape (len(location_ids), hours)
+    """
+    location_ids = list(location_ids or self.DEFAULT_LOCATION_IDS)
+    times = pd.date_range(pd.to_datetime(start or datetime.now()).floor('h'), periods=hours, freq='h')
+    
+    if not self._load_model():
+      return times, np.full((len(location_ids), hours), 50, dtype=int)
+    
+    # Rows are location-major: row i * hours + j is location i at hour j
+    time_features = self.prepare_time_feature_matrix(times)
+    features = np.column_stack([
+      np.tile(time_features, (len(location_ids), 1)),
+      np.repeat(location_ids, hours),
+      np.concatenate([self._get_weather_scores(times, location_id) for location_id in location_ids]),
+      np.concatenate([self._get_event_scores(location_id, times) for location_id in location_ids])
+    ])
+    
+    predicted = self.model.predict(self.scaler.transform(features))
+    grid = np.maximum(0, predicted).astype(int).reshape(len(location_ids), hours)
+    return times, grid
+  
+  def _get_weather_score(self, timestamp, location_id=None):
+    """Get weather favorability score (1-10) from the cached hourly forecast"""
+    if self.weather_service is None or location_id not in self.location_coordinates:
+      return 7  # No forecast available for this location
+    
+    lat, lng = self.location_coordinates[location_id]
+    try:
+      forecast = self.weather_service.get_weather_risk_at(lat, lng, pd.to_datetime(timestamp).to_pydatetime())
+      weather_risk = forecast['risk_factors'].get('overall_weather_risk', 4)
+    except Exception as e:
+      print(f"Weather forecast lookup failed: {e}")
+      return 7
+    
+    # Low weather risk means favourable conditions for visitors
+    return max(1, min(10, round(11 - weather_risk)))
+  
+  def _get_weather_scores(self, times, location_id=None):
+    """Vectorized _get_weather_score for a DatetimeIndex, from the location's forecast risk timeline"""
+    scores = np.full(len(times), 7)
+    if self.weather_service is None or location_id not in self.location_coordinates:
+      return scores
+    
+    lat, lng = self.location_coordinates[location_id]
+    try:
+      timeline = self.weather_service.get_weather_risk_timeline(lat, lng)
+      epochs = np.array([t.timestamp() for t in times.to_pydatetime()])
+      risk = np.full(len(times), np.nan)
+      
+      forecast_epochs = timeline['epoch']
+      if len(forecast_epochs):
+        i = np.searchsorted(forecast_epochs, epochs, side='right') - 1
+        in_window = (i >= 0) & (epochs < forecast_epochs[-1] + 3600)
+        risk[in_window] = timeline['overall_weather_risk'][i[in_window]]
+      
+      if np.isnan(risk).any():
+        # Outside the forecast window fall back to current conditions, like get_weather_risk_at
+        current = self.weather_service.get_weather_data(lat, lng)
+        risk[np.isnan(risk)] = current.get('risk_factors', {}).get('overall_weather_risk', 4)
+    except Exception as e:
+      print(f"Weather forecast lookup failed: {e}")
+      return scores
+    
+    return np.clip(np.round(11 - risk), 1, 10).astype(int)
   
   def _get_event_score(self, location_id, timestamp):
     """Get event/festival impact score"""
     # Check for local events/festivals
-    return 5  # Placeholder
+    if self.event_calendar is None:
+      return 5  # No calendar loaded
+    return self.event_calendar.score(location_id, timestamp)
+  
+  def _get_event_scores(self, location_id, times):
+    """Vectorized _get_event_score for a DatetimeIndex"""
+    if self.event_calendar is None:
+      return np.full(len(times), 5)
+    return self.event_calendar.scores(location_id, times)
 
 class IncidentPredictor:
+  # Feature columns, in the order the model was trained on
+  FEATURES = ['risk_score', 'tourist_density', 'safety_score', 'experience_level_score',
+              'weather_score', 'time_of_day_risk', 'visibility_score']
+  
   def __init__(self):
     self.model = RandomForestClassifier(n_estimators=200, random_state=42)
     self.is_trained = False
     
-  def predict_incident_probability(self, location_data, tourist_data, environmental_data):
-    """Predict probability of incident occurring"""
-    features = [
+  @staticmethod
+  def time_of_day_risk(hour):
+    """Time of day risk (higher at night)"""
+    return 8 if hour < 6 or hour > 22 else 3
+  
+  def build_features(self, location_data, tourist_data, environmental_data):
+    """Feature vector for one tourist, in FEATURES order"""
+    return [
       location_data.get('risk_score', 5),
       location_data.get('tourist_density', 50),
       tourist_data.get('safety_score', 5),
@@ -437,57 +627,105 @@ class IncidentPredictor:
       environmental_data.get('time_of_day_risk', 5),
       environmental_data.get('visibility_score', 5)
     ]
-    
-    features = np.array(features).reshape(1, -1)
-    
-    # Load model if needed
+  
+  def _load_model(self):
+    """Load the trained model once; returns False if it is not available"""
     if not self.is_trained:
       try:
         self.model = joblib.load(settings.INCIDENT_MODEL_PATH)
         self.is_trained = True
       except:
-        # Return default value if model not available
-        return 0.25
+        return False
+    return True
+    
+  def predict_incident_probability(self, location_data, tourist_data, environmental_data):
+    """Predict probability of incident occurring"""
+    features = self.build_features(location_data, tourist_data, environmental_data)
+    
+    features = np.array(features).reshape(1, -1)
+    
+    # Load model if needed
+    if not self._load_model():
+      # Return default value if model not available
+      return 0.25
     
     incident_prob = self.model.predict_proba(features)[0][1]  # Probability of incident
     
     return incident_prob
+  
+  def predict_incident_probabilities(self, features):
+    """Incident probability for every row of an (n, len(FEATURES)) feature matrix in one model call"""
+    features = np.asarray(features, dtype=float).reshape(-1, len(self.FEATURES))
+    if not self._load_model():
+      return np.full(len(features), 0.25)
+    if len(features) == 0:
+      return np.empty(0)
+    return self.model.predict_proba(features)[:, 1]
 
 class SmartTouristSafetySystem:
-  def __init__(self):
+  def __init__(self, tourist_store=None, anomaly_detector=None, alert_dispatcher=None, alert_throttle=None,
+               tourist_feed=None, analytics=None):
     self.safety_model = TouristSafetyScoreModel()
-    self.geo_fencing = GeoFencingSystem()
+    self.geo_fencing = GeoFencingSystem(alert_dispatcher, alert_throttle)
     self.flow_predictor = TouristFlowPredictor()
     self.incident_predictor = IncidentPredictor()
+    # Latest state of every active tourist (ActiveTouristStore), read by the risk sweep
+    self.tourist_store = tourist_store
+    # Per-tourist baselines of behavior and health readings (AnomalyDetector)
+    self.anomaly_detector = anomaly_detector
+    # Pushes score/zone/alert changes to the tourist's app (TouristFeed)
+    self.tourist_feed = tourist_feed
+    # Dashboard counters fed with every update and sent alert (StreamingAnalytics)
+    self.analytics = analytics
     
   async def process_tourist_data(self, tourist_id, data_update):
+    return self.process_tourist_update(tourist_id, data_update)
+  
+  def process_tourist_update(self, tourist_id, data_update):
+    """Synchronous body of process_tourist_data, for running on a worker thread"""
     # Calculate safety score using the model
     safety_score = self.safety_model.predict_safety_score(data_update)
     
     # Check location risk if coordinates are provided
     alerts_generated = []
     incident_probability = None
+    incident_features = None
     tourist_flow = None
+    zones = None
+    lat = lng = None
+    location_risk = 1
+    
+    # Coordinates may be sent top-level or inside location_data (as the API model does)
+    location_update = data_update.get('location_data') or data_update
+    # Location ids are ints everywhere else; JSON clients may send "3"
+    location_id = location_update.get('location_id')
+    if location_id is not None:
+      try:
+        location_id = parse_location_id(location_id)
+      except ValueError as e:
+        print(f"Ignoring location_id for tourist {tourist_id}: {e}")
+        location_id = None
     
-    if 'latitude' in data_update and 'longitude' in data_update:
-      lat = data_update['latitude']
-      lng = data_update['longitude']
-      location_risk = self.geo_fencing.check_location_risk(lat, lng)
+    if 'latitude' in location_update and 'longitude' in location_update:
+      lat = location_update['latitude']
+      lng = location_update['longitude']
+      zones = self.geo_fencing.zones_at(lat, lng)
+      location_risk = self.geo_fencing.zones_risk(zones)
       
       # Generate alert if risk is high (above 7)
       if location_risk > 7:
-        alert = self.geo_fencing.generate_alert(tourist_id, lat, lng, location_risk)
+        alert = self.geo_fencing.generate_alert(tourist_id, lat, lng, location_risk, zones)
         alerts_generated.append(alert)
       
       # Get tourist flow prediction if location_id is provided
-      if 'location_id' in data_update:
+      if location_id is not None:
         tourist_flow = self.flow_predictor.predict_tourist_flow(
-          data_update['location_id'],
+          location_id,
           data_update.get('timestamp', datetime.now().isoformat())
         )
       
       # Predict incident probability
-      if 'location_id' in data_update:
+      if location_id is not None:
         location_data = {
           'risk_score': location_risk,
           'tourist_density': tourist_flow or 50
@@ -499,8 +737,7 @@ class SmartTouristSafetySystem:
         }
         
         # Time of day risk (higher at night)
-        hour = datetime.now().hour
-        time_risk = 8 if hour < 6 or hour > 22 else 3
+        time_risk = self.incident_predictor.time_of_day_risk(datetime.now().hour)
         
         environmental_data = {
           'weather_score': data_update.get('weather_score', 5),
@@ -508,10 +745,45 @@ class SmartTouristSafetySystem:
           'visibility_score': data_update.get('visibility_score', 7)
         }
         
+        incident_features = self.incident_predictor.build_features(location_data, tourist_data, environmental_data)
         incident_probability = self.incident_predictor.predict_incident_probability(
           location_data, tourist_data, environmental_data
         )
     
+    anomalies = []
+    if self.anomaly_detector is not None:
+      anomalies = self.anomaly_detector.observe(
+        tourist_id,
+        self.anomaly_detector.readings(data_update.get('behavior_data'), data_update.get('health_data'))
+      )
+    
+    if self.tourist_store is not None:
+      self.tourist_store.update(
+        tourist_id,
+        zones=zones,
+        latitude=lat,
+        longitude=lng,
+        safety_score=safety_score,
+        location_id=location_id,
+        incident_features=incident_features,
+        incident_probability=incident_probability
+      )
+    
+    if self.tourist_feed is not None:
+      # The stored state also carries zones from earlier updates that had no coordinates
+      state = self.tourist_store.get(tourist_id) if self.tourist_store is not None else None
+      if state is not None:
+        view = self.tourist_feed.view(state['safety_score'], state['zones'], state['incident_probability'])
+      else:
+        view = self.tourist_feed.view(safety_score, zones, incident_probability)
+      self.tourist_feed.publish(tourist_id, view, [alert for alert in alerts_generated if not alert['suppressed']])
+    
+    if self.analytics is not None:
+      self.analytics.record_ping(tourist_id, lat, lng, location_risk, incident_probability, location_id)
+      for alert in alerts_generated:
+        if not alert['suppressed']:
+          self.analytics.record_alert(alert)
+    
     return {
       'tourist_id': tourist_id,
       'timestamp': datetime.now().isoformat(),
@@ -519,8 +791,121 @@ class SmartTouristSafetySystem:
       'alerts_generated': alerts_generated,
       'tourist_flow': tourist_flow,
       'incident_probability': incident_probability,
+      'anomalies': anomalies,
       'recommendations': [],
     }
+  
+  def process_ping_batch(self, tourist_ids, latitudes, longitudes, timestamps, location_ids):
+    """
+    Score a micro-batch of location pings (one per tourist) in one pass: vectorized
+    geofencing, one incident model call and a bulk update of the tourist store
+    
+    Args:
+      tourist_ids: List of distinct tourist ids
+      latitudes, longitudes, timestamps: Float arrays (timestamps in epoch seconds)
+      location_ids: Int array, -1 where the ping has no location_id
+    """
+    zone_ids, inside, location_risk = self.geo_fencing.zones_for_points(latitudes, longitudes)
+    
+    # Pings carry no profile data, so the last computed safety score is reused
+    if self.tourist_store is not None:
+      safety_scores = self.tourist_store.get_column(tourist_ids, 'safety_score', 5)
+    else:
+      safety_scores = np.full(len(tourist_ids), 5.0)
+    
+    # Incident probability needs a location_id, as in process_tourist_data
+    with_location = np.flatnonzero(location_ids >= 0)
+    now = datetime.now()
+    flow_by_location = {
+      location_id: self.flow_predictor.predict_tourist_flow(location_id, now.isoformat())
+      for location_id in np.unique(location_ids[with_location]).tolist()
+    }
+    features = np.full((len(tourist_ids), len(IncidentPredictor.FEATURES)), np.nan)
+    if len(with_location):
+      features[with_location] = np.column_stack([
+        location_risk[with_location],
+        [flow_by_location[location_id] or 50 for location_id in location_ids[with_location].tolist()],
+        safety_scores[with_location],
+        np.full(len(with_location), 5),   # experience level
+        np.full(len(with_location), 5),   # weather score
+        np.full(len(with_location), self.incident_predictor.time_of_day_risk(now.hour)),
+        np.full(len(with_location), 7),   # visibility
+      ])
+    # Without a location_id the last stored probability still stands, as in process_tourist_update
+    if self.tourist_store is not None:
+      incident_probabilities = self.tourist_store.get_column(tourist_ids, 'incident_probability', np.nan).astype(float)
+    else:
+      incident_probabilities = np.full(len(tourist_ids), np.nan)
+    incident_probabilities[with_location] = self.incident_predictor.predict_incident_probabilities(
+      features[with_location]
+    )
+    
+    # Generate alert if risk is high (above 7); repeats may be suppressed by the throttle
+    alerts = [
+      self.geo_fencing.generate_alert(tourist_ids[i], latitudes[i], longitudes[i], int(location_risk[i]),
+                                      [zone_ids[j] for j in np.flatnonzero(inside[i])])
+      for i in np.flatnonzero(location_risk > 7).tolist()
+    ]
+    alerts_generated = [alert for alert in alerts if not alert['suppressed']]
+    
+    zone_masks = self.tourist_store.zone_masks(zone_ids, inside) if self.tourist_store is not None else None
+    if self.tourist_feed is not None:
+      self._publish_batch_changes(tourist_ids, zone_ids, inside, zone_masks, safety_scores, incident_probabilities,
+                                  alerts_generated)
+    
+    if self.tourist_store is not None:
+      timestamps = np.asarray(timestamps, dtype=float)
+      self.tourist_store.update_many(
+        tourist_ids,
+        timestamps,
+        zone_masks=zone_masks,
+        latitude=latitudes,
+        longitude=longitudes,
+        incident_probability=incident_probabilities
+      )
+      # Location and incident features only where the ping had a location_id; the rest keep theirs
+      if len(with_location):
+        self.tourist_store.update_many(
+          [tourist_ids[i] for i in with_location.tolist()],
+          timestamps[with_location],
+          location_id=location_ids[with_location],
+          incident_features=features[with_location]
+        )
+    
+    if self.analytics is not None:
+      self.analytics.record_pings(tourist_ids, latitudes.tolist(), longitudes.tolist(), location_risk.tolist(),
+                                  incident_probabilities.tolist(), location_ids.tolist())
+      for alert in alerts_generated:
+        self.analytics.record_alert(alert)
+    
+    return {
+      'processed': len(tourist_ids),
+      'alerts_generated': len(alerts_generated),
+      'alerts_suppressed': len(alerts) - len(alerts_generated),
+      'scored': len(with_location),
+    }
+  
+  def _publish_batch_changes(self, tourist_ids, zone_ids, inside, zone_masks, safety_scores, incident_probabilities,
+                             alerts):
+    """Offer the feed only the tourists whose zones or incident probability changed or who got an alert"""
+    changed = np.ones(len(tourist_ids), dtype=bool)
+    if self.tourist_store is not None:
+      # Compared with the stored state, so this has to run before the store is updated
+      previous_masks = self.tourist_store.get_column(tourist_ids, 'zone_mask', 0)
+      previous_probabilities = np.round(self.tourist_store.get_column(tourist_ids, 'incident_probability', np.nan), 2)
+      probabilities = np.round(incident_probabilities, 2)
+      same_probability = (previous_probabilities == probabilities) | (np.isnan(previous_probabilities) & np.isnan(probabilities))
+      changed = (previous_masks != zone_masks) | ~same_probability
+    
+    alerts_by_tourist = {}
+    for alert in alerts:
+      alerts_by_tourist.setdefault(alert['tourist_id'], []).append(alert)
+    index = {tourist_id: i for i, tourist_id in enumerate(tourist_ids)}
+    for i in set(np.flatnonzero(changed).tolist()) | {index[tourist_id] for tourist_id in alerts_by_tourist}:
+      view = self.tourist_feed.view(
+        safety_scores[i], [zone_ids[j] for j in np.flatnonzero(inside[i])], incident_probabilities[i]
+      )
+      self.tourist_feed.publish(tourist_ids[i], view, alerts_by_tourist.get(tourist_ids[i]))
 
 
 class TouristVerificationSystem:
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 import os
+import tempfile
 
 class Settings(BaseModel):
   # External API Keys
@@ -13,8 +14,45 @@ class Settings(BaseModel):
   TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "+1234567890")
   EMERGENCY_CONTACT_NUMBER: str = os.getenv("EMERGENCY_CONTACT_NUMBER", "+91XXXXXXXXXX")
   
+  # Alert delivery: push gateway and webhook are optional channels next to Twilio SMS
+  PUSH_GATEWAY_URL: str = os.getenv("PUSH_GATEWAY_URL", "")
+  PUSH_GATEWAY_KEY: str = os.getenv("PUSH_GATEWAY_KEY", "")
+  ALERT_WEBHOOK_URL: str = os.getenv("ALERT_WEBHOOK_URL", "")
+  ALERT_WORKERS: int = int(os.getenv("ALERT_WORKERS", "4"))
+  ALERT_MAX_ATTEMPTS: int = int(os.getenv("ALERT_MAX_ATTEMPTS", "5"))
+  # Repeats of an alert (same tourist and zone/incident) are suppressed for the cooldown;
+  # each tourist may then trigger ALERT_BURST alerts at once and ALERT_MAX_PER_HOUR sustained
+  ALERT_COOLDOWN_SECONDS: float = float(os.getenv("ALERT_COOLDOWN_SECONDS", "300"))
+  ALERT_BURST: int = int(os.getenv("ALERT_BURST", "5"))
+  ALERT_MAX_PER_HOUR: float = float(os.getenv("ALERT_MAX_PER_HOUR", "20"))
+  
+  # Live dashboards (/ws/dashboard): batching tick, per-dashboard frame queue and metrics push interval
+  DASHBOARD_TICK_SECONDS: float = float(os.getenv("DASHBOARD_TICK_SECONDS", "0.25"))
+  DASHBOARD_QUEUE_SIZE: int = int(os.getenv("DASHBOARD_QUEUE_SIZE", "64"))
+  DASHBOARD_METRICS_INTERVAL_SECONDS: float = float(os.getenv("DASHBOARD_METRICS_INTERVAL_SECONDS", "5"))
+  
+  # Dashboard metrics: seconds since the last ping for a tourist to count as active, and the grid
+  # cell (degrees) that pings without a location_id are grouped into for unique-tourist counts
+  ANALYTICS_ACTIVE_WINDOW_SECONDS: float = float(os.getenv("ANALYTICS_ACTIVE_WINDOW_SECONDS", "900"))
+  ANALYTICS_REGION_CELL_DEGREES: float = float(os.getenv("ANALYTICS_REGION_CELL_DEGREES", "0.25"))
+  # Seconds between samples of active/high-risk tourist counts into the metric history
+  TIMESERIES_SAMPLE_SECONDS: float = float(os.getenv("TIMESERIES_SAMPLE_SECONDS", "60"))
+  # Seconds a density heatmap is served from the same snapshot of tourist positions
+  HEATMAP_TTL_SECONDS: float = float(os.getenv("HEATMAP_TTL_SECONDS", "5"))
+  
+  # EFIR numbering and storage: snowflake worker id (-1 leases one through Redis) and the
+  # directory of the append-only EFIR log, flushed to disk on every EFIR unless disabled
+  SNOWFLAKE_WORKER_ID: int = int(os.getenv("SNOWFLAKE_WORKER_ID", "-1"))
+  SNOWFLAKE_LEASE_DIR: str = os.getenv("SNOWFLAKE_LEASE_DIR") or os.path.join(tempfile.gettempdir(), "saferove-snowflake")
+  EFIR_LOG_DIR: str = os.getenv("EFIR_LOG_DIR", "./data/efir-log")
+  EFIR_LOG_FSYNC: bool = os.getenv("EFIR_LOG_FSYNC", "true").lower() == "true"
+  # How often each worker's EFIR search index picks up EFIRs other workers stored in MongoDB
+  EFIR_SEARCH_SYNC_SECONDS: float = float(os.getenv("EFIR_SEARCH_SYNC_SECONDS", "5"))
+  
   # Database and Cache
   MONGODB_URI: str = os.getenv("MONGODB_URI", "")
+  # Used when MONGODB_URI names no database
+  MONGODB_DB: str = os.getenv("MONGODB_DB", "saferove")
   REDIS_URL: str = os.getenv("REDIS_URL", "")
   
   # AWS Services
@@ -30,6 +68,27 @@ class Settings(BaseModel):
   FLOW_MODEL_PATH: str = os.getenv("FLOW_MODEL_PATH", "./models/tourist_flow_model.pkl")
   FLOW_SCALER_PATH: str = os.getenv("FLOW_SCALER_PATH", "./models/tourist_flow_scaler.pkl")
   INCIDENT_MODEL_PATH: str = os.getenv("INCIDENT_MODEL_PATH", "./models/incident_predictor_model.pkl")
+  FLOW_FORECAST_HORIZON_HOURS: int = int(os.getenv("FLOW_FORECAST_HORIZON_HOURS", "72"))
+  FLOW_FORECAST_REFRESH_SECONDS: float = float(os.getenv("FLOW_FORECAST_REFRESH_SECONDS", "900"))
+  EVENT_CALENDAR_PATH: str = os.getenv("EVENT_CALENDAR_PATH", "./data/event_calendar.json")
+  # Coordinates of the flow model's locations, for their weather forecasts
+  LOCATIONS_PATH: str = os.getenv("LOCATIONS_PATH", "./data/locations.json")
+  
+  # Incident risk sweep over active tourists
+  RISK_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("RISK_SWEEP_INTERVAL_SECONDS", "60"))
+  RISK_SWEEP_TOP_K: int = int(os.getenv("RISK_SWEEP_TOP_K", "50"))
+  ACTIVE_TOURIST_WINDOW_SECONDS: float = float(os.getenv("ACTIVE_TOURIST_WINDOW_SECONDS", "1800"))
+  
+  # Behavior/health anomaly detection: baseline window per signal and spike threshold in std devs
+  ANOMALY_WINDOW: int = int(os.getenv("ANOMALY_WINDOW", "120"))
+  ANOMALY_Z_THRESHOLD: float = float(os.getenv("ANOMALY_Z_THRESHOLD", "4.0"))
+  
+  # Default time budget for an incoming request; outbound calls never outlive it
+  REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+  
+  # Daily call quotas of the NCRB and Visual Crossing keys, shared by all workers
+  NCRB_DAILY_QUOTA: int = int(os.getenv("NCRB_DAILY_QUOTA", "10000"))
+  VISUALCROSSING_DAILY_QUOTA: int = int(os.getenv("VISUALCROSSING_DAILY_QUOTA", "1000"))
   
   # External Service URLs
   EMERGENCY_SERVICE_URL: str = os.getenv("EMERGENCY_SERVICE_URL", "")
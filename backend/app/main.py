@@ -1,17 +1,42 @@
-from fastapi import FastAPI, WebSocket, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, WebSocket, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.api.endpoints import translation
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from datetime import datetime
+import math
 import os
 import shutil
+import json
 import numpy as np
 from .ai_models import SmartTouristSafetySystem, AutomatedEFIRGenerator, RealTimeTourismAnalytics, TouristSafetyScoreModel, GeoFencingSystem, TouristFlowPredictor, IncidentPredictor, MultilingualEmergencyProcessor, TouristVerificationSystem, CrowdAnalysisSystem, TouristAssistantChatbot
 from .enhanced_safety_model import EnhancedTouristSafetyScoreModel
 from .services.supabase_client import get_supabase
 from .services.blockchain import anchor_id_hash
 from .services.trip_blockchain import register_temporary_trip, check_trip_status, delete_expired_trip, cleanup_expired_trips
+from .services.resilience import set_request_deadline, reset_request_deadline, get_upstream_stats
+from .services.quota import Priority, set_request_priority, reset_request_priority, get_budget_stats
+from .services.flow_forecast import FlowForecastTable
+from .services.event_calendar import EventCalendar
+from .services.risk_sweeper import IncidentRiskSweeper
+from .services.tourist_store import ActiveTouristStore, parse_location_id
+from .services.anomaly import AnomalyDetector
+from .services.ingestion import PingIngestionPipeline, parse_ndjson
+from .services.alerts import AlertDispatcher, channels_from_settings
+from .services.alert_throttle import AlertThrottle
+from .services.dashboard_hub import DashboardHub, DashboardChannel
+from .services.tourist_feed import TouristFeed
+from .services.streaming_analytics import StreamingAnalytics, combine_metrics
+from .services.timeseries import TimeSeriesStore
+from .services.heatmap import DensityHeatmap
+from .services.efir_ids import SnowflakeIdGenerator
+from .services.efir_log import open_worker_log
+from .services.efir_repository import EFIRRepository
+from .services.efir_search import EFIRSearchIndex
+from .services.mongo_client import get_mongo
+from .services.executor import workload_executor, ExecutorSaturated
+from .config import settings
 from web3 import Web3
 from app.services.asr_service import asr_service
 
@@ -33,21 +58,154 @@ app.add_middleware(
   allow_headers=["*"],
 )
 
-safety_system = SmartTouristSafetySystem()
-analytics = RealTimeTourismAnalytics()
-efirs = AutomatedEFIRGenerator()
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+  """Propagate the caller's time budget (X-Request-Timeout, seconds) to outbound calls"""
+  try:
+    budget = float(request.headers.get("X-Request-Timeout", settings.REQUEST_DEADLINE_SECONDS))
+  except ValueError:
+    budget = settings.REQUEST_DEADLINE_SECONDS
+  # Zero, negative, nan or inf budgets are ignored rather than failing or uncapping every call
+  if not (math.isfinite(budget) and budget > 0):
+    budget = settings.REQUEST_DEADLINE_SECONDS
+  token = set_request_deadline(min(budget, settings.REQUEST_DEADLINE_SECONDS))
+  try:
+    return await call_next(request)
+  finally:
+    reset_request_deadline(token)
+
+# Quota priority by path prefix (first match wins); everything else is interactive
+ROUTE_PRIORITIES = [
+  ("/api/emergency/", Priority.EMERGENCY),
+  ("/api/efir/", Priority.EMERGENCY),
+  ("/api/geo/alert/", Priority.EMERGENCY),
+  ("/api/weather/batch", Priority.BACKGROUND),
+  ("/api/predict/tourist-flow/grid", Priority.BACKGROUND),
+  ("/api/safety/train", Priority.BACKGROUND),
+  ("/api/safety/generate-training-data", Priority.BACKGROUND),
+]
+
+@app.middleware("http")
+async def request_priority(request: Request, call_next):
+  """Tag the request with a quota priority so emergency paths keep API budget when it runs low"""
+  level = next((p for prefix, p in ROUTE_PRIORITIES if request.url.path.startswith(prefix)), Priority.INTERACTIVE)
+  token = set_request_priority(level)
+  try:
+    return await call_next(request)
+  finally:
+    reset_request_priority(token)
+
+tourist_store = ActiveTouristStore()
+heatmap = DensityHeatmap(tourist_store, ttl=settings.HEATMAP_TTL_SECONDS)
+anomaly_detector = AnomalyDetector(window=settings.ANOMALY_WINDOW, z_threshold=settings.ANOMALY_Z_THRESHOLD)
+dashboard_hub = DashboardHub(
+  tick=settings.DASHBOARD_TICK_SECONDS,
+  queue_size=settings.DASHBOARD_QUEUE_SIZE
+)
+alert_dispatcher = AlertDispatcher(
+  channels_from_settings(settings) + [DashboardChannel(dashboard_hub)],
+  workers=settings.ALERT_WORKERS,
+  max_attempts=settings.ALERT_MAX_ATTEMPTS
+)
+alert_throttle = AlertThrottle(
+  cooldown=settings.ALERT_COOLDOWN_SECONDS,
+  burst=settings.ALERT_BURST,
+  per_hour=settings.ALERT_MAX_PER_HOUR
+)
+
+def _tourist_feed_snapshot(tourist_id):
+  state = tourist_store.get(tourist_id)
+  if state is None:
+    return None
+  return TouristFeed.view(state['safety_score'], state['zones'], state['incident_probability'])
+
+tourist_feed = TouristFeed(_tourist_feed_snapshot)
+# Every ping, sent alert and EFIR is counted here; /api/dashboard/metrics reads it in constant time
+# History of the same counts at 1 min / 1 h / 1 day resolution, in fixed memory
+timeseries = TimeSeriesStore(sample_interval=settings.TIMESERIES_SAMPLE_SECONDS)
+stream_analytics = StreamingAnalytics(
+  active_window=settings.ANALYTICS_ACTIVE_WINDOW_SECONDS,
+  region_cell_degrees=settings.ANALYTICS_REGION_CELL_DEGREES,
+  timeseries=timeseries
+)
+timeseries.add_sampler(stream_analytics.gauges)
+analytics = RealTimeTourismAnalytics(stream_analytics, timeseries)
+safety_system = SmartTouristSafetySystem(tourist_store, anomaly_detector, alert_dispatcher, alert_throttle, tourist_feed,
+                                         stream_analytics)
+efir_ids = SnowflakeIdGenerator(settings.SNOWFLAKE_WORKER_ID if settings.SNOWFLAKE_WORKER_ID >= 0 else None,
+                                lease_dir=settings.SNOWFLAKE_LEASE_DIR)
+# Each log has a single writer: other workers claim the first free worker-N subdirectory,
+# which is the same one after a restart, so no EFIRs are left behind in an orphaned log
+efir_log = open_worker_log(settings.EFIR_LOG_DIR, fsync=settings.EFIR_LOG_FSYNC)
+mongo_db = get_mongo()
+efir_repository = EFIRRepository(mongo_db["efirs"]) if mongo_db is not None else None
+# Rebuilt from the log on startup, then kept current as EFIRs are generated; with MongoDB
+# it also follows the repository, so it covers the EFIRs of every worker
+efir_search = EFIRSearchIndex()
+efir_search.add_many(efir_log)
+efirs = AutomatedEFIRGenerator(efir_ids, efir_log, efir_repository, efir_search)
 safety_score_model = TouristSafetyScoreModel()
 enhanced_safety_model = EnhancedTouristSafetyScoreModel(
     "579b464db66ec23bdd00000103f3e5383cc74a3a52239069a8495b74",
     "ERBNWFCSPDFBZPP97S7QFGCS9"
 )
-geo_fencing = GeoFencingSystem()
-flow_predictor = TouristFlowPredictor()
+# Zones added through the API also apply to tourist updates and ping batches
+geo_fencing = safety_system.geo_fencing
+event_calendar = EventCalendar.from_file(settings.EVENT_CALENDAR_PATH)
+flow_predictor = TouristFlowPredictor(enhanced_safety_model.weather_service, event_calendar)
+flow_predictor.load_locations(settings.LOCATIONS_PATH)
 incident_predictor = IncidentPredictor()
 emergency_processor = MultilingualEmergencyProcessor()
 face_verification = TouristVerificationSystem()
 crowd_analysis = CrowdAnalysisSystem()
 chatbot = TouristAssistantChatbot()
+flow_forecast = FlowForecastTable(
+  flow_predictor,
+  horizon_hours=settings.FLOW_FORECAST_HORIZON_HOURS,
+  refresh_interval=settings.FLOW_FORECAST_REFRESH_SECONDS
+)
+risk_sweeper = IncidentRiskSweeper(
+  incident_predictor,
+  tourist_store,
+  top_k=settings.RISK_SWEEP_TOP_K,
+  interval=settings.RISK_SWEEP_INTERVAL_SECONDS,
+  active_window=settings.ACTIVE_TOURIST_WINDOW_SECONDS
+)
+
+ping_pipeline = PingIngestionPipeline(safety_system.process_ping_batch)
+
+@app.on_event("startup")
+def start_background_jobs():
+  flow_forecast.start()
+  risk_sweeper.start()
+  ping_pipeline.start()
+  alert_dispatcher.start()
+  dashboard_hub.start()
+  tourist_feed.start()
+  timeseries.start()
+  if efir_repository is not None:
+    efir_repository.start()
+    efir_search.start(efir_repository, settings.EFIR_SEARCH_SYNC_SECONDS)
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+  flow_forecast.stop()
+  risk_sweeper.stop()
+  ping_pipeline.stop()
+  alert_dispatcher.stop()
+  dashboard_hub.stop()
+  tourist_feed.stop()
+  timeseries.stop()
+  efir_search.stop()
+  if efir_repository is not None:
+    efir_repository.stop()
+  efir_log.close()
+  efir_ids.release()
+  workload_executor.shutdown()
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated(request: Request, exc: ExecutorSaturated):
+  return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 class TouristUpdate(BaseModel):
   profile_data: Dict[str, Any] | None = None
@@ -73,6 +231,9 @@ class RiskZoneRequest(BaseModel):
   coordinates: List[List[float]]  # List of [lat, lng] points
   risk_level: int  # 1-10 scale
 
+class WeatherBatchRequest(BaseModel):
+  points: List[List[float]]  # List of [lat, lng] points
+
 class LocationCheckRequest(BaseModel):
   latitude: float
   longitude: float
@@ -94,6 +255,11 @@ class FlowPredictionRequest(BaseModel):
   location_id: int
   timestamp: str = None  # Optional, will use current time if not provided
 
+class FlowGridRequest(BaseModel):
+  location_ids: Optional[List[int]] = None  # Defaults to every known location
+  start: Optional[str] = None  # Defaults to the current hour
+  hours: int = 24
+
 class IncidentPredictionRequest(BaseModel):
   location_data: Dict[str, Any]
   tourist_data: Dict[str, Any]
@@ -116,27 +282,249 @@ async def health():
 
 @app.post("/api/tourist/{tourist_id}/process")
 async def process_update(tourist_id: str, payload: TouristUpdate):
-  result = await safety_system.process_tourist_data(tourist_id, payload.model_dump(exclude_none=True))
+  location_id = (payload.location_data or {}).get("location_id")
+  if location_id is not None:
+    try:
+      payload.location_data["location_id"] = parse_location_id(location_id)
+    except ValueError as e:
+      raise HTTPException(status_code=400, detail=str(e))
+  result = await workload_executor.run(
+    "inference", safety_system.process_tourist_update, tourist_id, payload.model_dump(exclude_none=True)
+  )
   return result
 
+@app.post("/api/tourist/pings", status_code=202)
+async def ingest_pings(request: Request):
+  """
+  Bulk location pings as NDJSON (Content-Type: application/x-ndjson), a JSON array
+  or {"pings": [...]}. Each ping: tourist_id, latitude, longitude and optionally
+  timestamp and location_id. Pings are scored asynchronously in micro-batches.
+  """
+  body = await request.body()
+  try:
+    if "ndjson" in request.headers.get("content-type", ""):
+      pings = parse_ndjson(body)
+    else:
+      pings = json.loads(body)
+      if isinstance(pings, dict):
+        pings = pings.get("pings", [])
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=f"Invalid ping payload: {e}")
+  if not isinstance(pings, list):
+    raise HTTPException(status_code=400, detail="Expected a list of pings")
+  
+  result = ping_pipeline.submit(pings)
+  return {"status": "accepted", **result}
+
+@app.get("/api/system/ingestion")
+async def get_ingestion_stats():
+  """Ping throughput, coalescing and batch timings of the ingestion pipeline"""
+  return {"status": "ok", "ingestion": ping_pipeline.get_stats()}
+
+@app.get("/api/tourist/{tourist_id}/state")
+async def get_tourist_state(tourist_id: str):
+  """Latest known position, scores and zones of an active tourist"""
+  state = tourist_store.get(tourist_id)
+  if state is None:
+    raise HTTPException(status_code=404, detail="Tourist is not active")
+  return {"status": "ok", "state": state}
+
+@app.get("/api/system/tourist-store")
+async def get_tourist_store_stats():
+  """Active tourist count and memory footprint of the state store"""
+  return {"status": "ok", "store": tourist_store.memory_usage()}
+
+@app.get("/api/system/anomalies")
+async def get_anomaly_stats():
+  """Readings scored and anomalies flagged by the behavior/health anomaly detector"""
+  return {"status": "ok", "anomalies": anomaly_detector.get_stats()}
+
+@app.get("/api/system/alerts")
+async def get_alert_stats():
+  """Alert queue depth, retries and deliveries per channel, and alerts suppressed as repeats"""
+  return {"status": "ok", "alerts": alert_dispatcher.get_stats(), "throttle": alert_throttle.get_stats()}
+
+@app.get("/api/system/dashboard")
+async def get_dashboard_stats():
+  """Connected dashboards, batched frames and slow consumers dropped"""
+  return {"status": "ok", "dashboard": dashboard_hub.get_stats()}
+
+@app.get("/api/system/tourist-feed")
+async def get_tourist_feed_stats():
+  """Subscribed tourists and updates published, skipped as unchanged and pushed"""
+  return {"status": "ok", "feed": tourist_feed.get_stats()}
+
+@app.get("/api/system/timeseries")
+async def get_timeseries_stats():
+  """Recorded metric series, their resolutions and retention, and memory used"""
+  return {"status": "ok", "metrics": timeseries.series(), "timeseries": timeseries.get_stats()}
+
+@app.get("/api/system/heatmap")
+async def get_heatmap_stats():
+  """Position snapshots taken and heatmap tile cache hits"""
+  return {"status": "ok", "heatmap": heatmap.get_stats()}
+
+@app.get("/api/system/efir-log")
+async def get_efir_log_stats():
+  """EFIR log size, segments and lookups, and the snowflake worker id of this worker"""
+  return {
+    "status": "ok",
+    "efir_log": efir_log.get_stats(),
+    "ids": efir_ids.get_stats(),
+    "repository": efir_repository.get_stats() if efir_repository is not None else None,
+    "search": efir_search.get_stats()
+  }
+
+@app.get("/api/system/executor")
+async def get_executor_stats():
+  """Queue depth, wait times and saturation per worker lane"""
+  return {"status": "ok", "lanes": workload_executor.get_stats()}
+
+@app.get("/api/system/upstreams")
+async def get_upstreams():
+  """Circuit breaker state, call counters and remaining quota per external service"""
+  return {"status": "ok", "upstreams": get_upstream_stats(), "quotas": get_budget_stats()}
+
 @app.get("/api/dashboard/metrics")
 async def get_metrics():
   return analytics.get_dashboard_metrics()
 
+@app.get("/api/dashboard/history")
+async def get_metric_history(metric: str, start: Optional[float] = None, end: Optional[float] = None,
+                             step: Optional[float] = None, agg: Optional[str] = None):
+  """
+  Past values of a dashboard metric (pings, alerts, efirs, active_tourists, high_risk_tourists)
+  between epoch seconds start and end (default: the last 24 hours), in step-second buckets.
+  Counters (pings, alerts, efirs) are summed by default, gauges report their last reading
+  """
+  start = datetime.now().timestamp() - 86400 if start is None else start
+  try:
+    history = await workload_executor.run("inference", analytics.get_history, metric, start, end, step, agg)
+  except KeyError:
+    raise HTTPException(status_code=404, detail=f"No history for metric '{metric}'")
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  return {"status": "ok", **history}
+
+def _live_dashboard_metrics():
+  """Dashboard metrics with this worker's live counts; the hub adds up every worker's before /ws/dashboard"""
+  metrics = analytics.get_dashboard_metrics()
+  metrics['top_risk'] = risk_sweeper.top(min(5, risk_sweeper.top_k))
+  metrics['alerts'] = {k: v for k, v in alert_dispatcher.get_stats().items() if k in ('sent', 'failed', 'pending')}
+  return metrics
+
+def _combine_dashboard_metrics(snapshots):
+  metrics = combine_metrics(snapshots)
+  top_risk = [tourist for snapshot in snapshots for tourist in snapshot.get('top_risk', [])]
+  metrics['top_risk'] = sorted(top_risk, key=lambda tourist: tourist['incident_probability'], reverse=True)[:5]
+  metrics['alerts'] = {k: sum(snapshot.get('alerts', {}).get(k, 0) for snapshot in snapshots)
+                       for k in ('sent', 'failed', 'pending')}
+  return metrics
+
+dashboard_hub.add_periodic("metrics", _live_dashboard_metrics, settings.DASHBOARD_METRICS_INTERVAL_SECONDS,
+                           combine=_combine_dashboard_metrics)
+
+def _publish_efir(efir):
+  stream_analytics.record_efir(efir)
+  dashboard_hub.publish("efir", {
+    "efir_number": efir.get("complaint_number"),
+    "date_time": efir.get("date_time"),
+    "incident_details": efir.get("incident_details")
+  })
+
 @app.post("/api/efir/create")
 async def create_efir(body: EFIRPayload):
-  efir = efirs.generate_efir(body.incident_data)
+  efir = await workload_executor.run("io", efirs.generate_efir, body.incident_data)
+  _publish_efir(efir)
   return {"status": "ok", "efir_number": efir.get("complaint_number")}
 
+@app.get("/api/efir/log")
+async def list_efirs(start: Optional[float] = None, end: Optional[float] = None, limit: int = 100,
+                     newest_first: bool = True):
+  """EFIRs dated between epoch seconds start and end, from this worker's EFIR log"""
+  if not 1 <= limit <= 1000:
+    raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+  return {"status": "ok", "efirs": efir_log.scan(start, end, limit, newest_first)}
+
+@app.get("/api/efir/query")
+async def query_efirs(status: Optional[str] = None, tourist_id: Optional[str] = None, start: Optional[str] = None,
+                      end: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None,
+                      fields: Optional[str] = None):
+  """
+  A page of stored EFIRs, newest first, for police dashboards. start/end are ISO datetimes,
+  fields a comma-separated list (summary fields by default); pass next_cursor to get the next page
+  """
+  if efir_repository is None:
+    raise HTTPException(status_code=503, detail="EFIR storage is not configured (set MONGODB_URI)")
+  try:
+    page = await workload_executor.run(
+      "inference", efir_repository.query, status, tourist_id, start, end, limit, cursor,
+      fields.split(",") if fields else None
+    )
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  return {"status": "ok", **page}
+
+def _search_efirs(q, incident_type, severity, start, end, limit, match_all):
+  result = efir_search.search(q, incident_type, severity, start, end, limit, match_all)
+  efirs_by_number = {hit["complaint_number"]: efir_log.get(hit["complaint_number"]) for hit in result["hits"]}
+  elsewhere = [number for number, efir in efirs_by_number.items() if efir is None]
+  if elsewhere and efir_repository is not None:
+    # Generated by other workers: only the repository has them
+    efirs_by_number.update(efir_repository.get_many(elsewhere))
+  for hit in result["hits"]:
+    hit["efir"] = efirs_by_number.get(hit["complaint_number"])
+  return result
+
+def _other_efir_logs():
+  """Whether other workers keep EFIR logs that this worker's index cannot see"""
+  root = os.path.abspath(settings.EFIR_LOG_DIR)
+  try:
+    logs = [root] + [os.path.join(root, name) for name in os.listdir(root) if name.startswith("worker-")]
+  except OSError:
+    return False
+  return any(path != os.path.abspath(efir_log.directory) for path in logs)
+
+@app.get("/api/efir/search")
+async def search_efirs(q: str, incident_type: Optional[str] = None, severity: Optional[str] = None,
+                       start: Optional[str] = None, end: Optional[str] = None, limit: int = 20,
+                       match_all: bool = False):
+  """
+  EFIRs whose description or circumstances match q, ranked by BM25. start/end are
+  epoch seconds or ISO datetimes; match_all requires every word of q. Without MongoDB
+  only this worker's EFIRs are searched: scope is then "this_worker" and partial is
+  true when other workers have EFIR logs
+  """
+  try:
+    result = await workload_executor.run(
+      "inference", _search_efirs, q, incident_type, severity, start, end, limit, match_all
+    )
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  scope = "all_workers" if efir_repository is not None else "this_worker"
+  return {"status": "ok", "scope": scope, "partial": scope == "this_worker" and _other_efir_logs(), **result}
+
+@app.get("/api/efir/{complaint_number}")
+async def get_efir(complaint_number: str):
+  efir = efir_log.get(complaint_number)
+  if efir is None and efir_repository is not None:
+    # Written by another worker, whose EFIR log this worker cannot see
+    efir = await workload_executor.run("inference", efir_repository.get, complaint_number)
+  if efir is None:
+    raise HTTPException(status_code=404, detail=f"EFIR {complaint_number} not found")
+  return {"status": "ok", "efir": efir}
+
 @app.post("/api/safety/score")
 async def get_safety_score(request: SafetyScoreRequest):
-  score = safety_score_model.predict_safety_score(request.tourist_data)
+  score = await workload_executor.run("inference", safety_score_model.predict_safety_score, request.tourist_data)
   return {"status": "ok", "safety_score": score}
 
 @app.post("/api/safety/enhanced-score")
 async def get_enhanced_safety_score(request: EnhancedSafetyScoreRequest):
   """Get enhanced safety score with NCRB crime data integration"""
-  result = enhanced_safety_model.predict_safety_score(
+  result = await workload_executor.run(
+    "inference",
+    enhanced_safety_model.predict_safety_score,
     request.tourist_data, 
     request.location_data
   )
@@ -180,10 +568,46 @@ async def get_weather_data(latitude: float, longitude: float):
     if not enhanced_safety_model.weather_service:
       return {"status": "error", "message": "Weather service not configured"}
     
-    weather_data = enhanced_safety_model.weather_service.get_weather_data(
-      latitude, longitude
+    weather_data = await workload_executor.run(
+      "io", enhanced_safety_model.weather_service.get_weather_data, latitude, longitude
     )
     return {"status": "ok", "weather_data": weather_data}
+  except ExecutorSaturated:
+    raise
+  except Exception as e:
+    return {"status": "error", "message": f"Failed to fetch weather data: {str(e)}"}
+
+@app.get("/api/weather/risk-at")
+async def get_weather_risk_at(latitude: float, longitude: float, timestamp: str):
+  """Get weather risk factors for a location at any hour in the forecast window"""
+  try:
+    if not enhanced_safety_model.weather_service:
+      return {"status": "error", "message": "Weather service not configured"}
+    
+    forecast = await workload_executor.run(
+      "io", enhanced_safety_model.weather_service.get_weather_risk_at, latitude, longitude, timestamp
+    )
+    return {"status": "ok", "forecast": forecast}
+  except ExecutorSaturated:
+    raise
+  except Exception as e:
+    return {"status": "error", "message": f"Failed to fetch weather forecast: {str(e)}"}
+
+@app.post("/api/weather/batch")
+async def get_weather_data_batch(request: WeatherBatchRequest):
+  """Get weather data for many locations, fetching each weather tile at most once"""
+  try:
+    if not enhanced_safety_model.weather_service:
+      return {"status": "error", "message": "Weather service not configured"}
+    
+    # Outbound HTTP and the vectorized risk math both stay off the event loop
+    weather_data = await workload_executor.run(
+      "io", enhanced_safety_model.weather_service.get_weather_data_many,
+      [(point[0], point[1]) for point in request.points]
+    )
+    return {"status": "ok", "weather_data": weather_data}
+  except ExecutorSaturated:
+    raise
   except Exception as e:
     return {"status": "error", "message": f"Failed to fetch weather data: {str(e)}"}
 
@@ -192,6 +616,14 @@ async def add_risk_zone(request: RiskZoneRequest):
   geo_fencing.add_risk_zone(request.zone_id, request.coordinates, request.risk_level)
   return {"status": "ok", "message": f"Risk zone {request.zone_id} added successfully"}
 
+@app.delete("/api/geo/risk-zone/{zone_id}")
+async def remove_risk_zone(zone_id: str):
+  if not geo_fencing.remove_risk_zone(zone_id):
+    raise HTTPException(status_code=404, detail=f"Risk zone {zone_id} not found")
+  # Frees the zone's zone_mask bit for the next zone added
+  tourist_store.release_zone(zone_id)
+  return {"status": "ok", "message": f"Risk zone {zone_id} removed"}
+
 @app.post("/api/geo/check-location")
 async def check_location(request: LocationCheckRequest):
   risk_level = geo_fencing.check_location_risk(request.latitude, request.longitude)
@@ -199,16 +631,20 @@ async def check_location(request: LocationCheckRequest):
 
 @app.post("/api/geo/alert/{tourist_id}")
 async def generate_geo_alert(tourist_id: str, request: LocationCheckRequest):
-  risk_level = geo_fencing.check_location_risk(request.latitude, request.longitude)
+  zones = geo_fencing.zones_at(request.latitude, request.longitude)
+  risk_level = geo_fencing.zones_risk(zones)
   if risk_level > 5:  # Only generate alert if risk level is significant
-    alert = geo_fencing.generate_alert(tourist_id, request.latitude, request.longitude, risk_level)
+    alert = geo_fencing.generate_alert(tourist_id, request.latitude, request.longitude, risk_level, zones)
     return {"status": "ok", "alert": alert}
   return {"status": "ok", "message": "No alert generated, risk level too low"}
 
 @app.post("/api/predict/tourist-flow")
 async def predict_tourist_flow(request: FlowPredictionRequest):
   timestamp = request.timestamp or datetime.now().isoformat()
-  predicted_flow = flow_predictor.predict_tourist_flow(request.location_id, timestamp)
+  # Served from the precomputed table inside the forecast horizon, predicted live outside it
+  predicted_flow = flow_forecast.lookup(request.location_id, timestamp)
+  if predicted_flow is None:
+    predicted_flow = flow_predictor.predict_tourist_flow(request.location_id, timestamp)
   return {
     "status": "ok", 
     "location_id": request.location_id,
@@ -216,9 +652,53 @@ async def predict_tourist_flow(request: FlowPredictionRequest):
     "predicted_tourist_flow": predicted_flow
   }
 
+@app.post("/api/predict/tourist-flow/grid")
+async def predict_tourist_flow_grid(request: FlowGridRequest):
+  """Hourly tourist flow for many locations at once, e.g. for the heat map forecast"""
+  if not 1 <= request.hours <= 168:
+    raise HTTPException(status_code=400, detail="hours must be between 1 and 168")
+  times, grid = await workload_executor.run(
+    "inference", flow_predictor.predict_flow_grid, request.location_ids, request.start, request.hours
+  )
+  return {
+    "status": "ok",
+    "location_ids": request.location_ids or flow_predictor.DEFAULT_LOCATION_IDS,
+    "timestamps": [t.isoformat() for t in times],
+    "predicted_tourist_flow": grid.tolist()  # [location][hour]
+  }
+
+@app.get("/api/predict/tourist-flow/status")
+async def get_flow_forecast_status():
+  """Freshness and hit rate of the precomputed flow forecast"""
+  return {"status": "ok", "forecast": flow_forecast.get_stats()}
+
+@app.get("/api/heatmap/density")
+async def get_density_heatmap(south: float, west: float, north: float, east: float, zoom: int):
+  """Active tourists per grid cell in a bounding box; cells get smaller as the zoom goes up"""
+  try:
+    density = await workload_executor.run("inference", heatmap.density, south, west, north, east, zoom)
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  return {"status": "ok", **density}
+
+@app.get("/api/incidents/top-risk")
+async def get_top_risk_tourists(limit: Optional[int] = None):
+  """Active tourists with the highest incident probability as of the last sweep (20 unless limit is given)"""
+  try:
+    tourists = risk_sweeper.top(limit if limit is not None else min(20, risk_sweeper.top_k))
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  return {
+    "status": "ok",
+    "tourists": tourists,
+    "sweep": risk_sweeper.get_stats()
+  }
+
 @app.post("/api/predict/incident-probability")
 async def predict_incident(request: IncidentPredictionRequest):
-  probability = incident_predictor.predict_incident_probability(
+  probability = await workload_executor.run(
+    "inference",
+    incident_predictor.predict_incident_probability,
     request.location_data,
     request.tourist_data,
     request.environmental_data
@@ -231,7 +711,7 @@ async def predict_incident(request: IncidentPredictionRequest):
 
 @app.post("/api/emergency/process-text")
 async def process_emergency_text(request: EmergencyTextRequest):
-  result = emergency_processor.process_emergency_text(request.text, request.language)
+  result = await workload_executor.run("nlp", emergency_processor.process_emergency_text, request.text, request.language)
   
   # If immediate response is required, generate an EFIR
   if result.get('requires_immediate_response', False):
@@ -241,7 +721,8 @@ async def process_emergency_text(request: EmergencyTextRequest):
       'circumstances': f"Emergency text received: {request.text}",
       'extracted_info': result['extracted_info']
     }
-    efir = efirs.generate_efir(incident_data)
+    efir = await workload_executor.run("io", efirs.generate_efir, incident_data)
+    _publish_efir(efir)
     result['efir_generated'] = True
     result['efir_number'] = efir.get('complaint_number')
   else:
@@ -300,13 +781,31 @@ async def process_emergency_sms(request: SMSMessageRequest):
       incident_data['last_location'] = request.location_data
     
     # Generate EFIR
-    efir = efirs.generate_efir(incident_data)
+    efir = await workload_executor.run("io", efirs.generate_efir, incident_data)
+    _publish_efir(efir)
     response_data['efir_generated'] = True
     response_data['efir_number'] = efir.get('complaint_number')
     
-    # In a real implementation, we would trigger emergency alerts here
-    # For example, sending notifications to emergency services
-    # safety_system.trigger_emergency_alert(efir.get('complaint_number'), request.from_number)
+    # Notify emergency contacts and police, once per sender and incident type per cooldown
+    # (a higher emergency level still goes through); delivery happens in the background
+    decision = alert_throttle.check(request.from_number, incident_data['incident_type'], result['emergency_level'])
+    response_data['alert_suppressed'] = not decision.allowed
+    if decision.allowed:
+      message = (f"EMERGENCY SMS from {request.from_number} (level {result['emergency_level']}/10, "
+                 f"EFIR {efir.get('complaint_number')}): {request.message}")
+      if decision.suppressed:
+        message += f" [{decision.suppressed} repeats suppressed]"
+      alert = {
+        'alert_type': 'sms_emergency',
+        'timestamp': datetime.now(),
+        'from_number': request.from_number,
+        'efir_number': efir.get('complaint_number'),
+        'emergency_level': result['emergency_level'],
+        'location': request.location_data,
+        'repeats_suppressed': decision.suppressed
+      }
+      stream_analytics.record_alert(alert)
+      response_data['alert_queued'] = alert_dispatcher.dispatch(alert, message)
   else:
     response_data['efir_generated'] = False
   
@@ -502,6 +1001,18 @@ async def register_tourist_face(tourist_id: str = Form(...), image: UploadFile =
     "image_path": image_path
   }
 
+def _load_and_verify_face(tourist_id, image_path):
+  # Load the image for verification
+  try:
+    import face_recognition
+    current_image = face_recognition.load_image_file(image_path)
+  except ImportError:
+    # Use mock data if face_recognition is not available
+    current_image = np.ones((300, 300, 3), dtype=np.uint8) * 255
+  
+  # Verify the face
+  return face_verification.verify_tourist(tourist_id, current_image)
+
 @app.post("/api/tourist/verify-face")
 async def verify_tourist_face(tourist_id: str = Form(...), image: UploadFile = File(...)):
   # Save the uploaded image temporarily
@@ -513,16 +1024,8 @@ async def verify_tourist_face(tourist_id: str = Form(...), image: UploadFile = F
     raise HTTPException(status_code=500, detail="Failed to save image")
   
   try:
-    # Load the image for verification
-    try:
-      import face_recognition
-      current_image = face_recognition.load_image_file(temp_path)
-    except ImportError:
-      # Use mock data if face_recognition is not available
-      current_image = np.ones((300, 300, 3), dtype=np.uint8) * 255
-    
-    # Verify the face
-    result = face_verification.verify_tourist(tourist_id, current_image)
+    # Decoding and face encoding both run on the vision workers
+    result = await workload_executor.run("vision", _load_and_verify_face, tourist_id, temp_path)
     
     # Clean up the temporary file
     if os.path.exists(temp_path):
@@ -542,6 +1045,10 @@ async def verify_tourist_face(tourist_id: str = Form(...), image: UploadFile = F
       "tourist_id": tourist_id
     }
   
+  except ExecutorSaturated:
+    if os.path.exists(temp_path):
+      os.remove(temp_path)
+    raise
   except Exception as e:
     # Clean up the temporary file in case of error
     if os.path.exists(temp_path):
@@ -560,7 +1067,7 @@ async def analyze_crowd(image: UploadFile = File(...), location_id: str = Form(N
   
   try:
     # Analyze the crowd density
-    result = crowd_analysis.analyze_crowd_density(temp_path)
+    result = await workload_executor.run("vision", crowd_analysis.analyze_crowd_density, temp_path)
     
     # Clean up the temporary file
     if os.path.exists(temp_path):
@@ -583,6 +1090,10 @@ async def analyze_crowd(image: UploadFile = File(...), location_id: str = Form(N
       "crowd_analysis": result
     }
   
+  except ExecutorSaturated:
+    if os.path.exists(temp_path):
+      os.remove(temp_path)
+    raise
   except Exception as e:
     # Clean up the temporary file in case of error
     if os.path.exists(temp_path):
@@ -615,21 +1126,14 @@ async def asr_transcribe(language_id: str = Form(None), decoder: str = Form('ctc
     except Exception:
       pass
 
-# WebSocket with optional Redis broadcast
-from config import settings
-try:
-  import redis
-  _redis = redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
-except Exception:
-  _redis = None
-
+# Live alerts, EFIRs and metrics, fanned out to every worker through Redis pub/sub
 @app.websocket("/ws/dashboard")
 async def ws_dashboard(ws: WebSocket):
   await ws.accept()
-  await ws.send_json({"type": "hello", "message": "connected"})
-  try:
-    while True:
-      # If you later push messages to Redis channel 'dashboard_broadcast', forward them here
-      _ = await ws.receive_text()
-  except Exception:
-    pass
+  await dashboard_hub.serve(ws)
+
+# A tourist's own safety score, zones and alerts: a snapshot, then only the fields that change
+@app.websocket("/ws/tourist/{tourist_id}")
+async def ws_tourist(ws: WebSocket, tourist_id: str):
+  await ws.accept()
+  await tourist_feed.serve(ws, tourist_id)
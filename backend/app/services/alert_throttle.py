@@ -0,0 +1,135 @@
+"""
+Alert deduplication and rate limiting
+Repeats of the same alert (same tourist, same zone or incident type) are suppressed
+for a cooldown window, and every tourist has a token bucket bounding how many alerts
+they can trigger overall, so a tourist pacing along a zone boundary or re-sending an
+SOS text cannot flood responders or run up SMS costs. An alert more severe than any
+the tourist has triggered before always goes out, whatever is left in the bucket
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, Hashable, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottleDecision(NamedTuple):
+    allowed: bool
+    # Alerts suppressed for this key: since the last allowed one if allowed, so far otherwise
+    suppressed: int
+    reason: Optional[str] = None   # 'duplicate' or 'rate_limited' when not allowed
+
+
+class _KeyState:
+    __slots__ = ('last_allowed', 'last_seen', 'severity', 'suppressed')
+
+    def __init__(self):
+        self.last_allowed = float('-inf')
+        self.last_seen = float('-inf')
+        self.severity = float('-inf')
+        self.suppressed = 0
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'peak')
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.peak = float('-inf')   # Highest severity checked for this subject
+
+
+class AlertThrottle:
+    def __init__(self, cooldown: float = 300, burst: int = 5, per_hour: float = 20, prune_every: int = 1000):
+        """
+        Args:
+            cooldown: Seconds during which repeats of an alert are suppressed. A repeat with a
+                higher severity than the alert that opened the window still goes through
+            burst: Alerts a tourist can trigger back to back
+            per_hour: Sustained alerts per tourist per hour once the burst is spent
+            prune_every: Checks between sweeps that forget keys and buckets gone quiet
+        """
+        self.cooldown = cooldown
+        self.burst = burst
+        self.rate = per_hour / 3600.0
+        self.prune_every = prune_every
+        self._keys: Dict[tuple, _KeyState] = {}
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._checks = 0
+        self.stats = {'allowed': 0, 'escalations': 0, 'escalations_over_limit': 0, 'suppressed_duplicate': 0,
+                      'suppressed_rate_limited': 0}
+        self.suppressed_by_kind: Counter = Counter()
+
+    def check(self, subject: Hashable, kind: Hashable, severity: float = 0, now: Optional[float] = None) -> ThrottleDecision:
+        """
+        Decide whether an alert goes out, and record it either way
+
+        Args:
+            subject: Who the alert is about (tourist id, phone number)
+            kind: What it is about (zone id, incident type)
+            severity: Risk or emergency level; an escalation bypasses the cooldown, and a
+                severity above any seen for the subject also bypasses the token bucket
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._checks += 1
+            if self._checks % self.prune_every == 0:
+                self._prune(now)
+
+            state = self._keys.get((subject, kind))
+            if state is None:
+                state = self._keys[(subject, kind)] = _KeyState()
+            state.last_seen = now
+
+            escalated = severity > state.severity
+            if now - state.last_allowed < self.cooldown and not escalated:
+                return self._suppress(state, kind, 'duplicate')
+
+            bucket = self._buckets.get(subject)
+            if bucket is None:
+                bucket = self._buckets[subject] = _Bucket(self.burst, now)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            # At most one bypass per severity level, so escalations cannot be used to flood
+            peak, bucket.peak = bucket.peak, max(bucket.peak, severity)
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+            elif severity > peak:
+                self.stats['escalations_over_limit'] += 1
+            else:
+                return self._suppress(state, kind, 'rate_limited')
+
+            if escalated and now - state.last_allowed < self.cooldown:
+                self.stats['escalations'] += 1
+            suppressed, state.suppressed = state.suppressed, 0
+            state.last_allowed = now
+            state.severity = severity
+            self.stats['allowed'] += 1
+            return ThrottleDecision(True, suppressed)
+
+    def _suppress(self, state: _KeyState, kind: Hashable, reason: str) -> ThrottleDecision:
+        state.suppressed += 1
+        self.stats[f"suppressed_{reason}"] += 1
+        self.suppressed_by_kind[kind] += 1
+        return ThrottleDecision(False, state.suppressed, reason)
+
+    def _prune(self, now: float):
+        """Forget keys quiet for a whole cooldown (with their suppressed counts) and full buckets"""
+        for key in [k for k, s in self._keys.items() if now - s.last_seen >= self.cooldown]:
+            del self._keys[key]
+        refill_time = self.burst / self.rate if self.rate else float('inf')
+        for subject in [s for s, b in self._buckets.items() if now - b.updated >= refill_time]:
+            del self._buckets[subject]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                suppressed_by_kind=dict(self.suppressed_by_kind.most_common(20)),
+                tracked_keys=len(self._keys),
+                tracked_subjects=len(self._buckets),
+            )
@@ -0,0 +1,306 @@
+"""
+Asynchronous alert dispatch
+Request handlers only enqueue alerts; a small worker pool delivers them over
+SMS, push and webhook channels with reused clients and backoff retries
+"""
+
+import heapq
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import requests
+
+from .resilience import CircuitOpenError, get_upstream
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class AlertChannel:
+    """A delivery route for alerts; send() raises on failure so the dispatcher can retry"""
+    name = 'channel'
+
+    def send(self, alert: Dict, message: str):
+        raise NotImplementedError
+
+
+class TwilioSMSChannel(AlertChannel):
+    """
+    SMS through Twilio; one client is created on first use and shared by all workers.
+    A send that times out after Twilio accepted it is retried too, so a contact may
+    occasionally get the same alert twice, which beats not getting it at all
+    """
+    name = 'sms'
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, to_number: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.to_number = to_number
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        with self._client_lock:
+            if self._client is None:
+                from twilio.rest import Client
+                self._client = Client(self.account_sid, self.auth_token)
+            return self._client
+
+    def send(self, alert: Dict, message: str):
+        # Not idempotent, so the upstream itself never retries; the dispatcher does, with backoff
+        get_upstream('twilio').call(
+            self._get_client().messages.create,
+            body=message,
+            from_=self.from_number,
+            to=alert.get('contact_number') or self.to_number,
+            pass_timeout=False
+        )
+
+
+class _HTTPChannel(AlertChannel):
+    """JSON POST over a keep-alive session shared by all workers"""
+    upstream = 'alerts_http'
+
+    def __init__(self, url: str, headers: Optional[Dict] = None):
+        self.url = url
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json', **(headers or {})})
+
+    def payload(self, alert: Dict, message: str) -> Dict:
+        return {'message': message, 'alert': alert}
+
+    def send(self, alert: Dict, message: str):
+        body = json.dumps(self.payload(alert, message), default=_json_default)
+        response = get_upstream(self.upstream).call(self.session.post, self.url, data=body)
+        response.raise_for_status()
+
+
+class PushChannel(_HTTPChannel):
+    """Push notification through an HTTP push gateway (FCM-style: title, body, data)"""
+    name = 'push'
+    upstream = 'push'
+
+    def __init__(self, url: str, api_key: str = ""):
+        super().__init__(url, {'Authorization': f"Bearer {api_key}"} if api_key else None)
+
+    def payload(self, alert: Dict, message: str) -> Dict:
+        return {
+            'topic': f"tourist-{alert.get('tourist_id', 'all')}",
+            'title': alert.get('alert_type', 'alert').replace('_', ' ').title(),
+            'body': message,
+            'data': alert,
+        }
+
+
+class WebhookChannel(_HTTPChannel):
+    """Alert JSON posted to a webhook, e.g. the police control room integration"""
+    name = 'webhook'
+    upstream = 'alert_webhook'
+
+
+class StubGateway(AlertChannel):
+    """
+    Local stand-in for a real channel: records what would have been sent.
+    Used when no channel is configured and in tests; `fail_times` makes the
+    first sends fail to exercise retries
+    """
+
+    def __init__(self, name: str = 'stub', fail_times: int = 0, delay: float = 0.0):
+        self.name = name
+        self.fail_times = fail_times
+        self.delay = delay
+        self.sent: List[Dict] = []
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def send(self, alert: Dict, message: str):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.attempts += 1
+            if self.attempts <= self.fail_times:
+                raise ConnectionError(f"{self.name} gateway unavailable (attempt {self.attempts})")
+            self.sent.append({'alert': alert, 'message': message})
+        logger.info(f"[{self.name}] {message}")
+
+
+class AlertDispatcher:
+    def __init__(self, channels: List[AlertChannel], workers: int = 4, max_queue: int = 10000,
+                 max_attempts: int = 5, backoff: float = 0.5, max_backoff: float = 30.0, max_hold: float = 900.0):
+        """
+        Args:
+            channels: Every alert is delivered on each channel independently
+            workers: Delivery threads
+            max_queue: Deliveries allowed to wait; beyond that new alerts are dropped and counted
+            max_attempts: Sends per delivery that may fail before giving up
+            backoff, max_backoff: Retry delay doubles from `backoff` up to `max_backoff` seconds
+            max_hold: Seconds a delivery is held while its channel's circuit breaker is open.
+                Those tries were never sent, so they do not count against max_attempts
+        """
+        self.channels = list(channels)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_hold = max_hold
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        # (ready_at, seq, delivery) waiting for their retry time
+        self._retries: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0   # Deliveries queued, in flight or waiting to retry
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'held': 0, 'failed': 0, 'dropped': 0,
+                      'channels': {c.name: {'sent': 0, 'failed': 0} for c in self.channels}}
+
+    def dispatch(self, alert: Dict, message: str) -> bool:
+        """Queue an alert on every channel without waiting; False if the queue is full"""
+        self.start()
+        queued = True
+        for channel in self.channels:
+            with self._cond:
+                self._pending += 1
+            try:
+                self._queue.put_nowait({'channel': channel, 'alert': alert, 'message': message,
+                                        'attempt': 1, 'queued_at': time.time()})
+                self.stats['queued'] += 1
+            except queue.Full:
+                self._finish()
+                self.stats['dropped'] += 1
+                queued = False
+                logger.error(f"Alert queue full, dropped {channel.name} alert: {message}")
+        return queued
+
+    def _finish(self):
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def _give_up(self, delivery: Dict, reason: str):
+        channel = delivery['channel']
+        self.stats['failed'] += 1
+        self.stats['channels'][channel.name]['failed'] += 1
+        logger.error(f"{channel.name} alert failed {reason}")
+        self._finish()
+
+    def _retry_in(self, delivery: Dict, delay: float):
+        with self._cond:
+            heapq.heappush(self._retries, (time.monotonic() + delay * random.uniform(0.8, 1.2),
+                                           next(self._seq), delivery))
+            self._cond.notify_all()
+
+    def _deliver(self, delivery: Dict):
+        channel = delivery['channel']
+        try:
+            channel.send(delivery['alert'], delivery['message'])
+        except CircuitOpenError as e:
+            # Not attempted: hold the delivery until the breaker lets a trial call through
+            if self._stop.is_set() or time.time() - delivery['queued_at'] >= self.max_hold:
+                self._give_up(delivery, f"while its circuit stayed open: {e}")
+                return
+            delay = max(e.retry_after, self.backoff)
+            self.stats['held'] += 1
+            logger.warning(f"{channel.name} circuit open, holding alert for {delay:.1f}s")
+            self._retry_in(delivery, delay)
+            return
+        except Exception as e:
+            if delivery['attempt'] >= self.max_attempts or self._stop.is_set():
+                self._give_up(delivery, f"after {delivery['attempt']} attempts: {e}")
+                return
+            delay = min(self.backoff * 2 ** (delivery['attempt'] - 1), self.max_backoff)
+            delivery['attempt'] += 1
+            self.stats['retried'] += 1
+            logger.warning(f"{channel.name} alert failed ({e}), retrying in {delay:.1f}s")
+            self._retry_in(delivery, delay)
+            return
+        self.stats['sent'] += 1
+        self.stats['channels'][channel.name]['sent'] += 1
+        self._finish()
+
+    def _work(self):
+        while True:
+            delivery = self._queue.get()
+            if delivery is None:
+                return
+            self._deliver(delivery)
+
+    def _schedule_retries(self):
+        """Move deliveries whose backoff has elapsed back onto the work queue"""
+        while not self._stop.is_set():
+            due = []
+            with self._cond:
+                now = time.monotonic()
+                while self._retries and self._retries[0][0] <= now:
+                    due.append(heapq.heappop(self._retries)[2])
+                if not due:
+                    self._cond.wait(self._retries[0][0] - now if self._retries else None)
+            # Outside the lock: the put blocks while the work queue is full
+            for delivery in due:
+                self._queue.put(delivery)
+
+    def start(self):
+        """Start the workers; safe to call repeatedly"""
+        if self._threads and not self._stop.is_set():
+            return
+        with self._cond:
+            if self._threads and not self._stop.is_set():
+                return
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._work, name=f"alert-worker-{i}", daemon=True)
+                             for i in range(self.workers)]
+            self._threads.append(threading.Thread(target=self._schedule_retries, name='alert-retry', daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until every queued alert is delivered or given up; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Deliver what is queued (retries waiting for backoff are abandoned), then stop"""
+        self.wait_idle(timeout)
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            pending, retrying = self._pending, len(self._retries)
+        return dict(self.stats, queue_depth=self._queue.qsize(), pending=pending, retrying=retrying,
+                    workers=self.workers)
+
+
+def channels_from_settings(settings) -> List[AlertChannel]:
+    """Channels with credentials configured, or a logging stub if there are none"""
+    channels: List[AlertChannel] = []
+    if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
+        channels.append(TwilioSMSChannel(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN,
+                                         settings.TWILIO_PHONE_NUMBER, settings.EMERGENCY_CONTACT_NUMBER))
+    if settings.PUSH_GATEWAY_URL:
+        channels.append(PushChannel(settings.PUSH_GATEWAY_URL, settings.PUSH_GATEWAY_KEY))
+    if settings.ALERT_WEBHOOK_URL:
+        channels.append(WebhookChannel(settings.ALERT_WEBHOOK_URL))
+    if not channels:
+        logger.warning("No alert channels configured; alerts are only logged")
+        channels.append(StubGateway('log'))
+    return channels
@@ -0,0 +1,172 @@
+"""
+Streaming anomaly detection over tourist behavior and health readings
+Every tourist keeps a fixed-size window per signal with running statistics,
+so scoring a new reading costs O(1) no matter how long the tourist has been tracked
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WindowStats:
+    """
+    Mean and variance of the last `window` values (sliding Welford update) plus an
+    exponentially weighted moving average that tracks the recent level of the signal
+    """
+    __slots__ = ('window', 'alpha', 'values', 'pos', 'count', 'mean', 'm2', 'ewma', 'drifting')
+
+    def __init__(self, window: int, alpha: float):
+        self.window = window
+        self.alpha = alpha
+        self.values = [0.0] * window   # Ring buffer
+        self.pos = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0                  # Sum of squared deviations from the mean
+        self.ewma = 0.0
+        self.drifting = False          # Drift is reported once per episode, not per reading
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def push(self, x: float):
+        if self.count < self.window:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+            self.ewma = x if self.count == 1 else self.ewma + self.alpha * (x - self.ewma)
+        else:
+            # Replace the oldest value: add x and drop it in a single step
+            old = self.values[self.pos]
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 = max(self.m2 + (x - old) * (x - self.mean + old - old_mean), 0.0)
+            self.ewma += self.alpha * (x - self.ewma)
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+
+
+class AnomalyDetector:
+    def __init__(self, window: int = 120, warmup: int = 20, z_threshold: float = 4.0,
+                 drift_threshold: float = 3.5, ewma_alpha: float = 0.2, max_tourists: int = 100000):
+        """
+        Args:
+            window: Readings per signal kept as the baseline
+            warmup: Readings a signal needs before it can be flagged
+            z_threshold: Standard deviations from the window mean that make a reading a spike
+            drift_threshold: Distance between the EWMA and the window mean, in standard
+                errors of the EWMA, that counts as a sustained shift (EWMA control limit)
+            ewma_alpha: Weight of the newest reading in the EWMA
+            max_tourists: Tourists tracked at once; the least recently updated are dropped
+        """
+        self.window = window
+        self.warmup = min(warmup, window)
+        self.z_threshold = z_threshold
+        self.drift_threshold = drift_threshold
+        self.ewma_alpha = ewma_alpha
+        # Std of an EWMA over independent readings is std * sqrt(alpha / (2 - alpha))
+        self._ewma_std_factor = math.sqrt(ewma_alpha / (2 - ewma_alpha))
+        self.max_tourists = max_tourists
+        # tourist_id -> {signal name -> WindowStats}, in least recently updated order
+        self._tourists: "OrderedDict[str, Dict[str, WindowStats]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'readings': 0, 'anomalies': 0, 'evicted': 0}
+
+    @staticmethod
+    def readings(behavior_data: Optional[List[List[float]]] = None,
+                 health_data: Optional[Dict] = None) -> List[Tuple[str, float]]:
+        """
+        Flatten a tourist update into (signal, value) pairs, oldest first
+
+        behavior_data rows are samples of the same sensor vector, so column i becomes
+        signal 'behavior_i'; numeric health_data entries become signals by key
+        """
+        pairs = []
+        for row in behavior_data or []:
+            pairs.extend((f"behavior_{i}", float(value)) for i, value in enumerate(row))
+        for key, value in (health_data or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                pairs.append((key, float(value)))
+        return [(signal, value) for signal, value in pairs if math.isfinite(value)]
+
+    def observe(self, tourist_id: str, readings: Iterable[Tuple[str, float]]) -> List[Dict]:
+        """
+        Score each reading against the tourist's baseline, then add it to the baseline
+        (spikes are added clipped to the threshold)
+
+        Returns:
+            Flagged readings, with kind 'spike' (a single outlying value) or 'drift'
+            (the recent level moved away from the baseline)
+        """
+        anomalies = []
+        with self._lock:
+            signals = self._tourists.get(tourist_id)
+            if signals is None:
+                signals = self._tourists[tourist_id] = {}
+                if len(self._tourists) > self.max_tourists:
+                    self._tourists.popitem(last=False)
+                    self.stats['evicted'] += 1
+            else:
+                self._tourists.move_to_end(tourist_id)
+
+            count = 0
+            for signal, value in readings:
+                count += 1
+                stats = signals.get(signal)
+                if stats is None:
+                    stats = signals[signal] = WindowStats(self.window, self.ewma_alpha)
+
+                spike = False
+                baseline_value = value
+                if stats.count >= self.warmup:
+                    std = stats.std
+                    if std > 0:
+                        z_score = (value - stats.mean) / std
+                        spike = abs(z_score) >= self.z_threshold
+                        if spike:
+                            anomalies.append(self._flag('spike', signal, value, stats, z_score))
+                            # Clip the outlier so one spike does not blow up the baseline variance
+                            baseline_value = stats.mean + math.copysign(self.z_threshold * std, z_score)
+                stats.push(baseline_value)
+
+                # A spike also jerks the EWMA, so drift is only judged on ordinary readings
+                if stats.count >= self.warmup and not spike:
+                    std = stats.std
+                    drift = (stats.ewma - stats.mean) / (std * self._ewma_std_factor) if std > 0 else 0.0
+                    drifting = abs(drift) >= self.drift_threshold
+                    if drifting and not stats.drifting:
+                        anomalies.append(self._flag('drift', signal, value, stats, drift))
+                    stats.drifting = drifting
+
+            self.stats['readings'] += count
+            self.stats['anomalies'] += len(anomalies)
+        return anomalies
+
+    @staticmethod
+    def _flag(kind: str, signal: str, value: float, stats: WindowStats, z_score: float) -> Dict:
+        return {
+            'kind': kind,
+            'signal': signal,
+            'value': value,
+            'baseline_mean': round(stats.mean, 4),
+            'baseline_std': round(stats.std, 4),
+            'ewma': round(stats.ewma, 4),
+            'z_score': round(z_score, 2),
+            'timestamp': time.time(),
+        }
+
+    def forget(self, tourist_id: str):
+        with self._lock:
+            self._tourists.pop(tourist_id, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, tourists=len(self._tourists))
@@ -3,6 +3,7 @@ from typing import Dict
 from web3 import Web3
 from eth_account import Account
 from ..config import settings
+from .resilience import get_upstream
 
 # Minimal ABI for SafeRoveIdRegistry
 CONTRACT_ABI = [
@@ -30,6 +31,20 @@ CONTRACT_ABI = [
     },
 ]
 
+class GuardedHTTPProvider(Web3.HTTPProvider):
+    """
+    HTTP provider whose RPC requests go through the shared 'web3' circuit breaker
+    and respect the incoming request deadline
+    """
+    def __init__(self, endpoint_uri: str):
+        super().__init__(endpoint_uri, request_kwargs={"timeout": get_upstream("web3").timeout})
+
+    def make_request(self, method, params):
+        return get_upstream("web3").call(
+            super().make_request, method, params, pass_timeout=False, hedge=False
+        )
+
+
 _w3: Web3 | None = None
 _contract = None
 _account = None
@@ -46,7 +61,7 @@ def _init_web3():
     if not settings.BLOCKCHAIN_CONTRACT_ADDRESS:
         raise RuntimeError("Missing BLOCKCHAIN_CONTRACT_ADDRESS env")
 
-    _w3 = Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
+    _w3 = Web3(GuardedHTTPProvider(settings.BLOCKCHAIN_RPC_URL))
     if not _w3.is_connected():
         raise RuntimeError("Web3 failed to connect to RPC")
     addr = Web3.to_checksum_address(settings.BLOCKCHAIN_CONTRACT_ADDRESS)
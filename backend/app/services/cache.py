@@ -0,0 +1,141 @@
+"""
+Two-tier cache for enrichment data (NCRB, weather)
+An in-process L1 sits in front of an optional Redis L2 shared by all workers
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import logging
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_USE_SHARED_REDIS = object()
+
+# Payload header bytes: plain compact JSON or zlib-compressed compact JSON
+_RAW = b'j'
+_ZLIB = b'z'
+
+
+def dumps(value: Any, compress_threshold: int = 512) -> bytes:
+    """Serialize a JSON-compatible value into a compact byte payload"""
+    body = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if len(body) >= compress_threshold:
+        return _ZLIB + zlib.compress(body, 6)
+    return _RAW + body
+
+
+def loads(payload: bytes) -> Any:
+    """Inverse of dumps()"""
+    header, body = payload[:1], payload[1:]
+    if header == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body.decode('utf-8'))
+
+
+class TwoTierCache:
+    def __init__(self, namespace: str, ttl: int, l1_ttl: Optional[int] = None,
+                 l1_max_entries: int = 2048, redis_client: Any = _USE_SHARED_REDIS):
+        """
+        Args:
+            namespace: Key prefix in Redis, e.g. 'ncrb' or 'weather'
+            ttl: Lifetime of an entry in seconds (applied to Redis)
+            l1_ttl: Lifetime of the in-process copy, defaults to ttl
+            l1_max_entries: LRU bound for the in-process tier
+            redis_client: Redis client to use; None disables L2, default uses REDIS_URL
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.l1_ttl = min(l1_ttl or ttl, ttl)
+        self.l1_max_entries = l1_max_entries
+        self.redis = get_redis() if redis_client is _USE_SHARED_REDIS else redis_client
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._l2_retry_at = 0.0
+        self.stats = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'l2_errors': 0}
+
+    def _redis_key(self, key: str) -> str:
+        return f"saferove:{self.namespace}:{key}"
+
+    def _l2_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._l2_retry_at
+
+    def _l2_failed(self, e: Exception):
+        # Back off for a while so a dead Redis does not add latency to every lookup
+        self.stats['l2_errors'] += 1
+        self._l2_retry_at = time.monotonic() + 30
+        logger.warning(f"Redis cache '{self.namespace}' unavailable: {e}")
+
+    def _l1_put(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None on a miss"""
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._l1.move_to_end(key)
+                    self.stats['l1_hits'] += 1
+                    return entry[1]
+                del self._l1[key]
+
+        if self._l2_available():
+            try:
+                redis_key = self._redis_key(key)
+                pipe = self.redis.pipeline()
+                pipe.get(redis_key)
+                pipe.pttl(redis_key)
+                payload, remaining_ms = pipe.execute()
+                if payload is not None:
+                    value = loads(payload)
+                    remaining = remaining_ms / 1000 if remaining_ms and remaining_ms > 0 else self.l1_ttl
+                    self._l1_put(key, value, min(self.l1_ttl, remaining))
+                    self.stats['l2_hits'] += 1
+                    return value
+            except Exception as e:
+                self._l2_failed(e)
+
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """
+        Store a JSON-compatible value in both tiers. The in-process copy is capped at l1_ttl
+        while Redis holds the entry; without Redis it is the only copy and lives for ttl
+        """
+        ttl = ttl or self.ttl
+        self._l1_put(key, value, min(self.l1_ttl, ttl) if self.redis is not None else ttl)
+        if self._l2_available():
+            try:
+                self.redis.set(self._redis_key(key), dumps(value), ex=int(ttl))
+            except Exception as e:
+                self._l2_failed(e)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._l1.pop(key, None)
+        if self._l2_available():
+            try:
+                self.redis.delete(self._redis_key(key))
+            except Exception as e:
+                self._l2_failed(e)
+
+    def clear_local(self):
+        """Drop the in-process tier only"""
+        with self._lock:
+            self._l1.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            l1_size = len(self._l1)
+        return dict(self.stats, l1_size=l1_size, l2_enabled=self.redis is not None)
@@ -0,0 +1,302 @@
+"""
+Real-time dashboard fan-out
+Alerts, EFIRs and metrics are published to a Redis channel so every worker sees
+them; each worker batches what arrived during a short tick into one frame and
+hands it to per-connection send queues, so publishing costs one PUBLISH no matter
+how many dashboards are open and a slow dashboard only ever hurts itself.
+Periodic per-worker state (e.g. metrics) is published with the worker's id and
+combined across workers before it reaches a dashboard
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .alerts import AlertChannel
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_USE_SHARED_REDIS = object()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):   # numpy scalars and arrays
+        return value.tolist()
+    return str(value)
+
+
+class _Connection:
+    """A dashboard websocket with its own bounded queue of frames and a sender task"""
+
+    def __init__(self, ws, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0              # Frames dropped in a row because the queue was full
+        self.total_dropped = 0
+        self.closed = False
+
+    def offer(self, frame: str) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.total_dropped += 1
+            return False
+        self.dropped = 0
+        return True
+
+    async def send_loop(self):
+        try:
+            while True:
+                await self.ws.send_text(await self.queue.get())
+        except Exception:
+            # Disconnected; serve() notices on its next receive
+            self.closed = True
+
+
+class DashboardHub:
+    def __init__(self, channel: str = 'saferove:dashboard', tick: float = 0.25, queue_size: int = 64,
+                 max_dropped: int = 20, max_pending: int = 10000, redis_client: Any = _USE_SHARED_REDIS):
+        """
+        Args:
+            channel: Redis pub/sub channel shared by all workers
+            tick: Seconds between batched frames sent to dashboards
+            queue_size: Frames a dashboard may have waiting before new frames are dropped for it
+            max_dropped: Consecutive dropped frames after which a dashboard is disconnected
+            max_pending: Events held for the next tick; more are dropped
+            redis_client: Redis client; None keeps events within this worker
+        """
+        self.channel = channel
+        self.tick = tick
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self.max_pending = max_pending
+        self.redis = get_redis() if redis_client is _USE_SHARED_REDIS else redis_client
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._connections: List[_Connection] = []
+        # Serialized events received since the last tick; keyed events keep only the latest
+        self._pending: List[str] = []
+        self._pending_keyed: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._periodic: List[tuple] = []
+        # event type -> (combine, max_age); latest data of each worker and the types changed since the last tick
+        self._combiners: Dict[str, tuple] = {}
+        self._shards: Dict[str, Dict[str, tuple]] = {}
+        self._changed: set = set()
+        self._ticker: Optional[asyncio.Task] = None
+        self.stats = {'published': 0, 'publish_errors': 0, 'received': 0, 'events_dropped': 0, 'frames': 0,
+                      'frames_dropped': 0, 'slow_disconnects': 0}
+
+    def publish(self, event_type: str, data: Dict, key: Optional[str] = None):
+        """
+        Broadcast an event to every dashboard on every worker; never waits for dashboards
+
+        Args:
+            key: Events with the same key replace each other within a tick (e.g. 'metrics')
+        """
+        message = json.dumps({'type': event_type, 'key': key, 'data': data, 'worker': self.worker_id,
+                              'published_at': time.time()}, default=_json_default)
+        self.stats['published'] += 1
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, message)
+                return
+            except Exception as e:
+                self.stats['publish_errors'] += 1
+                logger.warning(f"Dashboard publish to Redis failed, delivering locally: {e}")
+        self._receive(message, key)
+
+    def _receive(self, message: str, key: Optional[str] = None):
+        event_type = key.partition(':')[0] if key is not None else None
+        if event_type in self._combiners:
+            event = json.loads(message)
+            with self._pending_lock:
+                self.stats['received'] += 1
+                self._shards.setdefault(event_type, {})[event.get('worker')] = (event['published_at'], event['data'])
+                self._changed.add(event_type)
+            return
+        with self._pending_lock:
+            self.stats['received'] += 1
+            if key is not None:
+                # Latest keyed state is kept even with nobody connected, for the next dashboard
+                self._pending_keyed[key] = message
+            elif self._connections and len(self._pending) < self.max_pending:
+                self._pending.append(message)
+            else:
+                self.stats['events_dropped'] += 1
+
+    def _listen(self):
+        """Forward messages from the Redis channel into this worker's pending batch"""
+        while not self._stop.is_set():
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    data = message['data']
+                    data = data.decode() if isinstance(data, bytes) else data
+                    self._receive(data, json.loads(data).get('key'))
+                pubsub.close()
+            except Exception as e:
+                logger.warning(f"Dashboard subscription lost, resubscribing: {e}")
+                self._stop.wait(1.0)
+
+    def _run_periodic(self, event_type: str, fn: Callable[[], Dict], interval: float):
+        while not self._stop.wait(interval):
+            try:
+                if event_type in self._combiners:
+                    self.publish(event_type, fn(), key=f"{event_type}:{self.worker_id}")
+                else:
+                    self.publish(event_type, fn(), key=event_type)
+            except Exception as e:
+                logger.error(f"Periodic dashboard update '{event_type}' failed: {e}")
+
+    def add_periodic(self, event_type: str, fn: Callable[[], Dict], interval: float,
+                     combine: Optional[Callable[[List[Dict]], Dict]] = None):
+        """
+        Publish fn() as a keyed event every `interval` seconds once the hub is started
+
+        Args:
+            combine: For per-worker data: dashboards then get combine([data of each worker]),
+                from every worker heard from in the last three intervals
+        """
+        self._periodic.append((event_type, fn, interval))
+        if combine is not None:
+            self._combiners[event_type] = (combine, 3 * interval)
+
+    def _combined_events(self) -> List[str]:
+        """One event per changed per-worker type, combined over the workers still publishing (lock held)"""
+        now = time.time()
+        events = []
+        for event_type in self._changed:
+            combine, max_age = self._combiners[event_type]
+            shards = self._shards[event_type]
+            for worker in [w for w, (published_at, _) in shards.items() if published_at < now - max_age]:
+                del shards[worker]
+            try:
+                data = combine([data for _, data in shards.values()])
+            except Exception as e:
+                logger.error(f"Combining dashboard '{event_type}' from {len(shards)} workers failed: {e}")
+                continue
+            events.append(json.dumps({'type': event_type, 'key': event_type, 'data': data, 'workers': len(shards),
+                                      'published_at': now}, default=_json_default))
+        self._changed = set()
+        return events
+
+    def start(self):
+        """Subscribe to the Redis channel and start the periodic publishers"""
+        if self._threads:
+            return
+        self._stop.clear()
+        if self.redis is not None:
+            self._threads.append(threading.Thread(target=self._listen, name='dashboard-listener', daemon=True))
+        for event_type, fn, interval in self._periodic:
+            self._threads.append(threading.Thread(target=self._run_periodic, args=(event_type, fn, interval),
+                                                  name=f"dashboard-{event_type}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        self._threads = []
+
+    def _take_batch(self) -> Optional[str]:
+        with self._pending_lock:
+            events = self._pending + list(self._pending_keyed.values()) + self._combined_events()
+            self._pending = []
+            self._pending_keyed = {}
+        if not events:
+            return None
+        # Events are already JSON, so the frame is assembled once without re-encoding them
+        return '{"type": "batch", "events": [' + ','.join(events) + ']}'
+
+    def broadcast_pending(self) -> int:
+        """Send everything received since the last tick as one frame; returns dashboards reached"""
+        frame = self._take_batch()
+        if frame is None:
+            return 0
+        self.stats['frames'] += 1
+        reached = 0
+        for connection in list(self._connections):
+            if connection.offer(frame):
+                reached += 1
+                continue
+            self.stats['frames_dropped'] += 1
+            if connection.dropped >= self.max_dropped and not connection.closed:
+                connection.closed = True
+                self._connections.remove(connection)
+                self.stats['slow_disconnects'] += 1
+                logger.warning(f"Disconnecting slow dashboard after {connection.dropped} dropped frames")
+                asyncio.ensure_future(self._close(connection))
+        return reached
+
+    async def _close(self, connection: _Connection):
+        try:
+            # 1013: try again later
+            await connection.ws.close(code=1013)
+        except Exception:
+            pass
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                self.broadcast_pending()
+            except Exception as e:
+                logger.error(f"Dashboard broadcast failed: {e}")
+
+    def _ensure_ticker(self):
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.get_running_loop().create_task(self._tick_loop())
+
+    async def serve(self, ws):
+        """Serve an accepted dashboard websocket until it disconnects"""
+        self._ensure_ticker()
+        connection = _Connection(ws, self.queue_size)
+        self._connections.append(connection)
+        sender = asyncio.create_task(connection.send_loop())
+        try:
+            await ws.send_json({"type": "hello", "message": "connected"})
+            while not connection.closed:
+                # Dashboards do not send anything meaningful; reading detects the disconnect
+                await ws.receive_text()
+        except Exception:
+            pass
+        finally:
+            sender.cancel()
+            if connection in self._connections:
+                self._connections.remove(connection)
+
+    def get_stats(self) -> Dict:
+        with self._pending_lock:
+            pending = len(self._pending) + len(self._pending_keyed) + len(self._changed)
+            workers = {event_type: len(shards) for event_type, shards in self._shards.items()}
+        return dict(self.stats, connections=len(self._connections), pending=pending,
+                    shared=self.redis is not None, worker_id=self.worker_id, workers=workers,
+                    queued_frames=sum(c.queue.qsize() for c in self._connections))
+
+
+class DashboardChannel(AlertChannel):
+    """Alert delivery to the live dashboards, next to SMS, push and webhooks"""
+    name = 'dashboard'
+
+    def __init__(self, hub: DashboardHub):
+        self.hub = hub
+
+    def send(self, alert: Dict, message: str):
+        self.hub.publish('alert', dict(alert, message=message))
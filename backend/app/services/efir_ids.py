@@ -0,0 +1,164 @@
+"""
+Collision-free EFIR numbering
+Snowflake-style 64-bit ids: milliseconds since 2024-01-01 UTC (41 bits), a worker
+id (10 bits) and a per-millisecond sequence (12 bits). Ids from one worker are
+strictly increasing, ids from different workers can never collide, and the time an
+id was issued can be read back from it. Worker ids are leased in Redis when it is
+configured, so every API worker gets its own without any manual setup; without
+Redis each worker locks the first free lease file in a directory on the host
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Optional
+import logging
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_USE_SHARED_REDIS = object()
+
+EPOCH_MS = 1704067200000   # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+DEFAULT_LEASE_DIR = os.path.join(tempfile.gettempdir(), 'saferove-snowflake')
+
+
+def id_timestamp(snowflake: int) -> float:
+    """Epoch seconds at which an id was issued"""
+    return ((snowflake >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000.0
+
+
+def id_worker(snowflake: int) -> int:
+    return (snowflake >> SEQUENCE_BITS) & MAX_WORKER_ID
+
+
+class SnowflakeIdGenerator:
+    def __init__(self, worker_id: Optional[int] = None, redis_client: Any = _USE_SHARED_REDIS,
+                 lease_key: str = 'saferove:snowflake-worker', lease_ttl: int = 3600,
+                 lease_dir: str = DEFAULT_LEASE_DIR):
+        """
+        Args:
+            worker_id: Fixed worker id (0-1023); by default leased from Redis, or without Redis
+                from a lock file in lease_dir (unique among the processes sharing lease_dir)
+            redis_client: Redis client used to lease worker ids; None disables Redis leasing
+            lease_key: Prefix of the Redis keys holding the leases
+            lease_ttl: Seconds a lease lasts; it is renewed while ids are being issued
+            lease_dir: Directory of the host-local lease files
+
+        Raises:
+            RuntimeError: No worker id is free
+        """
+        self.redis = get_redis() if redis_client is _USE_SHARED_REDIS else redis_client
+        self.lease_key = lease_key
+        self.lease_ttl = lease_ttl
+        self._token = uuid.uuid4().hex
+        self._renew_at = float('inf')
+        self._host_lease = None  # Locked lease file, held for the life of the process
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        self.stats = {'issued': 0, 'clock_behind': 0, 'sequence_overflows': 0, 'lease_renewals': 0}
+        if worker_id is not None:
+            if not 0 <= worker_id <= MAX_WORKER_ID:
+                raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+            self.worker_id = worker_id
+        else:
+            try:
+                self.worker_id = self._lease() if self.redis is not None else None
+            except Exception as e:
+                logger.warning(f"Could not lease a snowflake worker id from Redis: {e}")
+                self.redis = self.worker_id = None
+            if self.worker_id is None:
+                self.worker_id = self._lease_host(lease_dir)
+                logger.warning(f"No Redis worker id lease; using worker id {self.worker_id} from {lease_dir}. "
+                               "Set SNOWFLAKE_WORKER_ID per instance when instances on different hosts "
+                               "run without Redis, or EFIR numbers may collide")
+
+    def _lease(self, preferred: Optional[int] = None) -> int:
+        """Claim a free worker id in Redis, starting from a rotating counter"""
+        start = preferred if preferred is not None else self.redis.incr(f"{self.lease_key}:next") - 1
+        for i in range(MAX_WORKER_ID + 1):
+            candidate = (start + i) & MAX_WORKER_ID
+            if self.redis.set(f"{self.lease_key}:{candidate}", self._token, nx=True, ex=self.lease_ttl):
+                self._renew_at = time.monotonic() + self.lease_ttl / 3
+                return candidate
+        raise RuntimeError("All snowflake worker ids are leased")
+
+    def _lease_host(self, lease_dir: str) -> int:
+        """Claim the lowest worker id whose lease file no other process (or generator) has locked"""
+        os.makedirs(lease_dir, exist_ok=True)
+        for candidate in range(MAX_WORKER_ID + 1):
+            handle = open(os.path.join(lease_dir, f"worker-{candidate}.lock"), 'w')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                continue
+            self._host_lease = handle
+            return candidate
+        raise RuntimeError(f"All snowflake worker ids in {lease_dir} are leased")
+
+    def _renew(self):
+        key = f"{self.lease_key}:{self.worker_id}"
+        holder = self.redis.get(key)
+        holder = holder.decode() if isinstance(holder, bytes) else holder
+        if holder == self._token:
+            self.redis.expire(key, self.lease_ttl)
+            self._renew_at = time.monotonic() + self.lease_ttl / 3
+        else:
+            # Lapsed and possibly taken over while idle; ids issued from now on use the new worker id
+            self.worker_id = self._lease(self.worker_id)
+            logger.warning(f"Snowflake worker lease lapsed; now worker {self.worker_id}")
+        self.stats['lease_renewals'] += 1
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self.redis is not None and time.monotonic() >= self._renew_at:
+                try:
+                    self._renew()
+                except Exception as e:
+                    logger.warning(f"Snowflake worker lease renewal failed: {e}")
+            now_ms = int(time.time() * 1000) - EPOCH_MS
+            if now_ms < self._last_ms:
+                # Clock stepped back, or ids were borrowed from ahead: keep counting from the last one used
+                self.stats['clock_behind'] += 1
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    # Over 4096 ids this millisecond: borrow the next one instead of waiting
+                    self.stats['sequence_overflows'] += 1
+                    now_ms += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            self.stats['issued'] += 1
+            return (now_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def release(self):
+        """Give the worker id lease back, e.g. on shutdown"""
+        if self._host_lease is not None:
+            self._host_lease.close()
+            self._host_lease = None
+        if self.redis is None:
+            return
+        key = f"{self.lease_key}:{self.worker_id}"
+        try:
+            holder = self.redis.get(key)
+            if (holder.decode() if isinstance(holder, bytes) else holder) == self._token:
+                self.redis.delete(key)
+        except Exception as e:
+            logger.warning(f"Could not release snowflake worker lease: {e}")
+
+    def get_stats(self):
+        return dict(self.stats, worker_id=self.worker_id, leased=self.redis is not None,
+                    host_leased=self._host_lease is not None)
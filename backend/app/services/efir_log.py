@@ -0,0 +1,224 @@
+"""
+Durable append-only EFIR log
+EFIRs are appended to fixed-size segment files as length- and CRC-framed JSON
+records and never rewritten. An in-memory index maps each complaint number to its
+segment and offset (one pread per lookup) and keeps records ordered by time for
+range scans. The index is rebuilt from the segments on startup, and a record torn
+by a crash at the end of the last segment is cut off
+"""
+
+import bisect
+import fcntl
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Payload length and CRC32 of the payload
+_HEADER = struct.Struct('>II')
+_SUFFIX = '.seg'
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _timestamp(efir: Dict) -> float:
+    value = efir.get('date_time')
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    return datetime.now().timestamp()
+
+
+class EFIRLog:
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync: bool = True):
+        """
+        Args:
+            directory: Where segments live
+            segment_bytes: Size after which a new segment is started
+            fsync: Flush every append to disk before returning
+
+        Raises:
+            RuntimeError: Another process has the log open; a directory has a single writer
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # complaint_number -> (segment, offset of the header, payload length)
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        # Parallel lists ordered by EFIR time, for range scans
+        self._times: List[float] = []
+        self._numbers: List[str] = []
+        self._readers: Dict[int, int] = {}
+        self.stats = {'appended': 0, 'lookups': 0, 'scans': 0, 'segments_rolled': 0, 'truncated_bytes': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._dir_lock = open(os.path.join(directory, 'LOCK'), 'w')
+        try:
+            fcntl.flock(self._dir_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._dir_lock.close()
+            raise RuntimeError(f"EFIR log {directory} is open in another process")
+        segments = self._segments()
+        for segment in segments:
+            self._recover(segment, last=segment == segments[-1])
+        self._segment = segments[-1] if segments else 0
+        self._writer = open(self._path(self._segment), 'ab')
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}{_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(int(name[:-len(_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit())
+
+    def _recover(self, segment: int, last: bool):
+        """Index every intact record of a segment; a torn tail of the last segment is truncated"""
+        path = self._path(segment)
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            record = json.loads(payload)
+            self._add_to_index(record['complaint_number'], record['ts'], segment, offset, length)
+            offset += _HEADER.size + length
+        if offset < len(data):
+            if last:
+                logger.warning(f"Truncating {len(data) - offset} torn bytes at the end of {path}")
+                self.stats['truncated_bytes'] += len(data) - offset
+                with open(path, 'r+b') as f:
+                    f.truncate(offset)
+            else:
+                logger.error(f"Corrupt record at {path}:{offset}; the rest of the segment is not indexed")
+
+    def _add_to_index(self, number: str, ts: float, segment: int, offset: int, length: int):
+        self._index[number] = (segment, offset, length)
+        if not self._times or ts >= self._times[-1]:
+            self._times.append(ts)
+            self._numbers.append(number)
+        else:
+            # Out of order (clock step, or an EFIR dated in the past): rare, so an O(n) insert is fine
+            i = bisect.bisect_right(self._times, ts)
+            self._times.insert(i, ts)
+            self._numbers.insert(i, number)
+
+    def append(self, efir: Dict):
+        """Store an EFIR; raises ValueError if its complaint number is already in the log"""
+        self.append_many([efir])
+
+    def append_many(self, efirs: Iterable[Dict]):
+        """Store several EFIRs with one write and one fsync"""
+        with self._lock:
+            batch, entries, seen = [], [], set()
+            offset = self._writer.tell()
+            for efir in efirs:
+                number = efir['complaint_number']
+                if number in self._index or number in seen:
+                    raise ValueError(f"EFIR {number} is already in the log")
+                seen.add(number)
+                ts = _timestamp(efir)
+                payload = json.dumps({'complaint_number': number, 'ts': ts, 'efir': efir},
+                                     default=_json_default, separators=(',', ':')).encode()
+                batch.append(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                entries.append((number, ts, offset, len(payload)))
+                offset += _HEADER.size + len(payload)
+            if not batch:
+                return
+            self._writer.write(b''.join(batch))
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            for number, ts, record_offset, length in entries:
+                self._add_to_index(number, ts, self._segment, record_offset, length)
+            self.stats['appended'] += len(entries)
+            if offset >= self.segment_bytes:
+                self._roll()
+
+    def _roll(self):
+        self._writer.close()
+        self._segment += 1
+        self._writer = open(self._path(self._segment), 'ab')
+        self.stats['segments_rolled'] += 1
+
+    def _read(self, location: Tuple[int, int, int]) -> Dict:
+        segment, offset, length = location
+        with self._lock:
+            fd = self._readers.get(segment)
+            if fd is None:
+                fd = self._readers[segment] = os.open(self._path(segment), os.O_RDONLY)
+        payload = os.pread(fd, length, offset + _HEADER.size)
+        return json.loads(payload)['efir']
+
+    def get(self, complaint_number: str) -> Optional[Dict]:
+        self.stats['lookups'] += 1
+        location = self._index.get(complaint_number)
+        return self._read(location) if location is not None else None
+
+    def scan(self, start: Optional[float] = None, end: Optional[float] = None, limit: int = 100,
+             newest_first: bool = False) -> List[Dict]:
+        """EFIRs dated in [start, end) epoch seconds, in time order, at most `limit` of them"""
+        self.stats['scans'] += 1
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self._times, start)
+            hi = len(self._times) if end is None else bisect.bisect_left(self._times, end)
+            numbers = self._numbers[max(lo, hi - limit):hi][::-1] if newest_first else self._numbers[lo:min(hi, lo + limit)]
+            locations = [self._index[number] for number in numbers]
+        return [self._read(location) for location in locations]
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Every EFIR in time order, read one at a time"""
+        with self._lock:
+            locations = [self._index[number] for number in self._numbers]
+        for location in locations:
+            yield self._read(location)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, complaint_number: str) -> bool:
+        return complaint_number in self._index
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers = {}
+            self._dir_lock.close()
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, efirs=len(self._index), segment=self._segment, directory=self.directory)
+
+
+def open_worker_log(directory: str, fsync: bool = True, max_workers: int = 1024, **kwargs) -> EFIRLog:
+    """
+    Open the EFIR log of this worker: `directory` itself if no other process has it,
+    otherwise the first free `worker-N` subdirectory. The Nth worker to start always
+    gets the same directory, so a restarted worker reopens the EFIRs it wrote before
+
+    Raises:
+        RuntimeError: Every directory is held by another process
+    """
+    for n in range(max_workers):
+        path = directory if n == 0 else os.path.join(directory, f"worker-{n}")
+        try:
+            return EFIRLog(path, fsync=fsync, **kwargs)
+        except RuntimeError:
+            continue
+    raise RuntimeError(f"No free EFIR log directory under {directory}")
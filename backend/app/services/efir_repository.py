@@ -0,0 +1,249 @@
+"""
+MongoDB storage of EFIRs for police dashboards
+Generated EFIRs are buffered and written with unordered insert_many batches from
+a background thread, so EFIR generation never waits for the database. Queries use
+compound indexes on (status, date_time) and tourist_id, keyset pagination (no
+skip) and a projection of summary fields unless more are asked for
+"""
+
+import base64
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Returned by query() unless other fields are requested
+SUMMARY_FIELDS = ('complaint_number', 'date_time', 'status', 'tourist_id', 'incident_type', 'severity')
+# Fields a query may ask for; evidence and personal details stay behind get()
+QUERYABLE_FIELDS = SUMMARY_FIELDS + ('incident_details', 'location_details', 'investigating_officer')
+
+MAX_PAGE_SIZE = 200
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def to_document(efir: Dict) -> Dict:
+    """The EFIR with the fields queried on lifted to the top level and date_time as a BSON date"""
+    incident = efir.get('incident_details') or {}
+    return dict(
+        efir,
+        _id=efir['complaint_number'],
+        date_time=_as_datetime(efir['date_time']),
+        tourist_id=(efir.get('complainant_details') or {}).get('tourist_id') or None,
+        incident_type=incident.get('type'),
+        severity=incident.get('severity'),
+    )
+
+
+def _from_document(document: Dict) -> Dict:
+    document = dict(document)
+    document.pop('_id', None)
+    if isinstance(document.get('date_time'), datetime):
+        document['date_time'] = document['date_time'].isoformat()
+    return document
+
+
+def _encode_cursor(document: Dict) -> str:
+    raw = f"{document['date_time'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        date_time, _, number = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+        return datetime.fromisoformat(date_time), number
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class EFIRRepository:
+    def __init__(self, collection, batch_size: int = 500, flush_interval: float = 0.5, max_pending: int = 50000):
+        """
+        Args:
+            collection: pymongo (or mongomock) collection holding the EFIRs
+            batch_size: Most EFIRs per insert_many
+            flush_interval: Seconds between background flushes
+            max_pending: EFIRs held while the database is unreachable; older ones are dropped beyond that
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict] = {}   # complaint_number -> document, in insertion order
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'buffered': 0, 'written': 0, 'duplicates': 0, 'batches': 0, 'write_errors': 0, 'dropped': 0}
+
+    def ensure_indexes(self):
+        from pymongo import ASCENDING, DESCENDING
+        self.collection.create_index([('status', ASCENDING), ('date_time', DESCENDING), ('_id', DESCENDING)],
+                                     name='status_date_time')
+        self.collection.create_index([('date_time', DESCENDING), ('_id', DESCENDING)], name='date_time')
+        self.collection.create_index([('tourist_id', ASCENDING), ('date_time', DESCENDING)], name='tourist_id')
+
+    def add(self, efir: Dict):
+        """Buffer an EFIR for the next bulk write; never blocks on the database"""
+        document = to_document(efir)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._pending.pop(next(iter(self._pending)))
+                self.stats['dropped'] += 1
+                logger.error("EFIR write buffer full; dropped the oldest unwritten EFIR")
+            self._pending[document['_id']] = document
+            self.stats['buffered'] += 1
+            full = len(self._pending) >= self.batch_size
+        if full and self._thread is None:
+            # No background flusher (e.g. scripts and tests): write as soon as a batch is ready
+            self.flush()
+
+    def add_many(self, efirs: Iterable[Dict]):
+        for efir in efirs:
+            self.add(efir)
+
+    def flush(self) -> int:
+        """Write everything buffered in batch_size chunks; returns how many were written"""
+        from pymongo.errors import BulkWriteError, PyMongoError
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(self._pending.values())[:self.batch_size]
+                if not batch:
+                    return written
+                try:
+                    result = self.collection.insert_many(batch, ordered=False)
+                    inserted = len(result.inserted_ids)
+                except BulkWriteError as e:
+                    # Duplicate keys come from a retried batch that was partly written: already stored
+                    errors = e.details.get('writeErrors', [])
+                    other = [err for err in errors if err.get('code') != 11000]
+                    if other:
+                        self.stats['write_errors'] += 1
+                        logger.error(f"EFIR bulk write failed for {len(other)} documents: {other[0].get('errmsg')}")
+                    self.stats['duplicates'] += len(errors) - len(other)
+                    inserted = e.details.get('nInserted', 0)
+                except PyMongoError as e:
+                    self.stats['write_errors'] += 1
+                    logger.warning(f"EFIR bulk write failed, retrying on the next flush: {e}")
+                    return written
+                with self._lock:
+                    for document in batch:
+                        self._pending.pop(document['_id'], None)
+                self.stats['batches'] += 1
+                self.stats['written'] += inserted
+                written += inserted
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"EFIR flush failed: {e}")
+
+    def start(self):
+        """Create the indexes and start flushing in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        try:
+            self.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create EFIR indexes: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='efir-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background writer and write what is still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def get(self, complaint_number: str) -> Optional[Dict]:
+        """A whole EFIR, including one not written yet"""
+        with self._lock:
+            document = self._pending.get(complaint_number)
+        if document is None:
+            document = self.collection.find_one({'_id': complaint_number})
+        return _from_document(document) if document is not None else None
+
+    def get_many(self, complaint_numbers: List[str]) -> Dict[str, Dict]:
+        """Whole EFIRs by complaint number, in one round trip; unknown numbers are left out"""
+        with self._lock:
+            found = {n: self._pending[n] for n in complaint_numbers if n in self._pending}
+        missing = [n for n in complaint_numbers if n not in found]
+        if missing:
+            found.update((d['_id'], d) for d in self.collection.find({'_id': {'$in': missing}}))
+        return {number: _from_document(document) for number, document in found.items()}
+
+    def iter_since(self, since: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """Every stored EFIR dated at or after `since` (all of them by default), oldest first"""
+        match = {'date_time': {'$gte': since}} if since is not None else {}
+        for document in self.collection.find(match).sort([('date_time', 1), ('_id', 1)]).batch_size(batch_size):
+            yield _from_document(document)
+
+    def query(self, status: Optional[str] = None, tourist_id: Optional[str] = None, start=None, end=None,
+              limit: int = 50, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+        """
+        A page of EFIRs, newest first
+
+        Args:
+            start, end: date_time range [start, end), as datetimes or ISO strings
+            cursor: next_cursor of the previous page
+            fields: Fields to return (from QUERYABLE_FIELDS); the summary fields by default
+
+        Returns:
+            {'efirs': [...], 'next_cursor': str or None}
+
+        Raises:
+            ValueError: Bad limit, cursor or field
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        fields = list(fields or SUMMARY_FIELDS)
+        unknown = set(fields) - set(QUERYABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        match: Dict = {}
+        if status is not None:
+            match['status'] = status
+        if tourist_id is not None:
+            match['tourist_id'] = tourist_id
+        if start is not None or end is not None:
+            match['date_time'] = {}
+            if start is not None:
+                match['date_time']['$gte'] = _as_datetime(start)
+            if end is not None:
+                match['date_time']['$lt'] = _as_datetime(end)
+        if cursor is not None:
+            # Keyset pagination: strictly after the last (date_time, _id) of the previous page
+            date_time, number = _decode_cursor(cursor)
+            match = {'$and': [match, {'$or': [{'date_time': {'$lt': date_time}},
+                                              {'date_time': date_time, '_id': {'$lt': number}}]}]}
+
+        projection = {field: 1 for field in fields}
+        projection['date_time'] = 1
+        documents = list(self.collection.find(match, projection)
+                         .sort([('date_time', -1), ('_id', -1)]).limit(limit + 1))
+        next_cursor = _encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        efirs = []
+        for document in documents[:limit]:
+            efir = _from_document(document)
+            efir['complaint_number'] = document['_id']
+            efirs.append({field: efir.get(field) for field in fields})
+        return {'efirs': efirs, 'next_cursor': next_cursor}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.stats, pending=pending)
@@ -0,0 +1,277 @@
+"""
+Full-text search over EFIRs
+An in-memory inverted index over incident descriptions and circumstances, updated
+as each EFIR is generated. Postings (document number, term frequency) and
+per-document columns (length, time, type, severity) live in growable numpy arrays,
+so a query scores every matching EFIR with BM25 in a few vectorized passes and
+filters by type, severity and time with array masks before taking the top hits.
+With several workers, each index also follows the shared EFIR repository so it
+covers EFIRs generated by the other workers
+"""
+
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be been by for from had has have he her his in is it its of on or she that the their "
+    "they this to was were which with".split()
+)
+MAX_RESULTS = 100
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _epoch(value) -> float:
+    """Epoch seconds from a datetime, a number or an ISO / numeric string"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+class _Column:
+    """Append-only numpy array with amortized O(1) appends; views taken earlier stay valid"""
+
+    def __init__(self, dtype, capacity: int = 4):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            grown = np.zeros(len(self.data) * 2, dtype=self.data.dtype)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class EFIRSearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._numbers: List[str] = []                 # document number -> complaint number
+        self._known: Dict[str, int] = {}
+        self._postings: Dict[str, tuple] = {}         # term -> (document numbers, term frequencies)
+        self._lengths = _Column(np.uint32, 1024)
+        self._times = _Column(np.float64, 1024)
+        self._types = _Column(np.uint16, 1024)
+        self._severities = _Column(np.uint16, 1024)
+        # Interned incident types and severities, filtered on by code
+        self._codes: Dict[str, Dict[str, int]] = {'type': {}, 'severity': {}}
+        self._labels: Dict[str, List[str]] = {'type': [], 'severity': []}
+        self._total_length = 0
+        self.stats = {'indexed': 0, 'duplicates': 0, 'searches': 0, 'syncs': 0, 'sync_errors': 0}
+        # Followed EFIR repository (None: this worker's EFIRs only) and how far it has been read
+        self.repository = None
+        self._synced_to: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _code(self, kind: str, label: str) -> int:
+        codes = self._codes[kind]
+        if label not in codes:
+            codes[label] = len(codes)
+            self._labels[kind].append(label)
+        return codes[label]
+
+    @staticmethod
+    def _text(efir: Dict) -> str:
+        incident = efir.get('incident_details') or {}
+        description = incident.get('description') or ''
+        circumstances = incident.get('circumstances') or ''
+        # Generated descriptions already end with the circumstances; don't count them twice
+        return description if circumstances in description else f"{description} {circumstances}"
+
+    def add(self, efir: Dict) -> bool:
+        """Index an EFIR; returns False if its complaint number is already indexed"""
+        number = efir['complaint_number']
+        incident = efir.get('incident_details') or {}
+        terms: Dict[str, int] = {}
+        for token in tokenize(self._text(efir)):
+            terms[token] = terms.get(token, 0) + 1
+        timestamp = _epoch(efir['date_time']) if efir.get('date_time') else datetime.now().timestamp()
+
+        with self._lock:
+            if number in self._known:
+                self.stats['duplicates'] += 1
+                return False
+            document = len(self._numbers)
+            self._known[number] = document
+            self._numbers.append(number)
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._times.append(timestamp)
+            self._types.append(self._code('type', str(incident.get('type', ''))))
+            self._severities.append(self._code('severity', str(incident.get('severity', ''))))
+            for term, frequency in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (_Column(np.uint32), _Column(np.uint16))
+                postings[0].append(document)
+                postings[1].append(min(frequency, 65535))
+            self._total_length += length
+            self.stats['indexed'] += 1
+        return True
+
+    def add_many(self, efirs: Iterable[Dict]) -> int:
+        return sum(self.add(efir) for efir in efirs)
+
+    def sync(self, repository, overlap: float = 60.0) -> int:
+        """
+        Index what the repository has that this index does not: everything on the first
+        call, then EFIRs dated from `overlap` seconds before the newest one seen, which
+        covers EFIRs other workers flush late. Returns how many were new
+        """
+        since = self._synced_to - timedelta(seconds=overlap) if self._synced_to is not None else None
+        added, newest = 0, self._synced_to
+        for efir in repository.iter_since(since):
+            added += self.add(efir)
+            date_time = datetime.fromisoformat(str(efir['date_time']).replace('Z', '+00:00'))
+            if newest is None or date_time > newest:
+                newest = date_time
+        self._synced_to = newest
+        self.repository = repository
+        self.stats['syncs'] += 1
+        return added
+
+    def _follow(self, repository, interval: float):
+        while True:
+            try:
+                self.sync(repository)
+            except Exception as e:
+                self.stats['sync_errors'] += 1
+                logger.warning(f"EFIR search sync failed: {e}")
+            if self._stop.wait(interval):
+                return
+
+    def start(self, repository, interval: float = 5.0):
+        """Follow the repository in the background: a full catch-up first, then every `interval` seconds"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.repository = repository
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, args=(repository, interval), name='efir-search-sync',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def search(self, query: str, incident_type: Optional[str] = None, severity: Optional[str] = None,
+               start=None, end=None, limit: int = 20, match_all: bool = False) -> Dict:
+        """
+        EFIRs matching a free-text query, best first
+
+        Args:
+            incident_type, severity: Only EFIRs with this type / severity
+            start, end: Only EFIRs dated in [start, end), as datetimes, epoch seconds or ISO strings
+            match_all: Require every query term instead of any
+
+        Returns:
+            {'total': matching EFIRs, 'hits': [{'complaint_number', 'score', 'date_time',
+            'incident_type', 'severity'}, ...]}
+
+        Raises:
+            ValueError: Empty query or bad limit
+        """
+        if not 1 <= limit <= MAX_RESULTS:
+            raise ValueError(f"limit must be between 1 and {MAX_RESULTS}")
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            raise ValueError("Query has no searchable words")
+        start = _epoch(start) if start is not None else None
+        end = _epoch(end) if end is not None else None
+
+        with self._lock:
+            self.stats['searches'] += 1
+            n = len(self._numbers)
+            # Snapshot views; documents indexed after this point are not seen by this search
+            postings = [(p[0].view(), p[1].view()) for p in (self._postings.get(t) for t in terms) if p is not None]
+            lengths, times = self._lengths.view(), self._times.view()
+            types, severities = self._types.view(), self._severities.view()
+            type_code = self._codes['type'].get(incident_type) if incident_type is not None else None
+            severity_code = self._codes['severity'].get(severity) if severity is not None else None
+            average_length = self._total_length / n if n else 0.0
+        empty = {'total': 0, 'hits': []}
+        if (not postings or (match_all and len(postings) < len(terms))
+                or (incident_type is not None and type_code is None)
+                or (severity is not None and severity_code is None)):
+            return empty
+
+        # BM25 contribution of every posting of every query term
+        documents, scores = [], []
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(average_length, 1e-9))
+        for ids, frequencies in postings:
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            tf = frequencies.astype(np.float64)
+            documents.append(ids)
+            scores.append(idf * tf * (self.k1 + 1) / (tf + norm[ids]))
+        if len(postings) == 1:
+            candidates, totals, matched = documents[0], scores[0], None
+        else:
+            ids = np.concatenate(documents)
+            candidates, inverse, matched = np.unique(ids, return_inverse=True, return_counts=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores), minlength=len(candidates))
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if match_all and matched is not None:
+            keep &= matched == len(terms)
+        if type_code is not None:
+            keep &= types[candidates] == type_code
+        if severity_code is not None:
+            keep &= severities[candidates] == severity_code
+        if start is not None:
+            keep &= times[candidates] >= start
+        if end is not None:
+            keep &= times[candidates] < end
+        candidates, totals = candidates[keep], totals[keep]
+        if not len(candidates):
+            return empty
+
+        if len(candidates) > limit:
+            top = np.argpartition(-totals, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        # Best score first, newer EFIRs first among equal scores
+        top = top[np.lexsort((-candidates[top].astype(np.int64), -totals[top]))]
+        hits = [{
+            'complaint_number': self._numbers[candidates[i]],
+            'score': round(float(totals[i]), 4),
+            'date_time': datetime.fromtimestamp(times[candidates[i]]).isoformat(),
+            'incident_type': self._labels['type'][types[candidates[i]]],
+            'severity': self._labels['severity'][severities[candidates[i]]],
+        } for i in top]
+        return {'total': int(len(candidates)), 'hits': hits}
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            postings = sum(p[0].size for p in self._postings.values())
+            return dict(self.stats, efirs=len(self._numbers), terms=len(self._postings), postings=postings,
+                        scope='all_workers' if self.repository is not None else 'this_worker',
+                        synced_to=self._synced_to.isoformat() if self._synced_to is not None else None)
@@ -0,0 +1,120 @@
+"""
+Event and festival calendar
+Loads local events from a JSON file and answers "how much does what is on at
+this location right now add to tourist flow" in O(log n) per lookup
+"""
+
+import heapq
+import json
+import os
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_bound(value: str, is_end: bool) -> int:
+    """Naive wall-clock timestamp in ns; a date without a time covers the whole day"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    if is_end and len(value) <= 10:
+        ts += pd.Timedelta(days=1)
+    return ts.value
+
+
+class _IntervalIndex:
+    """
+    Overlapping [start, end) intervals flattened into disjoint segments, each holding
+    the highest impact of the events covering it, so a lookup is a single binary search
+    """
+    def __init__(self, events: List[Dict], default_score: int):
+        bounds = sorted({e['start'] for e in events} | {e['end'] for e in events})
+        self.breaks = np.asarray(bounds, dtype=np.int64)
+        # scores[i] covers [breaks[i-1], breaks[i]); scores[0] is before the first event
+        self.scores = np.full(len(bounds) + 1, default_score, dtype=np.int64)
+
+        ordered = sorted(events, key=lambda e: e['start'])
+        active = []  # max-heap of (-impact, end)
+        k = 0
+        for i, segment_start in enumerate(bounds):
+            while k < len(ordered) and ordered[k]['start'] <= segment_start:
+                heapq.heappush(active, (-ordered[k]['impact'], ordered[k]['end']))
+                k += 1
+            while active and active[0][1] <= segment_start:
+                heapq.heappop(active)
+            if active:
+                self.scores[i + 1] = -active[0][0]
+
+    def lookup(self, ns: np.ndarray) -> np.ndarray:
+        return self.scores[np.searchsorted(self.breaks, ns, side='right')]
+
+
+class EventCalendar:
+    def __init__(self, events: Optional[List[Dict]] = None, default_score: int = 5):
+        """
+        Args:
+            events: Dicts with 'name', 'start', 'end' (ISO 8601 dates or datetimes),
+                'impact' (1-10) and 'location_id' (omit or null for city-wide events)
+            default_score: Event score when nothing is on
+        """
+        self.default_score = default_score
+        self.events = []
+        for event in events or []:
+            try:
+                self.events.append({
+                    'name': event.get('name', ''),
+                    'location_id': event.get('location_id'),
+                    'start': _parse_bound(event['start'], is_end=False),
+                    'end': _parse_bound(event['end'], is_end=True),
+                    'impact': int(event['impact']),
+                })
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning(f"Skipping invalid calendar event {event}: {e}")
+
+        city_wide = [e for e in self.events if e['location_id'] is None]
+        by_location: Dict[int, List[Dict]] = {}
+        for event in self.events:
+            if event['location_id'] is not None:
+                by_location.setdefault(event['location_id'], []).append(event)
+
+        self._city_wide_index = _IntervalIndex(city_wide, default_score)
+        self._indexes = {
+            location_id: _IntervalIndex(events + city_wide, default_score)
+            for location_id, events in by_location.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str, default_score: int = 5) -> 'EventCalendar':
+        """Load the calendar from a JSON list of events; an unreadable file gives an empty calendar"""
+        if not os.path.exists(path):
+            logger.warning(f"Event calendar {path} not found, using default event scores")
+            return cls([], default_score)
+        try:
+            with open(path) as f:
+                return cls(json.load(f), default_score)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading event calendar {path}: {e}")
+            return cls([], default_score)
+
+    def _index_for(self, location_id) -> _IntervalIndex:
+        return self._indexes.get(location_id, self._city_wide_index)
+
+    def score(self, location_id, timestamp) -> int:
+        """Event impact score (1-10) at a location and time"""
+        ts = pd.Timestamp(timestamp)
+        if ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return int(self._index_for(location_id).lookup(np.int64(ts.value)))
+
+    def scores(self, location_id, times: pd.DatetimeIndex) -> np.ndarray:
+        """Event scores for every timestamp of a DatetimeIndex in one vectorized lookup"""
+        if times.tz is not None:
+            times = times.tz_localize(None)
+        return self._index_for(location_id).lookup(times.as_unit('ns').asi8)
+
+    def get_stats(self) -> Dict:
+        return {'events': len(self.events), 'locations': len(self._indexes)}
@@ -0,0 +1,159 @@
+"""
+Workload executor for CPU-bound work called from async endpoints
+Model inference runs on bounded worker lanes instead of the event loop, so a
+slow crowd image or NLP pipeline no longer stalls every other request
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import logging
+
+from .resilience import propagate_deadline
+
+logger = logging.getLogger(__name__)
+
+THREAD = 'thread'
+PROCESS = 'process'
+
+_CPUS = os.cpu_count() or 2
+
+# Lane -> (pool kind, workers, queued jobs allowed beyond the running ones).
+# numpy, sklearn, OpenCV, dlib and torch release the GIL in their native code, so model
+# inference on in-memory models uses threads; the process lane is for picklable
+# module-level functions doing pure-Python CPU work.
+LANE_DEFAULTS = {
+    'inference': (THREAD, _CPUS, 64),   # Tabular sklearn models
+    'vision': (THREAD, 2, 8),           # Face verification, crowd analysis
+    'nlp': (THREAD, 2, 16),             # Translation and sentiment pipelines
+    'io': (THREAD, 4, 256),             # Durable writes: EFIR generation fsyncs the EFIR log
+    'cpu': (PROCESS, _CPUS, 32),
+}
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a lane's queue is full; callers should shed the request (HTTP 503)"""
+
+
+class _Lane:
+    def __init__(self, name: str, kind: str, workers: int, queue_size: int):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = None  # Created on first use; the process pool is costly to start
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'running': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                      'total_wait_ms': 0.0, 'max_wait_ms': 0.0}
+
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == PROCESS:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._pool
+
+    def _started(self, wait_ms: float):
+        with self._lock:
+            self.stats['running'] += 1
+            self.stats['total_wait_ms'] += wait_ms
+            self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_ms)
+
+    def _finished(self, ok: bool):
+        with self._lock:
+            self.stats['running'] -= 1
+            self.stats['completed' if ok else 'failed'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        started = stats['running'] + stats['completed'] + stats['failed']
+        stats['queued'] = stats['submitted'] - started
+        stats['avg_wait_ms'] = round(stats.pop('total_wait_ms') / started, 2) if started else 0.0
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 2)
+        return dict(stats, kind=self.kind, workers=self.workers, queue_size=self.queue_size)
+
+
+class WorkloadExecutor:
+    def __init__(self, lanes: Optional[Dict[str, tuple]] = None):
+        self.lanes = {name: _Lane(name, *config) for name, config in (lanes or LANE_DEFAULTS).items()}
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on a lane and await the result
+
+        Raises:
+            ExecutorSaturated if the lane already has workers + queue_size jobs
+        """
+        worker_lane = self.lanes[lane]
+        if not worker_lane._slots.acquire(blocking=False):
+            worker_lane.stats['rejected'] += 1
+            raise ExecutorSaturated(f"'{lane}' workers are saturated")
+        worker_lane.stats['submitted'] += 1
+
+        if worker_lane.kind == PROCESS:
+            job = _ProcessJob(fn, args, kwargs)
+            submitted_at = time.perf_counter()
+            worker_lane._started(0.0)  # Queue wait is not observable inside another process
+        else:
+            job = _ThreadJob(worker_lane, propagate_deadline(fn), args, kwargs)
+            submitted_at = None
+
+        ok = False
+        try:
+            future = worker_lane.pool().submit(job)
+            result = await asyncio.wrap_future(future)
+            ok = True
+            return result
+        finally:
+            if submitted_at is not None:
+                worker_lane._finished(ok)
+            worker_lane._slots.release()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            if lane._pool is not None:
+                lane._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ThreadJob:
+    """Callable submitted to a thread lane; records queue wait and running count"""
+    def __init__(self, lane: _Lane, fn: Callable, args, kwargs):
+        self.lane = lane
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.perf_counter()
+
+    def __call__(self):
+        self.lane._started((time.perf_counter() - self.submitted_at) * 1000)
+        ok = False
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+            ok = True
+            return result
+        finally:
+            self.lane._finished(ok)
+
+
+class _ProcessJob:
+    """Picklable callable for the process lane"""
+    def __init__(self, fn: Callable, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        return self.fn(*self.args, **self.kwargs)
+
+
+workload_executor = WorkloadExecutor()
@@ -0,0 +1,98 @@
+"""
+Precomputed tourist flow forecast
+Materializes TouristFlowPredictor predictions for every location over a rolling
+horizon so flow requests inside the horizon are an array lookup
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import pandas as pd
+
+from .quota import Priority, priority
+
+logger = logging.getLogger(__name__)
+
+ONE_HOUR = pd.Timedelta(hours=1)
+
+
+class FlowForecastTable:
+    def __init__(self, predictor, horizon_hours: int = 72, refresh_interval: float = 900):
+        """
+        Args:
+            predictor: TouristFlowPredictor used to compute the grid
+            horizon_hours: Hours ahead of the current hour to precompute
+            refresh_interval: Seconds between background refreshes
+        """
+        self.predictor = predictor
+        self.horizon_hours = horizon_hours
+        self.refresh_interval = refresh_interval
+        # (start hour, location_id -> row, grid) swapped as one tuple so readers never see a torn table
+        self._table = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'refreshes': 0, 'refresh_errors': 0, 'last_refresh_ms': None,
+                      'refreshed_at': None, 'hits': 0, 'misses': 0}
+
+    def location_ids(self) -> List[int]:
+        return sorted(set(self.predictor.DEFAULT_LOCATION_IDS) | set(self.predictor.location_coordinates))
+
+    def refresh(self):
+        """Recompute the whole table starting at the current hour"""
+        start = time.perf_counter()
+        location_ids = self.location_ids()
+        # Weather lookups for the refresh must not eat into the quota of interactive requests
+        with priority(Priority.BACKGROUND):
+            times, grid = self.predictor.predict_flow_grid(location_ids, datetime.now(), self.horizon_hours)
+        self._table = (times[0], {location_id: row for row, location_id in enumerate(location_ids)}, grid)
+
+        self.stats['refreshes'] += 1
+        self.stats['last_refresh_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.stats['refreshed_at'] = datetime.now().isoformat()
+
+    def lookup(self, location_id: int, timestamp) -> Optional[int]:
+        """
+        Precomputed flow for a location at a given time, or None if it is outside
+        the horizon (or the table has not been built yet) and must be predicted live
+        """
+        table = self._table
+        if table is not None:
+            start, rows, grid = table
+            dt = pd.to_datetime(timestamp)
+            row = rows.get(location_id)
+            if row is not None and dt.tzinfo is None:
+                offset = (dt.floor('h') - start) // ONE_HOUR
+                if 0 <= offset < grid.shape[1]:
+                    self.stats['hits'] += 1
+                    return int(grid[row, offset])
+        self.stats['misses'] += 1
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.stats['refresh_errors'] += 1
+                logger.error(f"Flow forecast refresh failed: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        """Build the table now and keep refreshing it on a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='flow-forecast', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_stats(self) -> Dict:
+        table = self._table
+        return dict(self.stats,
+                    horizon_start=table[0].isoformat() if table else None,
+                    locations=len(table[1]) if table else 0,
+                    horizon_hours=self.horizon_hours)
@@ -0,0 +1,137 @@
+"""
+Live tourist density heatmap
+Active tourist positions are binned into square lat/lng tiles (360 / 2**zoom degrees,
+split into cells_per_tile x cells_per_tile cells) with one vectorized bincount over the
+tiles a request is missing. Tiles are cached for the lifetime of the position snapshot
+they were computed from, so a national view over a million tourists costs one pass
+every `ttl` seconds however many dashboards are looking
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DensityHeatmap:
+    def __init__(self, store, ttl: float = 5.0, cells_per_tile: int = 32, max_tiles: int = 256,
+                 cache_tiles: int = 1024):
+        """
+        Args:
+            store: ActiveTouristStore to read positions from
+            ttl: Seconds a position snapshot, and the tiles binned from it, are reused
+            cells_per_tile: Grid cells along each side of a tile
+            max_tiles: Most tiles one request may cover
+            cache_tiles: Tiles kept per snapshot
+        """
+        self.store = store
+        self.ttl = ttl
+        self.cells_per_tile = cells_per_tile
+        self.max_tiles = max_tiles
+        self.cache_tiles = cache_tiles
+        self._lock = threading.Lock()
+        self._positions: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._taken_at = float('-inf')
+        self._tiles: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self.stats = {'requests': 0, 'snapshots': 0, 'tile_hits': 0, 'tile_misses': 0}
+
+    def _snapshot(self, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        if self._positions is None or now - self._taken_at >= self.ttl:
+            self._positions = self.store.positions()
+            self._taken_at = now
+            # Tiles from the previous snapshot would mix two points in time into one map
+            self._tiles.clear()
+            self.stats['snapshots'] += 1
+        return self._positions
+
+    def tile_range(self, south: float, west: float, north: float, east: float, zoom: int):
+        """Columns and rows of the tiles covering a bounding box"""
+        size = 360.0 / 2 ** zoom
+        columns = range(math.floor((west + 180) / size), math.ceil((east + 180) / size))
+        rows = range(math.floor((south + 90) / size), math.ceil((north + 90) / size))
+        return size, columns, rows
+
+    def _bin(self, lats: np.ndarray, lngs: np.ndarray, zoom: int, size: float, columns: range, rows: range):
+        """Counts of every tile in a block of tiles, from one pass over the positions"""
+        cell = size / self.cells_per_tile
+        west, south = columns.start * size - 180, rows.start * size - 90
+        nx, ny = len(columns) * self.cells_per_tile, len(rows) * self.cells_per_tile
+        ix = np.floor((lngs - west) / cell).astype(np.int64)
+        iy = np.floor((lats - south) / cell).astype(np.int64)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        counts = np.bincount(iy[inside] * nx + ix[inside], minlength=nx * ny).reshape(ny, nx).astype(np.int32)
+        c = self.cells_per_tile
+        return {(zoom, column, row): counts[j * c:(j + 1) * c, i * c:(i + 1) * c].copy()
+                for j, row in enumerate(rows) for i, column in enumerate(columns)}
+
+    def density(self, south: float, west: float, north: float, east: float, zoom: int,
+                now: Optional[float] = None) -> Dict:
+        """
+        Tourist counts per grid cell inside a bounding box
+
+        Returns:
+            cell size in degrees, total and max counts, and the non-empty cells as
+            [latitude, longitude, count] of the cell centers (ready for a heat layer)
+
+        Raises:
+            ValueError: Invalid box or zoom, or a box too large for the zoom
+        """
+        if not (-90 <= south < north <= 90 and -180 <= west < east <= 180):
+            raise ValueError("Expected -90 <= south < north <= 90 and -180 <= west < east <= 180")
+        if not 0 <= zoom <= 20:
+            raise ValueError("zoom must be between 0 and 20")
+        size, columns, rows = self.tile_range(south, west, north, east, zoom)
+        if len(columns) * len(rows) > self.max_tiles:
+            raise ValueError(f"Box covers more than {self.max_tiles} tiles at zoom {zoom}; zoom out")
+
+        now = time.time() if now is None else now
+        keys = [(zoom, column, row) for row in rows for column in columns]
+        with self._lock:
+            self.stats['requests'] += 1
+            lats, lngs = self._snapshot(now)
+            missing = {key for key in keys if key not in self._tiles}
+            self.stats['tile_hits'] += len(keys) - len(missing)
+            self.stats['tile_misses'] += len(missing)
+            if missing:
+                # One pass over the bounding block of the missing tiles
+                block_columns = range(min(k[1] for k in missing), max(k[1] for k in missing) + 1)
+                block_rows = range(min(k[2] for k in missing), max(k[2] for k in missing) + 1)
+                for key, counts in self._bin(lats, lngs, zoom, size, block_columns, block_rows).items():
+                    if key in missing:
+                        self._tiles[key] = counts
+            tiles = []
+            for key in keys:
+                self._tiles.move_to_end(key)
+                tiles.append(self._tiles[key])
+            while len(self._tiles) > self.cache_tiles:
+                self._tiles.popitem(last=False)
+            snapshot_age = now - self._taken_at
+
+        cell = size / self.cells_per_tile
+        cells: List[List[float]] = []
+        for (_, column, row), counts in zip(keys, tiles):
+            ys, xs = np.nonzero(counts)
+            lats_c = (row * size - 90) + (ys + 0.5) * cell
+            lngs_c = (column * size - 180) + (xs + 0.5) * cell
+            keep = (lats_c >= south) & (lats_c <= north) & (lngs_c >= west) & (lngs_c <= east)
+            cells.extend(zip(lats_c[keep].round(5).tolist(), lngs_c[keep].round(5).tolist(),
+                             counts[ys[keep], xs[keep]].tolist()))
+        return {
+            'zoom': zoom,
+            'cell_degrees': cell,
+            'total': int(sum(c[2] for c in cells)),
+            'max': max((c[2] for c in cells), default=0),
+            'cells': [list(c) for c in cells],
+            'as_of_seconds_ago': round(snapshot_age, 1),
+        }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, cached_tiles=len(self._tiles),
+                        positions=0 if self._positions is None else len(self._positions[0]))
@@ -0,0 +1,146 @@
+"""
+Micro-batched location ingestion
+Pings arrive in bulk (NDJSON or JSON arrays), are coalesced per tourist (latest
+wins) and handed to a batch processor every few tens of milliseconds, so
+geofencing and model scoring run once per batch instead of once per ping
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .executor import ExecutorSaturated
+from .tourist_store import parse_location_id
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionOverloaded(ExecutorSaturated):
+    """Raised when too many tourists are waiting for the next batch"""
+
+
+def parse_ndjson(body: bytes) -> List[Dict]:
+    """Parse newline-delimited JSON objects, skipping blank lines"""
+    lines = [line for line in body.split(b'\n') if line.strip()]
+    # One parse of a JSON array is much faster than one json.loads per line
+    return json.loads(b'[' + b','.join(lines) + b']') if lines else []
+
+
+def _ping_time(value) -> float:
+    """Epoch seconds from a ping timestamp (epoch number, ISO 8601 string or missing)"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class PingIngestionPipeline:
+    def __init__(self, process_batch: Callable, max_batch: int = 5000, flush_interval: float = 0.05,
+                 max_pending: int = 200000):
+        """
+        Args:
+            process_batch: Called as process_batch(tourist_ids, latitudes, longitudes,
+                timestamps, location_ids) with one ping per tourist
+            max_batch: Largest batch handed to process_batch
+            flush_interval: Seconds between flushes
+            max_pending: Distinct tourists allowed to wait for a flush before pings are refused
+        """
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # tourist_id -> (timestamp, latitude, longitude, location_id)
+        self._pending: Dict[str, Tuple[float, float, float, int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'received': 0, 'invalid': 0, 'coalesced': 0, 'rejected': 0, 'batches': 0,
+                      'processed': 0, 'batch_errors': 0, 'last_batch_size': 0, 'last_batch_ms': None}
+
+    def submit(self, pings: List[Dict]) -> Dict:
+        """
+        Queue pings for the next batch; later pings of the same tourist replace earlier ones
+
+        Raises:
+            IngestionOverloaded if the pending set is full
+        """
+        parsed = []
+        invalid = 0
+        for ping in pings:
+            try:
+                location_id = ping.get('location_id')
+                parsed.append((str(ping['tourist_id']), _ping_time(ping.get('timestamp')),
+                               float(ping['latitude']), float(ping['longitude']),
+                               -1 if location_id is None else parse_location_id(location_id)))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                invalid += 1
+
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.stats['rejected'] += len(parsed)
+                raise IngestionOverloaded(f"{len(self._pending)} tourists waiting for ingestion")
+            pending = self._pending
+            coalesced = 0
+            for tourist_id, timestamp, lat, lng, location_id in parsed:
+                previous = pending.get(tourist_id)
+                if previous is not None:
+                    coalesced += 1
+                    if previous[0] > timestamp:
+                        continue
+                pending[tourist_id] = (timestamp, lat, lng, location_id)
+            self.stats['received'] += len(parsed)
+            self.stats['invalid'] += invalid
+            self.stats['coalesced'] += coalesced
+        return {'accepted': len(parsed), 'invalid': invalid}
+
+    def flush(self) -> int:
+        """Process everything pending now; returns the number of tourists processed"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            tourist_ids = list(pending)
+            values = np.array(list(pending.values()), dtype=float)
+            for start in range(0, len(tourist_ids), self.max_batch):
+                batch = values[start:start + self.max_batch]
+                started = time.perf_counter()
+                try:
+                    self.process_batch(tourist_ids[start:start + self.max_batch], batch[:, 1], batch[:, 2],
+                                       batch[:, 0], batch[:, 3].astype(np.int32))
+                    self.stats['processed'] += len(batch)
+                except Exception as e:
+                    self.stats['batch_errors'] += 1
+                    logger.error(f"Ping batch of {len(batch)} failed: {e}")
+                self.stats['batches'] += 1
+                self.stats['last_batch_size'] = len(batch)
+                self.stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return len(tourist_ids)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def start(self):
+        """Flush every `flush_interval` seconds on a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ping-ingestion', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.stats, pending=pending)
@@ -0,0 +1,28 @@
+import logging
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_db = None
+_db_checked = False
+
+
+def get_mongo():
+    """
+    Return the shared MongoDB database, or None when MONGODB_URI is not configured
+    or pymongo is unavailable. Callers must treat MongoDB as optional.
+    """
+    global _db, _db_checked
+    if _db_checked:
+        return _db
+    _db_checked = True
+    if not settings.MONGODB_URI:
+        return None
+    try:
+        from pymongo import MongoClient  # type: ignore
+        client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+        _db = client.get_default_database(settings.MONGODB_DB)
+    except Exception as e:
+        logger.warning(f"MongoDB unavailable, continuing without it: {e}")
+        _db = None
+    return _db
@@ -5,18 +5,56 @@ Integrates real-time crime data for safety score predictions
 
 import requests
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
+import numpy as np
+import pandas as pd
+
+from .cache import TwoTierCache
+from .quota import QuotaBudget, get_budget
+from .resilience import UpstreamUnavailable, get_upstream, propagate_deadline
+from ..config import settings
+
 logger = logging.getLogger(__name__)
 
+# Keyword groups per crime category, in priority order (first match wins)
+CRIME_CATEGORIES = {
+    'theft': ['theft', 'burglary', 'larceny'],
+    'robbery': ['robbery', 'mugging'],
+    'assault': ['assault', 'battery', 'violence'],
+    'fraud': ['fraud', 'scam', 'cheating'],
+    'cyber_crime': ['cyber', 'online', 'digital'],
+    'domestic_violence': ['domestic', 'family'],
+    'sexual_offenses': ['rape', 'sexual', 'molestation'],
+}
+
+# Each branch looks ahead for any keyword of its category and captures an empty named group,
+# so regex alternation order reproduces the category priority in a single pass
+CRIME_CATEGORY_PATTERN = re.compile(
+    '^(?:' + '|'.join(
+        f"(?=.*?(?:{'|'.join(map(re.escape, words))}))(?P<{category}>)"
+        for category, words in CRIME_CATEGORIES.items()
+    ) + ')',
+    re.DOTALL
+)
+
 class NCRBService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[TwoTierCache] = None, budget: Optional[QuotaBudget] = None):
         self.api_key = api_key
         self.base_url = "https://data.gov.in/api/rest/dataset"
-        self.cache = {}
         self.cache_duration = 3600  # 1 hour cache
+        # Shared across workers through Redis when REDIS_URL is configured
+        self.cache = cache or TwoTierCache('ncrb', self.cache_duration)
+        # Daily API quota, also shared across workers; low-priority callers get defaults when it runs low
+        self.budget = budget or get_budget('ncrb', api_key, settings.NCRB_DAILY_QUOTA)
+        self.session = requests.Session()
+        self.page_size = 500
+        self.max_records = 50000
+        self.max_concurrent_pages = 8
         
     def get_crime_data_by_location(self, latitude: float, longitude: float, radius_km: int = 10) -> Dict:
         """
@@ -33,8 +71,9 @@ class NCRBService:
         try:
             # Check cache first
             cache_key = f"crime_{latitude}_{longitude}_{radius_km}"
-            if self._is_cache_valid(cache_key):
-                return self.cache[cache_key]['data']
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
             # Get state and district from coordinates
             state, district = self._get_location_details(latitude, longitude)
@@ -58,10 +97,7 @@ class NCRBService:
             }
             
             # Cache the result
-            self.cache[cache_key] = {
-                'data': result,
-                'timestamp': datetime.now()
-            }
+            self.cache.set(cache_key, result)
             
             return result
             
@@ -76,14 +112,14 @@ class NCRBService:
         try:
             # Using a simple reverse geocoding service
             # In production, you might want to use Google Maps API or similar
-            response = requests.get(
+            response = get_upstream('bigdatacloud').call(
+                self.session.get,
                 f"https://api.bigdatacloud.net/data/reverse-geocode-client",
                 params={
                     'latitude': latitude,
                     'longitude': longitude,
                     'localityLanguage': 'en'
-                },
-                timeout=10
+                }
             )
             
             if response.status_code == 200:
@@ -99,92 +135,110 @@ class NCRBService:
     
     def _fetch_crime_data(self, state: str, district: str) -> Dict:
         """
-        Fetch crime data from NCRB API for specific state and district
+        Fetch crime data from NCRB API for specific state and district.
+        The first page reports the total record count; remaining pages are fetched concurrently.
         """
         try:
-            # NCRB API endpoint for crime data
-            # Note: This is a placeholder - actual NCRB API endpoints may vary
-            params = {
-                'api-key': self.api_key,
-                'format': 'json',
-                'filters[state]': state,
-                'filters[district]': district,
-                'limit': 100
-            }
+            first_page = self._fetch_page_or_none(state, district, 0, raise_unavailable=True)
+            if first_page is None:
+                return self._get_default_crime_data()
             
-            response = requests.get(
-                f"{self.base_url}/crime-data",
-                params=params,
-                timeout=15
-            )
+            records = list(first_page.get('records', []))
+            total = min(int(first_page.get('total', len(records)) or 0), self.max_records)
+            offsets = list(range(self.page_size, total, self.page_size))
             
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_crime_data(data)
-            else:
-                logger.warning(f"NCRB API returned status {response.status_code}")
-                return self._get_default_crime_data()
-                
+            if offsets:
+                fetch_page = propagate_deadline(self._fetch_page_or_none)
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrent_pages, len(offsets))) as pool:
+                    pages = pool.map(lambda offset: fetch_page(state, district, offset), offsets)
+                    for offset, page in zip(offsets, pages):
+                        if page is None:
+                            logger.warning(f"NCRB page at offset {offset} unavailable, aggregating partial data")
+                            continue
+                        records.extend(page.get('records', []))
+            
+            return self._parse_crime_data({'records': records})
+        
+        except UpstreamUnavailable:
+            # Let the caller fall back without caching defaults
+            raise
         except Exception as e:
             logger.error(f"Error fetching from NCRB API: {e}")
             return self._get_default_crime_data()
     
+    def _fetch_page_or_none(self, state: str, district: str, offset: int,
+                            raise_unavailable: bool = False) -> Optional[Dict]:
+        """
+        Fetch a single page of NCRB records, or None if the request failed.
+        UpstreamUnavailable (open breaker, expired deadline, quota) is re-raised if requested.
+        """
+        # NCRB API endpoint for crime data
+        # Note: This is a placeholder - actual NCRB API endpoints may vary
+        params = {
+            'api-key': self.api_key,
+            'format': 'json',
+            'filters[state]': state,
+            'filters[district]': district,
+            'offset': offset,
+            'limit': self.page_size
+        }
+        
+        try:
+            response = get_upstream('ncrb').call(
+                self.budget.metered(self.session.get),
+                f"{self.base_url}/crime-data",
+                params=params
+            )
+        except UpstreamUnavailable as e:
+            if raise_unavailable:
+                raise
+            logger.warning(f"Skipping NCRB page at offset {offset}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching NCRB page at offset {offset}: {e}")
+            return None
+        
+        if response.status_code != 200:
+            logger.warning(f"NCRB API returned status {response.status_code}")
+            return None
+        return response.json()
+    
     def _parse_crime_data(self, api_data: Dict) -> Dict:
         """
-        Parse and structure crime data from NCRB API response
+        Parse and structure crime data from NCRB API response.
+        Categorization and recency are computed column-wise over all records at once.
         """
         try:
             records = api_data.get('records', [])
+            crime_categories = {category: 0 for category in CRIME_CATEGORIES}
+            crime_categories['other'] = 0
             
-            # Categorize crimes by type
-            crime_categories = {
-                'theft': 0,
-                'robbery': 0,
-                'assault': 0,
-                'fraud': 0,
-                'cyber_crime': 0,
-                'domestic_violence': 0,
-                'sexual_offenses': 0,
-                'other': 0
-            }
+            if not records:
+                return {
+                    'total_crimes': 0,
+                    'recent_crimes': 0,
+                    'crime_categories': crime_categories,
+                    'crime_rate_per_100k': 0,
+                    'recent_crime_rate': 0
+                }
             
-            total_crimes = 0
-            recent_crimes = 0
-            current_date = datetime.now()
+            df = pd.DataFrame.from_records(records, columns=['crime_type', 'date'])
             
-            for record in records:
-                # Count by category (simplified mapping)
-                crime_type = record.get('crime_type', '').lower()
-                crime_date = record.get('date', '')
-                
-                # Categorize crime
-                if any(word in crime_type for word in ['theft', 'burglary', 'larceny']):
-                    crime_categories['theft'] += 1
-                elif any(word in crime_type for word in ['robbery', 'mugging']):
-                    crime_categories['robbery'] += 1
-                elif any(word in crime_type for word in ['assault', 'battery', 'violence']):
-                    crime_categories['assault'] += 1
-                elif any(word in crime_type for word in ['fraud', 'scam', 'cheating']):
-                    crime_categories['fraud'] += 1
-                elif any(word in crime_type for word in ['cyber', 'online', 'digital']):
-                    crime_categories['cyber_crime'] += 1
-                elif any(word in crime_type for word in ['domestic', 'family']):
-                    crime_categories['domestic_violence'] += 1
-                elif any(word in crime_type for word in ['rape', 'sexual', 'molestation']):
-                    crime_categories['sexual_offenses'] += 1
-                else:
-                    crime_categories['other'] += 1
-                
-                total_crimes += 1
-                
-                # Check if crime is recent (last 30 days)
-                try:
-                    if crime_date:
-                        crime_datetime = datetime.fromisoformat(crime_date.replace('Z', '+00:00'))
-                        if (current_date - crime_datetime).days <= 30:
-                            recent_crimes += 1
-                except:
-                    pass
+            # One compiled matcher classifies each distinct crime type; the first matching category wins.
+            # Records only carry a handful of distinct types, so categories are mapped back by code.
+            type_codes, crime_types = pd.factorize(df['crime_type'].fillna('').astype(str).str.lower())
+            matched = pd.Series(crime_types).str.extract(CRIME_CATEGORY_PATTERN).notna().to_numpy()
+            category_of_type = np.where(matched.any(axis=1), matched.argmax(axis=1), len(CRIME_CATEGORIES))
+            counts = np.bincount(category_of_type[type_codes], minlength=len(CRIME_CATEGORIES) + 1)
+            for category, count in zip(list(CRIME_CATEGORIES) + ['other'], counts):
+                crime_categories[category] = int(count)
+            
+            total_crimes = len(df)
+            
+            # Crimes within the last 30 days; unparseable dates are ignored
+            crime_dates = pd.to_datetime(df['date'], errors='coerce', utc=True, format='ISO8601')
+            age = pd.Timestamp.now(tz='UTC') - crime_dates
+            recent_crimes = int((age < pd.Timedelta(days=31)).sum())
             
             return {
                 'total_crimes': total_crimes,
@@ -275,16 +329,6 @@ class NCRBService:
             'data_source': 'default'
         }
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """
-        Check if cached data is still valid
-        """
-        if cache_key not in self.cache:
-            return False
-        
-        cache_time = self.cache[cache_key]['timestamp']
-        return (datetime.now() - cache_time).seconds < self.cache_duration
-    
     def get_safety_recommendations(self, risk_factors: Dict) -> List[str]:
         """
         Generate safety recommendations based on risk factors
@@ -0,0 +1,200 @@
+"""
+Outbound API quota budgets
+A token bucket per upstream API key, shared by all workers through Redis, that
+keeps daily-quota keys (NCRB, Visual Crossing) from running dry. Callers are
+prioritized: as the bucket drains, low-priority work is refused first and falls
+back to cached or default data.
+"""
+
+import contextvars
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Callable, Dict, Optional
+import logging
+
+from .redis_client import get_redis
+from .resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+_USE_SHARED_REDIS = object()
+
+
+class Priority(IntEnum):
+    EMERGENCY = 0     # SOS, EFIR and alert paths: may spend the last token
+    INTERACTIVE = 1   # A user waiting on a response
+    BACKGROUND = 2    # Heatmap refreshes, sweeps, precomputation
+
+
+# Fraction of the bucket that must remain after a call of the given priority
+PRIORITY_RESERVE = {
+    Priority.EMERGENCY: 0.0,
+    Priority.INTERACTIVE: 0.1,
+    Priority.BACKGROUND: 0.5,
+}
+
+_request_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    'request_priority', default=Priority.INTERACTIVE)
+
+
+class QuotaExceeded(UpstreamUnavailable):
+    """Raised when the budget refuses a call at the current priority"""
+
+
+def current_priority() -> Priority:
+    return _request_priority.get()
+
+
+def set_request_priority(priority: Priority) -> contextvars.Token:
+    return _request_priority.set(priority)
+
+
+def reset_request_priority(token: contextvars.Token):
+    _request_priority.reset(token)
+
+
+@contextmanager
+def priority(level: Priority):
+    """Run a block at the given quota priority"""
+    token = set_request_priority(level)
+    try:
+        yield
+    finally:
+        reset_request_priority(token)
+
+
+# Refill, check the priority reserve and take tokens atomically.
+# KEYS[1] bucket hash; ARGV: capacity, refill per second, cost, reserve
+_ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens - cost >= reserve then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 172800)
+return {allowed, tostring(tokens)}
+"""
+
+
+class QuotaBudget:
+    def __init__(self, name: str, api_key: str, daily_quota: int, burst: Optional[int] = None,
+                 redis_client=_USE_SHARED_REDIS):
+        """
+        Args:
+            name: Upstream name, e.g. 'ncrb' or 'visualcrossing'
+            api_key: Key whose quota is tracked (only a hash of it is stored)
+            daily_quota: Calls allowed per day; tokens refill evenly over the day
+            burst: Bucket capacity, defaults to two hours of quota
+            redis_client: Redis client; None keeps the bucket in-process only
+        """
+        self.name = name
+        self.daily_quota = daily_quota
+        self.capacity = float(burst or max(1, daily_quota // 12))
+        self.refill_per_second = daily_quota / 86400
+        key_hash = hashlib.sha1((api_key or '').encode()).hexdigest()[:12]
+        self.redis_key = f"saferove:quota:{name}:{key_hash}"
+        self.redis = get_redis() if redis_client is _USE_SHARED_REDIS else redis_client
+        self._script = self.redis.register_script(_ACQUIRE_SCRIPT) if self.redis is not None else None
+
+        # In-process bucket used when Redis is unavailable
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {'granted': 0, 'refused': {p.name.lower(): 0 for p in Priority}}
+
+    def _acquire_local(self, cost: float, reserve: float):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_per_second)
+            self._updated_at = now
+            if self._tokens - cost >= reserve:
+                self._tokens -= cost
+                return True, self._tokens
+            return False, self._tokens
+
+    def try_acquire(self, cost: float = 1, level: Optional[Priority] = None) -> bool:
+        """
+        Take `cost` tokens unless that would dip into the reserve kept for
+        higher priorities. Defaults to the priority of the current request.
+        """
+        level = current_priority() if level is None else level
+        reserve = self.capacity * PRIORITY_RESERVE[level]
+
+        allowed = None
+        if self._script is not None:
+            try:
+                result = self._script(keys=[self.redis_key],
+                                      args=[self.capacity, self.refill_per_second, cost, reserve])
+                allowed = bool(int(result[0]))
+            except Exception as e:
+                logger.warning(f"Quota store unavailable for '{self.name}', using local budget: {e}")
+        if allowed is None:
+            allowed, _ = self._acquire_local(cost, reserve)
+
+        if allowed:
+            self.stats['granted'] += 1
+        else:
+            self.stats['refused'][level.name.lower()] += 1
+        return allowed
+
+    def acquire(self, cost: float = 1, level: Optional[Priority] = None):
+        """try_acquire that raises QuotaExceeded, for use in front of an outbound call"""
+        level = current_priority() if level is None else level
+        if not self.try_acquire(cost, level):
+            raise QuotaExceeded(f"{self.name}: quota budget low, refusing {level.name.lower()} call")
+
+    def metered(self, fn: Callable) -> Callable:
+        """
+        Wrap an outbound call so every real request, including retries and hedges,
+        spends a token first
+        """
+        def wrapper(*args, **kwargs):
+            self.acquire()
+            return fn(*args, **kwargs)
+        return wrapper
+
+    def remaining(self) -> float:
+        """Approximate tokens left in the bucket"""
+        if self.redis is not None:
+            try:
+                tokens = self.redis.hget(self.redis_key, 'tokens')
+                return float(tokens) if tokens is not None else self.capacity
+            except Exception:
+                pass
+        with self._lock:
+            return self._tokens
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, remaining=round(self.remaining(), 1), capacity=self.capacity,
+                    daily_quota=self.daily_quota, shared=self.redis is not None)
+
+
+_budgets: Dict[str, QuotaBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget(name: str, api_key: str, daily_quota: int) -> QuotaBudget:
+    """Shared QuotaBudget for an upstream key"""
+    with _budgets_lock:
+        if name not in _budgets:
+            _budgets[name] = QuotaBudget(name, api_key, daily_quota)
+        return _budgets[name]
+
+
+def get_budget_stats() -> Dict[str, Dict]:
+    with _budgets_lock:
+        return {name: budget.get_stats() for name, budget in _budgets.items()}
@@ -0,0 +1,27 @@
+import logging
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+_redis_checked = False
+
+
+def get_redis():
+    """
+    Return a shared Redis client, or None when REDIS_URL is not configured
+    or the redis package is unavailable. Callers must treat Redis as optional.
+    """
+    global _redis, _redis_checked
+    if _redis_checked:
+        return _redis
+    _redis_checked = True
+    if not settings.REDIS_URL:
+        return None
+    try:
+        import redis  # type: ignore
+        _redis = redis.from_url(settings.REDIS_URL)
+    except Exception as e:
+        logger.warning(f"Redis unavailable, continuing without it: {e}")
+        _redis = None
+    return _redis
@@ -0,0 +1,320 @@
+"""
+Resilience layer for outbound calls
+Per-upstream circuit breakers, retry budgets, optional hedged requests and
+deadlines propagated from the incoming request
+"""
+
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() by which the current request must be answered
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('request_deadline', default=None)
+
+# Shared pool for hedged requests and calls that do not accept a timeout
+_call_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='outbound')
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose breaker is open or whose deadline has passed"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        # Seconds until the breaker lets a trial call through
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    pass
+
+
+def set_request_deadline(seconds: float) -> contextvars.Token:
+    """Start a deadline for the current request; returns a token for reset_request_deadline"""
+    return _request_deadline.set(time.monotonic() + seconds)
+
+
+def reset_request_deadline(token: contextvars.Token):
+    _request_deadline.reset(token)
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the current request deadline, or default if there is none"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return default
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Run a block under a deadline, never extending an enclosing one"""
+    current = remaining_time()
+    token = set_request_deadline(seconds if current is None else min(seconds, current))
+    try:
+        yield
+    finally:
+        reset_request_deadline(token)
+
+
+def propagate_deadline(fn: Callable) -> Callable:
+    """
+    Bind the caller's deadline (and the rest of its request context, such as the
+    quota priority) to fn so it still applies when fn runs on a worker thread
+    (ThreadPoolExecutor threads do not inherit context variables)
+    """
+    captured = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call runs in its own copy
+        return captured.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker. Opens after failure_threshold
+    consecutive failures and lets a single trial call through after reset_timeout.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until a call may be let through again (0 unless open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Allows retries (and hedges) only up to `ratio` of recent calls, so a degraded
+    upstream is not hit with a multiple of normal traffic
+    """
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Upstream:
+    def __init__(self, name: str, timeout: float, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_retries: int = 1, retry_ratio: float = 0.2, hedge_after: Optional[float] = None):
+        """
+        Args:
+            name: Upstream name used in logs and stats
+            timeout: Per-attempt timeout ceiling in seconds
+            failure_threshold: Consecutive failures before the breaker opens
+            reset_timeout: Seconds the breaker stays open before a trial call
+            max_retries: Retries per call, subject to the retry budget
+            retry_ratio: Retry budget as a fraction of calls
+            hedge_after: Send a second identical request if the first has not
+                answered after this many seconds (idempotent calls only)
+        """
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.retry_budget = RetryBudget(retry_ratio)
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'retries': 0, 'hedges': 0}
+
+    def attempt_timeout(self) -> float:
+        """Timeout for the next attempt: the configured ceiling, capped by the request deadline"""
+        remaining = remaining_time()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self.name}: request deadline exceeded")
+        return min(self.timeout, remaining)
+
+    def _admit(self):
+        self.attempt_timeout()
+        if not self.breaker.allow_request():
+            self.stats['rejected'] += 1
+            raise CircuitOpenError(f"{self.name}: circuit open", self.breaker.retry_after())
+
+    @staticmethod
+    def _is_failure(result: Any) -> bool:
+        # HTTP responses signalling an overloaded or broken upstream count against the breaker
+        status = getattr(result, 'status_code', None)
+        return status is not None and (status >= 500 or status == 429)
+
+    def _record(self, ok: bool):
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.stats['failures'] += 1
+            self.breaker.record_failure()
+
+    def call(self, fn: Callable, *args, pass_timeout: bool = True, hedge: bool = True, **kwargs):
+        """
+        Call fn under the breaker, retry budget and request deadline
+
+        Args:
+            fn: The outbound call, e.g. session.get
+            pass_timeout: Pass the attempt timeout to fn as `timeout=`; otherwise the
+                call runs on a worker thread and is abandoned when the timeout expires
+            hedge: Allow hedged requests if this upstream is configured for them
+
+        Raises:
+            UpstreamUnavailable if the breaker is open or the deadline has passed,
+            otherwise the last error from fn
+        """
+        self.retry_budget.deposit()
+        last_error: Optional[Exception] = None
+        last_result = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                if not self.retry_budget.try_withdraw():
+                    break
+                self.stats['retries'] += 1
+                # Small jittered backoff, never past the deadline
+                time.sleep(min(0.05 * (2 ** attempt) * random.random(), max(0.0, remaining_time(1.0))))
+
+            self._admit()
+            self.stats['calls'] += 1
+            try:
+                result = self._attempt(fn, args, kwargs, pass_timeout, hedge)
+            except UpstreamUnavailable:
+                raise
+            except Exception as e:
+                # A later error wins over an earlier error response
+                last_error, last_result = e, None
+                self._record(False)
+                continue
+
+            if self._is_failure(result):
+                self._record(False)
+                last_error, last_result = None, result
+                continue
+            self._record(True)
+            return result
+
+        # Out of attempts: hand back the last error response for the caller to handle
+        if last_result is not None:
+            return last_result
+        raise last_error
+
+    def _attempt(self, fn: Callable, args, kwargs, pass_timeout: bool, hedge: bool):
+        timeout = self.attempt_timeout()
+        if pass_timeout:
+            kwargs = dict(kwargs, timeout=timeout)
+
+        hedge_after = self.hedge_after if hedge else None
+        if pass_timeout and (hedge_after is None or hedge_after >= timeout):
+            return fn(*args, **kwargs)
+
+        primary = _call_pool.submit(propagate_deadline(fn), *args, **kwargs)
+        futures = {primary}
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done and self.retry_budget.try_withdraw():
+                self.stats['hedges'] += 1
+                futures.add(_call_pool.submit(propagate_deadline(fn), *args, **kwargs))
+
+        deadline_at = time.monotonic() + timeout
+        while futures:
+            done, futures = wait(futures, timeout=max(0.0, deadline_at - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{self.name}: no response within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+            if not futures:
+                raise next(iter(done)).exception()
+        raise TimeoutError(f"{self.name}: no response within {timeout:.1f}s")
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, state=self.breaker.state, retry_tokens=round(self.retry_budget.tokens, 2))
+
+
+# Per-upstream settings; only idempotent reads are hedged
+UPSTREAM_DEFAULTS = {
+    'ncrb': {'timeout': 15, 'hedge_after': 2.0},
+    'bigdatacloud': {'timeout': 10, 'hedge_after': 1.0},
+    'visualcrossing': {'timeout': 10, 'hedge_after': 1.5},
+    'twilio': {'timeout': 10, 'max_retries': 0},
+    # Alert deliveries are retried with backoff by the alert dispatcher instead
+    'push': {'timeout': 5, 'max_retries': 0},
+    'alert_webhook': {'timeout': 5, 'max_retries': 0},
+    'web3': {'timeout': 15, 'max_retries': 0},
+}
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name: str) -> Upstream:
+    """Shared Upstream instance for a named external service"""
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = Upstream(name, **UPSTREAM_DEFAULTS.get(name, {'timeout': 10}))
+        return _upstreams[name]
+
+
+def get_upstream_stats() -> Dict[str, Dict]:
+    with _upstreams_lock:
+        return {name: upstream.get_stats() for name, upstream in _upstreams.items()}
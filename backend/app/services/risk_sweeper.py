@@ -0,0 +1,106 @@
+"""
+Incident risk sweeper
+Periodically re-scores the latest state of every active tourist (read from the
+ActiveTouristStore) in one batch model call and keeps the highest incident
+probabilities for the control room
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IncidentRiskSweeper:
+    def __init__(self, predictor, store, top_k: int = 50, interval: float = 60, active_window: float = 1800):
+        """
+        Args:
+            predictor: IncidentPredictor used for batch scoring
+            store: ActiveTouristStore holding each tourist's latest incident features
+            top_k: Number of riskiest tourists kept after each sweep
+            interval: Seconds between sweeps
+            active_window: Tourists without an update for this many seconds are evicted from the store
+        """
+        self.predictor = predictor
+        self.store = store
+        self.top_k = top_k
+        self.interval = interval
+        self.active_window = active_window
+        self._time_column = predictor.FEATURES.index('time_of_day_risk')
+
+        self._top: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'sweeps': 0, 'sweep_errors': 0, 'last_sweep_ms': None,
+                      'last_sweep_size': 0, 'last_evicted': 0, 'swept_at': None}
+
+    def sweep(self) -> List[Dict]:
+        """Score every active tourist in one call and rebuild the top-K list"""
+        start = time.perf_counter()
+        evicted = self.store.evict_idle(self.active_window)
+        tourist_ids, records = self.store.snapshot()
+
+        # Only tourists that have sent a location with a location_id have incident features
+        scored = np.flatnonzero(~np.isnan(records['incident_features'][:, 0]))
+        features = records['incident_features'][scored].astype(float)
+        # Time of day is the only feature that changes without a new update
+        features[:, self._time_column] = self.predictor.time_of_day_risk(datetime.now().hour)
+        probabilities = self.predictor.predict_incident_probabilities(features)
+
+        top = heapq.nlargest(self.top_k, range(len(scored)), key=probabilities.__getitem__)
+        self._top = [
+            {
+                'tourist_id': tourist_ids[scored[i]],
+                'incident_probability': round(float(probabilities[i]), 4),
+                'latitude': float(records['latitude'][scored[i]]),
+                'longitude': float(records['longitude'][scored[i]]),
+                'location_id': int(records['location_id'][scored[i]]),
+                'last_seen': datetime.fromtimestamp(records['last_seen'][scored[i]]).isoformat(),
+            }
+            for i in top
+        ]
+
+        self.stats['sweeps'] += 1
+        self.stats['last_sweep_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        self.stats['last_sweep_size'] = len(scored)
+        self.stats['last_evicted'] = evicted
+        self.stats['swept_at'] = datetime.now().isoformat()
+        return self._top
+
+    def top(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Riskiest tourists from the last sweep, highest probability first
+
+        Raises:
+            ValueError: limit outside 1..top_k
+        """
+        if limit is not None and not 1 <= limit <= self.top_k:
+            raise ValueError(f"limit must be between 1 and {self.top_k}")
+        return self._top[:limit]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self.stats['sweep_errors'] += 1
+                logger.error(f"Incident risk sweep failed: {e}")
+
+    def start(self):
+        """Sweep every `interval` seconds on a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='risk-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, active_tourists=len(self.store), top_k=self.top_k)
@@ -0,0 +1,295 @@
+"""
+Streaming analytics for the live dashboard
+Every ping, alert and EFIR updates a handful of O(1) structures (sliding-window
+counters, an active-tourist recency list, HyperLogLog sketches), so dashboard
+metrics are read in constant time however much traffic has been seen
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowCounter:
+    """Events in the last `window` seconds, kept in a ring of time buckets with a running total"""
+
+    def __init__(self, window: float = 60.0, buckets: int = 60):
+        self.window = window
+        self.width = window / buckets
+        self.counts = [0] * buckets
+        self.total = 0
+        self._current: Optional[int] = None   # Absolute index of the newest bucket
+
+    def _advance(self, now: float):
+        index = int(now // self.width)
+        if self._current is None:
+            self._current = index
+        elif index > self._current:
+            # Clear the buckets that fell out of the window; at most one full turn of the ring
+            for i in range(self._current + 1, min(index, self._current + len(self.counts)) + 1):
+                slot = i % len(self.counts)
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+            self._current = index
+        return index
+
+    def add(self, n: int = 1, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._advance(now)
+        self.counts[self._current % len(self.counts)] += n
+        self.total += n
+
+    def value(self, now: Optional[float] = None) -> int:
+        self._advance(time.time() if now is None else now)
+        return self.total
+
+
+class HyperLogLog:
+    """
+    Approximate distinct count in 2**precision bytes (about 1.6% error at precision 12).
+    The harmonic sum behind the estimate is updated with each register, so count() is O(1)
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._sum = float(self.m)    # Sum of 2**-register over all registers
+        self._zeros = self.m
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns True if the estimate changed"""
+        x = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        old = self.registers[index]
+        if rank > old:
+            self.registers[index] = rank
+            self._sum += 2.0 ** -rank - 2.0 ** -old
+            if old == 0:
+                self._zeros -= 1
+            return True
+        return False
+
+    def count(self) -> int:
+        estimate = self._alpha * self.m * self.m / self._sum
+        if estimate <= 2.5 * self.m and self._zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / self._zeros)
+        return int(round(estimate))
+
+
+class StreamingAnalytics:
+    def __init__(self, active_window: float = 900, high_risk_level: int = 7, high_risk_probability: float = 0.5,
+                 region_cell_degrees: float = 0.25, hll_precision: int = 12, top_regions: int = 10,
+                 timeseries=None):
+        """
+        Args:
+            active_window: Seconds since the last ping for a tourist to count as active
+            high_risk_level: Location risk above which a tourist counts as high risk
+            high_risk_probability: Incident probability from which a tourist counts as high risk
+            region_cell_degrees: Grid cell size for regions of pings without a location_id
+            hll_precision: HyperLogLog precision of the unique-tourist sketches
+            top_regions: Regions with the most unique tourists kept up to date for get_metrics
+            timeseries: TimeSeriesStore that also gets the ping, alert and EFIR counts, for history
+        """
+        self.active_window = active_window
+        self.high_risk_level = high_risk_level
+        self.high_risk_probability = high_risk_probability
+        self.region_cell_degrees = region_cell_degrees
+        self.hll_precision = hll_precision
+        self.top_regions = top_regions
+        self.timeseries = timeseries
+        self._lock = threading.Lock()
+        # tourist_id -> time of last ping, oldest first, so expiry only looks at the front
+        self._active: "OrderedDict[str, float]" = OrderedDict()
+        self._high_risk = set()
+        self._pings = SlidingWindowCounter(60, 60)
+        self._alerts_minute = SlidingWindowCounter(60, 60)
+        self._alerts_hour = SlidingWindowCounter(3600, 60)
+        self._efirs_hour = SlidingWindowCounter(3600, 60)
+        self._day = date.today()
+        self._unique_today = HyperLogLog(hll_precision)
+        self._unique_by_region: Dict[str, HyperLogLog] = {}
+        # The top_regions busiest regions and their counts; sketch counts (all but) only grow, so a region
+        # enters this set the moment it passes the smallest member and members never need re-checking
+        self._busiest: Dict[str, int] = {}
+        self.totals = {'pings': 0, 'alerts': 0, 'efirs': 0}
+
+    def region_of(self, latitude: float, longitude: float, location_id: Optional[int] = None) -> str:
+        """A known location when the ping names one, otherwise the grid cell it falls in"""
+        if location_id is not None and location_id >= 0:
+            return f"location:{int(location_id)}"
+        cell = self.region_cell_degrees
+        return f"cell:{math.floor(latitude / cell) * cell:.2f},{math.floor(longitude / cell) * cell:.2f}"
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._unique_today = HyperLogLog(self.hll_precision)
+            self._unique_by_region = {}
+            self._busiest = {}
+
+    def _expire(self, now: float):
+        cutoff = now - self.active_window
+        while self._active:
+            tourist_id, last_seen = next(iter(self._active.items()))
+            if last_seen >= cutoff:
+                break
+            self._active.popitem(last=False)
+            self._high_risk.discard(tourist_id)
+
+    def _record_ping(self, tourist_id: str, latitude: float, longitude: float, location_risk: float,
+                     incident_probability: Optional[float], location_id: Optional[int], now: float):
+        self._active[tourist_id] = now
+        self._active.move_to_end(tourist_id)
+        high_risk = location_risk > self.high_risk_level or (
+            incident_probability is not None and incident_probability >= self.high_risk_probability
+        )
+        if high_risk:
+            self._high_risk.add(tourist_id)
+        else:
+            self._high_risk.discard(tourist_id)
+
+        self._unique_today.add(tourist_id)
+        if latitude is None and (location_id is None or location_id < 0):
+            return
+        region = self.region_of(latitude, longitude, location_id)
+        sketch = self._unique_by_region.get(region)
+        if sketch is None:
+            sketch = self._unique_by_region[region] = HyperLogLog(self.hll_precision)
+        if sketch.add(tourist_id):
+            self._rank_region(region, sketch.count())
+
+    def _rank_region(self, region: str, count: int):
+        """Keep _busiest current after a region's count grew; O(top_regions)"""
+        busiest = self._busiest
+        if region in busiest or len(busiest) < self.top_regions:
+            busiest[region] = count
+            return
+        smallest = min(busiest, key=busiest.__getitem__)
+        if count > busiest[smallest]:
+            del busiest[smallest]
+            busiest[region] = count
+
+    def record_ping(self, tourist_id: str, latitude: Optional[float] = None, longitude: Optional[float] = None,
+                    location_risk: float = 1, incident_probability: Optional[float] = None,
+                    location_id: Optional[int] = None, now: Optional[float] = None):
+        """Record one tourist update; without coordinates or a location_id it counts towards no region"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._roll_day()
+            self._record_ping(tourist_id, latitude, longitude, location_risk, incident_probability, location_id, now)
+            self._pings.add(1, now)
+            self.totals['pings'] += 1
+            self._expire(now)
+        if self.timeseries is not None:
+            self.timeseries.record('pings', 1, now)
+
+    def record_pings(self, tourist_ids: List[str], latitudes: Iterable[float], longitudes: Iterable[float],
+                     location_risks: Iterable[float], incident_probabilities: Iterable[float],
+                     location_ids: Iterable[int], now: Optional[float] = None):
+        """A micro-batch of pings under one lock; NaN probabilities and negative location ids mean unknown"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._roll_day()
+            for tourist_id, lat, lng, risk, probability, location_id in zip(
+                    tourist_ids, latitudes, longitudes, location_risks, incident_probabilities, location_ids):
+                self._record_ping(tourist_id, lat, lng, risk, None if math.isnan(probability) else probability,
+                                  location_id, now)
+            self._pings.add(len(tourist_ids), now)
+            self.totals['pings'] += len(tourist_ids)
+            self._expire(now)
+        if self.timeseries is not None:
+            self.timeseries.record('pings', len(tourist_ids), now)
+
+    def record_alert(self, alert: Optional[Dict] = None, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._alerts_minute.add(1, now)
+            self._alerts_hour.add(1, now)
+            self.totals['alerts'] += 1
+        if self.timeseries is not None:
+            self.timeseries.record('alerts', 1, now)
+
+    def record_efir(self, efir: Optional[Dict] = None, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._efirs_hour.add(1, now)
+            self.totals['efirs'] += 1
+        if self.timeseries is not None:
+            self.timeseries.record('efirs', 1, now)
+
+    def gauges(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Current counts worth sampling into a time series"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            return {'active_tourists': len(self._active), 'high_risk_tourists': len(self._high_risk)}
+
+    def get_metrics(self, now: Optional[float] = None, top_regions: Optional[int] = None) -> Dict:
+        """
+        Current dashboard metrics; cost does not grow with the number of events or regions seen
+
+        Args:
+            top_regions: Busiest regions to report, at most the top_regions given to the constructor
+        """
+        now = time.time() if now is None else now
+        limit = self.top_regions if top_regions is None else min(top_regions, self.top_regions)
+        with self._lock:
+            self._roll_day()
+            self._expire(now)
+            regions = sorted(self._busiest.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return {
+                'active_tourists': len(self._active),
+                'recent_alerts': self._alerts_hour.value(now),
+                'alerts_per_minute': self._alerts_minute.value(now),
+                'high_risk_tourists': len(self._high_risk),
+                # Incident response times are not reported to the backend yet
+                'avg_response_time_minutes': None,
+                'pings_per_minute': self._pings.value(now),
+                'efirs_last_hour': self._efirs_hour.value(now),
+                'unique_tourists_today': self._unique_today.count(),
+                'unique_tourists_by_region': dict(regions),
+                'totals': dict(self.totals),
+                'system_status': 'operational',
+                'last_updated': datetime.fromtimestamp(now).isoformat(),
+            }
+
+
+_ADDITIVE_METRICS = ('active_tourists', 'recent_alerts', 'alerts_per_minute', 'high_risk_tourists',
+                     'pings_per_minute', 'efirs_last_hour', 'unique_tourists_today')
+
+
+def combine_metrics(snapshots: List[Dict], top_regions: int = 10) -> Dict:
+    """
+    Deployment-wide dashboard metrics from each worker's get_metrics(). Counts add up;
+    unique tourist counts are an upper bound when a tourist's pings reach several workers
+    """
+    combined = {name: sum(snapshot.get(name) or 0 for snapshot in snapshots) for name in _ADDITIVE_METRICS}
+    regions: Dict[str, int] = {}
+    totals: Dict[str, int] = {}
+    for snapshot in snapshots:
+        for region, count in (snapshot.get('unique_tourists_by_region') or {}).items():
+            regions[region] = regions.get(region, 0) + count
+        for name, count in (snapshot.get('totals') or {}).items():
+            totals[name] = totals.get(name, 0) + count
+    busiest = sorted(regions.items(), key=lambda item: item[1], reverse=True)[:top_regions]
+    combined.update({
+        'avg_response_time_minutes': None,
+        'unique_tourists_by_region': dict(busiest),
+        'totals': totals,
+        'system_status': 'operational',
+        'last_updated': max((snapshot.get('last_updated') or '' for snapshot in snapshots), default='') or None,
+    })
+    return combined
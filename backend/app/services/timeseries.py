@@ -0,0 +1,250 @@
+"""
+In-process time-series rollups for operational metrics
+Each series keeps fixed-size ring buffers at 1 minute, 1 hour and 1 day resolution
+(sum, count, min and max per slot, plus the last reading for gauges). A point is
+added to all three at once, so the coarse rings are exact downsamples of the fine
+one, and memory stays the same no matter how long the process runs. Counters
+(events) are summed by default, gauges (sampled levels) report their last reading
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (name, seconds per slot, slots kept)
+DEFAULT_RESOLUTIONS = (
+    ('1m', 60, 7 * 24 * 60),     # one week
+    ('1h', 3600, 90 * 24),       # 90 days
+    ('1d', 86400, 2 * 366),      # two years
+)
+
+AGGREGATIONS = ('sum', 'avg', 'min', 'max', 'count', 'last')
+COUNTER, GAUGE = 'counter', 'gauge'
+# Aggregations that mean something for each kind of series; the first is the default
+KIND_AGGREGATIONS = {
+    COUNTER: ('sum', 'avg', 'min', 'max', 'count'),
+    GAUGE: ('last', 'avg', 'min', 'max', 'count'),
+}
+
+
+class _Ring:
+    """Fixed-size ring of aggregated slots; a slot is valid only while it holds the bucket in `stamps`"""
+
+    def __init__(self, seconds: int, slots: int, gauge: bool = False):
+        self.seconds = seconds
+        self.slots = slots
+        self.stamps = np.full(slots, -1, dtype=np.int64)   # Absolute bucket index held by each slot
+        self.sums = np.zeros(slots)
+        self.counts = np.zeros(slots, dtype=np.int64)
+        self.mins = np.zeros(slots)
+        self.maxs = np.zeros(slots)
+        self.lasts = np.zeros(slots) if gauge else None
+
+    def add(self, value: float, now: float):
+        bucket = int(now // self.seconds)
+        slot = bucket % self.slots
+        if self.stamps[slot] != bucket:
+            if self.stamps[slot] > bucket:
+                return   # Older than the whole ring
+            self.stamps[slot] = bucket
+            self.sums[slot] = value
+            self.counts[slot] = 1
+            self.mins[slot] = self.maxs[slot] = value
+            if self.lasts is not None:
+                self.lasts[slot] = value
+            return
+        self.sums[slot] += value
+        self.counts[slot] += 1
+        self.mins[slot] = min(self.mins[slot], value)
+        self.maxs[slot] = max(self.maxs[slot], value)
+        if self.lasts is not None:
+            # Readings arrive in time order from the sampler
+            self.lasts[slot] = value
+
+    def read(self, first: int, last: int) -> Tuple[np.ndarray, ...]:
+        """Sums, counts, mins, maxs and lasts (None for counters) of buckets first..last; unheld ones read empty"""
+        buckets = np.arange(first, last + 1)
+        slots = buckets % self.slots
+        held = self.stamps[slots] == buckets
+        lasts = np.where(held, self.lasts[slots], 0.0) if self.lasts is not None else None
+        return (np.where(held, self.sums[slots], 0.0), np.where(held, self.counts[slots], 0),
+                np.where(held, self.mins[slots], np.inf), np.where(held, self.maxs[slots], -np.inf), lasts)
+
+
+class TimeSeriesStore:
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, max_points: int = 5000, max_slots: int = 100000,
+                 sample_interval: float = 60.0):
+        """
+        Args:
+            resolutions: (name, seconds per slot, slots kept), finest first
+            max_points: Most points a range query may return
+            max_slots: Most slots a range query may read, however wide its step
+            sample_interval: Seconds between readings of the gauges added with add_sampler
+        """
+        self.resolutions = tuple(resolutions)
+        self.max_points = max_points
+        self.max_slots = max_slots
+        self.sample_interval = sample_interval
+        self._series: Dict[str, List[_Ring]] = {}
+        self._kinds: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._samplers: List[Callable[[], Dict[str, float]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, name: str, value: float = 1, now: Optional[float] = None, kind: str = COUNTER):
+        """
+        Add a point to a series, creating it on first use
+
+        Args:
+            kind: COUNTER for event counts, GAUGE for readings of a level (e.g. active tourists)
+
+        Raises:
+            ValueError: The series was created with the other kind
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rings = self._series.get(name)
+            if rings is None:
+                if kind not in KIND_AGGREGATIONS:
+                    raise ValueError(f"kind must be {COUNTER} or {GAUGE}")
+                rings = self._series[name] = [_Ring(seconds, slots, gauge=kind == GAUGE)
+                                              for _, seconds, slots in self.resolutions]
+                self._kinds[name] = kind
+            elif self._kinds[name] != kind:
+                raise ValueError(f"'{name}' is a {self._kinds[name]}, not a {kind}")
+            for ring in rings:
+                ring.add(value, now)
+
+    def record_gauge(self, name: str, value: float, now: Optional[float] = None):
+        """Add a gauge reading; rollups keep its last, min, max and average instead of a sum"""
+        self.record(name, value, now, kind=GAUGE)
+
+    def series(self) -> List[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def _pick(self, start: float, now: float) -> int:
+        """Finest resolution that still holds `start`, or the coarsest one"""
+        for i, (_, seconds, slots) in enumerate(self.resolutions):
+            if now - start <= seconds * slots:
+                return i
+        return len(self.resolutions) - 1
+
+    def query(self, name: str, start: float, end: Optional[float] = None, step: Optional[float] = None,
+              agg: Optional[str] = None, now: Optional[float] = None) -> Dict:
+        """
+        Aggregate a series into `step`-second buckets over [start, end)
+
+        Args:
+            step: Bucket width, rounded up to a whole number of slots of the resolution used and
+                capped at the whole range; by default the range is split into a few hundred buckets
+            agg: sum (the default for counters), last (the default for gauges, the latest reading
+                in the bucket), avg, min, max or count; empty buckets are 0 for sum and count, None otherwise
+
+        Raises:
+            KeyError: Unknown series
+            ValueError: Bad range, step or aggregation (such as sum over a gauge), or too many points or slots
+        """
+        now = time.time() if now is None else now
+        end = now if end is None else end
+        if agg is not None and agg not in AGGREGATIONS:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATIONS)}")
+        for label, value in (('start', start), ('end', end), ('step', 0 if step is None else step)):
+            if not math.isfinite(value) or value < 0:
+                raise ValueError(f"{label} must be a non-negative number")
+        if end <= start:
+            raise ValueError("end must be after start")
+
+        index = self._pick(start, now)
+        resolution, seconds, _ = self.resolutions[index]
+        if not step:
+            step = (end - start) / 300
+        per_bucket = max(1, math.ceil(min(step, end - start) / seconds))
+        step = per_bucket * seconds
+        first = int(start // step) * per_bucket
+        last = math.ceil(end / step) * per_bucket - 1
+        if last - first + 1 > self.max_slots:
+            raise ValueError(f"Range spans more than {self.max_slots} {resolution} slots; narrow it")
+        if (last - first + 1) // per_bucket > self.max_points:
+            raise ValueError(f"Range holds more than {self.max_points} points at step {step}s")
+
+        with self._lock:
+            if name not in self._series:
+                raise KeyError(name)
+            kind = self._kinds[name]
+            allowed = KIND_AGGREGATIONS[kind]
+            agg = allowed[0] if agg is None else agg
+            if agg not in allowed:
+                raise ValueError(f"agg for the {kind} '{name}' must be one of {', '.join(allowed)}")
+            sums, counts, mins, maxs, lasts = self._series[name][index].read(first, last)
+
+        shape = (-1, per_bucket)
+        slot_counts = counts.reshape(shape)
+        sums, counts = sums.reshape(shape).sum(axis=1), slot_counts.sum(axis=1)
+        if agg == 'last':
+            # Reading of the last slot with any readings in each bucket
+            latest = per_bucket - 1 - np.argmax(slot_counts[:, ::-1] > 0, axis=1)
+            values = lasts.reshape(shape)[np.arange(len(latest)), latest]
+            values = [float(v) if c else None for v, c in zip(values.tolist(), counts.tolist())]
+        elif agg == 'sum':
+            values = sums.tolist()
+        elif agg == 'count':
+            values = counts.tolist()
+        else:
+            if agg == 'avg':
+                values = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+            elif agg == 'min':
+                values = mins.reshape(shape).min(axis=1)
+            else:
+                values = maxs.reshape(shape).max(axis=1)
+            values = [float(v) if c else None for v, c in zip(values.tolist(), counts.tolist())]
+
+        times = ((first + np.arange(len(values)) * per_bucket) * seconds).tolist()
+        return {'metric': name, 'kind': kind, 'resolution': resolution, 'step': step, 'agg': agg,
+                'points': [{'t': t, 'value': v} for t, v in zip(times, values)]}
+
+    def add_sampler(self, fn: Callable[[], Dict[str, float]]):
+        """Record every gauge fn() returns (as gauges), once per sample interval, once the store is started"""
+        self._samplers.append(fn)
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            for fn in self._samplers:
+                try:
+                    now = time.time()
+                    for name, value in fn().items():
+                        self.record_gauge(name, value, now)
+                except Exception as e:
+                    logger.error(f"Time-series sampler failed: {e}")
+
+    def start(self):
+        """Start reading the gauges; counters need no background work"""
+        if not self._samplers or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='timeseries-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            series = len(self._series)
+            gauges = sum(kind == GAUGE for kind in self._kinds.values())
+        slots = sum(slots for _, _, slots in self.resolutions)
+        return {
+            'series': series,
+            'gauges': gauges,
+            'resolutions': [{'name': n, 'seconds': s, 'slots': k, 'retention_seconds': s * k}
+                            for n, s, k in self.resolutions],
+            # stamps, sums, counts, mins and maxs: 8 bytes each per slot, and lasts for gauges
+            'bytes': series * slots * 40 + gauges * slots * 8,
+        }
@@ -0,0 +1,214 @@
+"""
+Live per-tourist safety feed
+A tourist's app subscribes to its own id over a websocket and gets a message only
+when its safety score, zones or alerts change, carrying just the changed fields.
+Views travel between workers over Redis pub/sub; diffs are computed per connection
+against what that client last received, so a client that falls behind gets one
+merged diff instead of a backlog
+"""
+
+import asyncio
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_USE_SHARED_REDIS = object()
+
+# Alerts held for a client that has not caught up yet
+MAX_PENDING_ALERTS = 20
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):   # numpy scalars and arrays
+        return value.tolist()
+    return str(value)
+
+
+def diff_views(old: Dict, new: Dict) -> Dict:
+    """Fields of new that differ from old; fields that disappeared map to None"""
+    changes = {key: value for key, value in new.items() if old.get(key) != value}
+    changes.update({key: None for key in old if key not in new})
+    return changes
+
+
+class _Subscription:
+    def __init__(self, ws):
+        self.ws = ws
+        self.latest: Dict = {}
+        self.last_sent: Dict = {}
+        self.alerts: List[Dict] = []
+        self.version = 0
+        self.changed = asyncio.Event()
+
+
+class TouristFeed:
+    def __init__(self, snapshot: Optional[Callable[[str], Optional[Dict]]] = None,
+                 channel: str = 'saferove:tourist-feed', max_tracked: int = 100000,
+                 redis_client: Any = _USE_SHARED_REDIS):
+        """
+        Args:
+            snapshot: Returns the current view of a tourist (or None), sent when a client subscribes
+            channel: Redis pub/sub channel shared by all workers
+            max_tracked: Tourists whose last published view is remembered to skip unchanged ones
+            redis_client: Redis client; None keeps the feed within this worker
+        """
+        self.snapshot = snapshot
+        self.channel = channel
+        self.max_tracked = max_tracked
+        self.redis = get_redis() if redis_client is _USE_SHARED_REDIS else redis_client
+        self._subscriptions: Dict[str, List[_Subscription]] = {}
+        self._last_published: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+        self.stats = {'published': 0, 'unchanged': 0, 'delivered': 0, 'messages_sent': 0, 'publish_errors': 0}
+
+    @staticmethod
+    def view(safety_score=None, zones=None, incident_probability=None) -> Dict:
+        """The fields a tourist's app shows, rounded so that noise does not count as a change"""
+        def number(value, digits):
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                return None
+            return round(float(value), digits)
+        return {
+            'safety_score': number(safety_score, 1),
+            'zones': sorted(zones or []),
+            'incident_probability': number(incident_probability, 2),
+        }
+
+    def publish(self, tourist_id: str, view: Dict, alerts: Optional[List[Dict]] = None):
+        """
+        Offer a tourist's latest view; nothing is sent if it is unchanged and there are no new alerts.
+        Safe to call from any thread
+        """
+        alerts = alerts or []
+        with self._lock:
+            if not alerts and self._last_published.get(tourist_id) == view:
+                self.stats['unchanged'] += 1
+                return
+            self._last_published[tourist_id] = view
+            self._last_published.move_to_end(tourist_id)
+            if len(self._last_published) > self.max_tracked:
+                self._last_published.popitem(last=False)
+            self.stats['published'] += 1
+
+        if self.redis is not None:
+            try:
+                # The id prefix lets workers skip tourists nobody is watching without parsing JSON
+                payload = json.dumps({'view': view, 'alerts': alerts}, default=_json_default)
+                self.redis.publish(self.channel, f"{tourist_id}\n{payload}")
+                return
+            except Exception as e:
+                self.stats['publish_errors'] += 1
+                logger.warning(f"Tourist feed publish to Redis failed, delivering locally: {e}")
+        if tourist_id in self._subscriptions:
+            # Round-trip through JSON so local subscribers see exactly what remote ones would
+            self._deliver(tourist_id, json.loads(json.dumps({'view': view, 'alerts': alerts}, default=_json_default)))
+
+    def _deliver(self, tourist_id: str, message: Dict):
+        if tourist_id not in self._subscriptions or self._loop is None:
+            return
+        self.stats['delivered'] += 1
+        self._loop.call_soon_threadsafe(self._apply, tourist_id, message['view'], message['alerts'])
+
+    def _apply(self, tourist_id: str, view: Dict, alerts: List[Dict]):
+        """Runs on the event loop: record the view and wake each subscriber's sender"""
+        for subscription in self._subscriptions.get(tourist_id, []):
+            subscription.latest = view
+            subscription.alerts = (subscription.alerts + alerts)[-MAX_PENDING_ALERTS:]
+            subscription.changed.set()
+
+    def _listen(self):
+        while not self._stop.is_set():
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    data = message['data']
+                    data = data.decode() if isinstance(data, bytes) else data
+                    tourist_id, _, payload = data.partition('\n')
+                    if tourist_id in self._subscriptions:
+                        self._deliver(tourist_id, json.loads(payload))
+                pubsub.close()
+            except Exception as e:
+                logger.warning(f"Tourist feed subscription lost, resubscribing: {e}")
+                self._stop.wait(1.0)
+
+    def start(self):
+        """Listen for views published by other workers"""
+        if self.redis is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen, name='tourist-feed-listener', daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        self._stop.set()
+
+    async def _send_changes(self, tourist_id: str, subscription: _Subscription):
+        try:
+            await self._send_loop(tourist_id, subscription)
+        except Exception:
+            # Disconnected; serve() notices on its next receive
+            pass
+
+    async def _send_loop(self, tourist_id: str, subscription: _Subscription):
+        while True:
+            await subscription.changed.wait()
+            subscription.changed.clear()
+            # Everything that arrived while the previous send was in flight goes out as one diff
+            changes = diff_views(subscription.last_sent, subscription.latest)
+            alerts, subscription.alerts = subscription.alerts, []
+            if not changes and not alerts:
+                continue
+            subscription.version += 1
+            message = {'type': 'update', 'tourist_id': tourist_id, 'version': subscription.version,
+                       'changes': changes}
+            if alerts:
+                message['alerts'] = alerts
+            subscription.last_sent = subscription.latest
+            await subscription.ws.send_json(message)
+            self.stats['messages_sent'] += 1
+
+    async def serve(self, ws, tourist_id: str):
+        """Stream changes for one tourist to an accepted websocket until it disconnects"""
+        self._loop = asyncio.get_running_loop()
+        subscription = _Subscription(ws)
+        self._subscriptions.setdefault(tourist_id, []).append(subscription)
+        sender = None
+        try:
+            state = self.snapshot(tourist_id) if self.snapshot else None
+            subscription.last_sent = subscription.latest = state or {}
+            await ws.send_json({'type': 'snapshot', 'tourist_id': tourist_id, 'version': 0, 'state': state})
+            sender = asyncio.create_task(self._send_changes(tourist_id, subscription))
+            while True:
+                # Clients do not send anything meaningful; reading detects the disconnect
+                await ws.receive_text()
+        except Exception:
+            pass
+        finally:
+            if sender is not None:
+                sender.cancel()
+            subscribers = self._subscriptions.get(tourist_id, [])
+            subscribers.remove(subscription)
+            if not subscribers:
+                self._subscriptions.pop(tourist_id, None)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, subscribed_tourists=len(self._subscriptions),
+                    connections=sum(len(s) for s in self._subscriptions.values()),
+                    tracked=len(self._last_published), shared=self.redis is not None)
@@ -0,0 +1,268 @@
+"""
+Active tourist state store
+Latest position, scores and zones of every active tourist, kept in one NumPy
+structured array so millions of tourists fit in a few hundred MB and sweeps
+read whole columns at once
+"""
+
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INCIDENT_FEATURE_COUNT = 7  # len(IncidentPredictor.FEATURES)
+MAX_TRACKED_ZONES = 64      # One bit per zone in the zone_mask column
+MAX_LOCATION_ID = np.iinfo(np.int32).max
+
+TOURIST_STATE_DTYPE = np.dtype([
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('first_seen', 'f8'),
+    ('last_seen', 'f8'),
+    ('zone_mask', 'u8'),
+    ('safety_score', 'f4'),
+    ('incident_probability', 'f4'),
+    ('incident_features', 'f4', (INCIDENT_FEATURE_COUNT,)),
+    ('location_id', 'i4'),
+    ('active', '?'),
+])
+
+# Value of each column before a tourist has reported it
+_UNSET = {'latitude': np.nan, 'longitude': np.nan, 'safety_score': np.nan,
+          'incident_probability': np.nan, 'incident_features': np.nan, 'location_id': -1}
+
+
+def parse_location_id(value) -> int:
+    """
+    A location id as stored in the location_id column (ints, or "3" from JSON clients)
+
+    Raises:
+        ValueError: Not a whole number between 0 and MAX_LOCATION_ID
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"location_id must be an integer, got {value!r}")
+    try:
+        location_id = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"location_id must be an integer, got {value!r}") from None
+    if not 0 <= location_id <= MAX_LOCATION_ID:
+        raise ValueError(f"location_id must be between 0 and {MAX_LOCATION_ID}, got {location_id}")
+    return location_id
+
+
+class ActiveTouristStore:
+    def __init__(self, initial_capacity: int = 1024):
+        self._state = np.zeros(initial_capacity, dtype=TOURIST_STATE_DTYPE)
+        self._ids: List[Optional[str]] = [None] * initial_capacity  # row -> tourist_id
+        self._rows: Dict[str, int] = {}                             # tourist_id -> row
+        self._free: List[int] = list(range(initial_capacity - 1, -1, -1))
+        self._zone_bits: Dict[str, int] = {}
+        self._untracked_zones: set = set()  # Zones seen while every bit was taken
+        self._zone_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, tourist_id: str) -> bool:
+        return tourist_id in self._rows
+
+    def _grow(self):
+        old = len(self._state)
+        self._state = np.concatenate([self._state, np.zeros(old, dtype=TOURIST_STATE_DTYPE)])
+        self._ids.extend([None] * old)
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def _row_for(self, tourist_id: str, now: float) -> int:
+        row = self._rows.get(tourist_id)
+        if row is None:
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self._rows[tourist_id] = row
+            self._ids[row] = tourist_id
+            record = self._state[row]
+            for column, value in _UNSET.items():
+                record[column] = value
+            record['zone_mask'] = 0
+            record['first_seen'] = now
+            record['active'] = True
+        return row
+
+    def zone_bit(self, zone_id: str) -> Optional[int]:
+        """Bit assigned to a zone in zone_mask (None while MAX_TRACKED_ZONES other zones hold one)"""
+        bit = self._zone_bits.get(zone_id)
+        if bit is not None:
+            return bit
+        with self._zone_lock:
+            bit = self._zone_bits.get(zone_id)
+            if bit is None and len(self._zone_bits) < MAX_TRACKED_ZONES:
+                # Lowest bit no zone holds, including bits freed by release_zone
+                used = set(self._zone_bits.values())
+                bit = self._zone_bits[zone_id] = next(b for b in range(MAX_TRACKED_ZONES) if b not in used)
+                self._untracked_zones.discard(zone_id)
+            elif bit is None and zone_id not in self._untracked_zones:
+                self._untracked_zones.add(zone_id)
+                logger.error(f"Zone {zone_id} left out of zone_mask: all {MAX_TRACKED_ZONES} zone bits are in use; "
+                             f"remove unused zones to free them")
+        return bit
+
+    def release_zone(self, zone_id: str) -> bool:
+        """
+        Free a removed zone's bit for the next new zone, clearing it from every tourist's zone_mask
+
+        Returns:
+            False if the zone held no bit
+        """
+        with self._lock, self._zone_lock:
+            self._untracked_zones.discard(zone_id)
+            bit = self._zone_bits.pop(zone_id, None)
+            if bit is None:
+                return False
+            self._state['zone_mask'] &= ~np.uint64(1 << bit)
+        return True
+
+    def zone_mask(self, zone_ids: Iterable[str]) -> int:
+        mask = 0
+        for zone_id in zone_ids:
+            bit = self.zone_bit(zone_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def update(self, tourist_id: str, timestamp: Optional[float] = None, zones: Optional[Iterable[str]] = None,
+               **fields):
+        """
+        Record a tourist's latest state in O(1); only the given fields change
+
+        Args:
+            timestamp: Epoch seconds of the update, defaults to now
+            zones: Zone ids the tourist is currently inside
+            fields: Any of latitude, longitude, safety_score, incident_probability,
+                incident_features, location_id
+        """
+        wall = time.time()
+        # A future or millisecond timestamp would keep the tourist from ever being evicted
+        now = wall if timestamp is None or not timestamp <= wall else timestamp
+        with self._lock:
+            row = self._row_for(tourist_id, now)
+            record = self._state[row]
+            for column, value in fields.items():
+                if value is not None:
+                    record[column] = value
+            if zones is not None:
+                record['zone_mask'] = self.zone_mask(zones)
+            record['last_seen'] = now
+
+    def zone_masks(self, zone_ids: List[str], inside: np.ndarray) -> np.ndarray:
+        """zone_mask values for a batch, from an (n, len(zone_ids)) membership matrix"""
+        masks = np.zeros(len(inside), dtype=np.uint64)
+        for j, zone_id in enumerate(zone_ids):
+            bit = self.zone_bit(zone_id)
+            if bit is not None:
+                masks |= inside[:, j].astype(np.uint64) << np.uint64(bit)
+        return masks
+
+    def update_many(self, tourist_ids: List[str], timestamps: np.ndarray, zone_masks: Optional[np.ndarray] = None,
+                    **columns):
+        """
+        Vectorized update for a batch of distinct tourists; columns are arrays aligned with tourist_ids
+        (None leaves a column unchanged). Timestamps in the future, or missing (NaN), count as now
+        """
+        wall = time.time()
+        timestamps = np.asarray(timestamps, dtype=float)
+        timestamps = np.where(timestamps <= wall, timestamps, wall)
+        with self._lock:
+            rows = np.fromiter((self._row_for(tourist_id, now) for tourist_id, now in zip(tourist_ids, timestamps.tolist())),
+                               dtype=np.int64, count=len(tourist_ids))
+            state = self._state
+            for column, values in columns.items():
+                if values is not None:
+                    state[column][rows] = values
+            if zone_masks is not None:
+                state['zone_mask'][rows] = zone_masks
+            state['last_seen'][rows] = timestamps
+
+    def get_column(self, tourist_ids: List[str], column: str, default) -> np.ndarray:
+        """Current values of one column for a batch of tourists (default where unknown or unset)"""
+        with self._lock:
+            rows = np.array([self._rows.get(tourist_id, -1) for tourist_id in tourist_ids], dtype=np.int64)
+            known = rows >= 0
+            values = np.full(len(rows), default, dtype=self._state.dtype[column])
+            values[known] = self._state[column][rows[known]]
+        if values.dtype.kind == 'f':
+            values[np.isnan(values)] = default
+        return values
+
+    def get(self, tourist_id: str) -> Optional[Dict]:
+        """Latest state of a tourist as a plain dict, or None if not active"""
+        with self._lock:
+            row = self._rows.get(tourist_id)
+            if row is None:
+                return None
+            record = self._state[row].copy()
+            # Same order as release_zone takes the locks; the mapping matches the copied mask
+            with self._zone_lock:
+                zone_bits = list(self._zone_bits.items())
+        state = {column: record[column].item() for column in TOURIST_STATE_DTYPE.names
+                 if column not in ('incident_features', 'zone_mask', 'active')}
+        state['incident_features'] = record['incident_features'].tolist()
+        state['zones'] = [zone_id for zone_id, bit in zone_bits if record['zone_mask'] >> bit & 1]
+        state['tourist_id'] = tourist_id
+        return state
+
+    def remove(self, tourist_id: str):
+        with self._lock:
+            row = self._rows.pop(tourist_id, None)
+            if row is not None:
+                self._release(row)
+
+    def _release(self, row: int):
+        self._state[row]['active'] = False
+        self._ids[row] = None
+        self._free.append(row)
+
+    def evict_idle(self, max_idle: float, now: Optional[float] = None) -> int:
+        """Drop tourists without an update for max_idle seconds; returns how many were evicted"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state
+            idle = np.flatnonzero(state['active'] & (state['last_seen'] < now - max_idle))
+            for row in idle.tolist():
+                del self._rows[self._ids[row]]
+                self._release(row)
+        return len(idle)
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Consistent copy of every active tourist for vectorized sweeps
+
+        Returns:
+            (tourist_ids, records) where records is a structured array in the same order
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._state['active'])
+            records = self._state[rows]
+            tourist_ids = [self._ids[row] for row in rows.tolist()]
+        return tourist_ids, records
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of every active tourist with a known position"""
+        with self._lock:
+            state = self._state
+            rows = np.flatnonzero(state['active'] & ~np.isnan(state['latitude']) & ~np.isnan(state['longitude']))
+            return state['latitude'][rows], state['longitude'][rows]
+
+    def memory_usage(self) -> Dict:
+        """Approximate bytes held (state array, id list and index dict, ids excluded) and zone bit usage"""
+        array_bytes = self._state.nbytes
+        index_bytes = sys.getsizeof(self._rows) + sys.getsizeof(self._ids) + sys.getsizeof(self._free)
+        return {'tourists': len(self._rows), 'capacity': len(self._state),
+                'tracked_zones': len(self._zone_bits), 'untracked_zones': len(self._untracked_zones),
+                'array_bytes': array_bytes, 'index_bytes': index_bytes,
+                'bytes_per_tourist': round((array_bytes + index_bytes) / max(1, len(self._rows)), 1)}
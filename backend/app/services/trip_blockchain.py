@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from web3 import Web3
 from eth_account import Account
 from ..config import settings
+from .blockchain import GuardedHTTPProvider
 
 # Trip ID Registry Contract ABI
 TRIP_CONTRACT_ABI = [
@@ -72,7 +73,7 @@ def _init_trip_web3():
     if not rpc_url:
         raise RuntimeError("Missing BLOCKCHAIN_RPC_URL or BLOCKCHAIN_API_KEY")
     
-    _w3 = Web3(Web3.HTTPProvider(rpc_url))
+    _w3 = Web3(GuardedHTTPProvider(rpc_url))
     if not _w3.is_connected():
         raise RuntimeError("Web3 failed to connect to RPC")
     
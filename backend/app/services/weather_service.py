@@ -5,22 +5,166 @@ Integrates weather data to improve safety score predictions
 
 import requests
 import json
-from typing import Dict, Optional, Tuple
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from .cache import TwoTierCache
+from .quota import QuotaBudget, get_budget
+from .resilience import UpstreamUnavailable, get_upstream, propagate_deadline
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Hourly timeline columns: name -> (Visual Crossing field, default when missing)
+HOURLY_COLUMNS = {
+    'epoch': ('datetimeEpoch', 0),
+    'temperature': ('temp', 20),
+    'humidity': ('humidity', 50),
+    'wind_speed': ('windspeed', 0),
+    'visibility': ('visibility', 10),
+    'uv_index': ('uvindex', 5),
+    'conditions': ('conditions', 'Clear'),
+    'pressure': ('pressure', 1013),
+    'precipitation_prob': ('precipprob', 0),
+}
+
+# Risk (1-10) of each reported weather condition
+CONDITION_RISK = {
+    'Clear': 2,
+    'Partly Cloudy': 3,
+    'Cloudy': 4,
+    'Overcast': 5,
+    'Rain': 7,
+    'Heavy Rain': 9,
+    'Thunderstorm': 9,
+    'Snow': 8,
+    'Fog': 8,
+    'Haze': 6,
+    'Dust': 7
+}
+DEFAULT_CONDITION_RISK = 5
+
+# Integer condition codes for vectorized risk computation, indexes into CONDITION_RISK
+CONDITION_CODES = {condition: code for code, condition in enumerate(CONDITION_RISK)}
+
+# Weights of each factor in the overall weather risk
+RISK_WEIGHTS = {
+    'temperature_risk': 0.2,
+    'humidity_risk': 0.15,
+    'wind_risk': 0.2,
+    'visibility_risk': 0.25,
+    'uv_risk': 0.1,
+    'condition_risk': 0.1
+}
+
+
+def encode_conditions(conditions) -> np.ndarray:
+    """Map condition strings to CONDITION_CODES, -1 for unknown conditions"""
+    codes, uniques = pd.factorize(pd.Series(conditions, dtype=object))
+    lookup = np.array([CONDITION_CODES.get(c, -1) for c in uniques] + [-1], dtype=np.int64)
+    return lookup[codes]
+
+
+# Risk levels each threshold-based factor can take, in the order produced by the branches below
+_FACTOR_LEVELS = {
+    'temperature_risk': [9, 7, 5, 3],
+    'humidity_risk': [8, 6, 5, 3],
+    'wind_risk': [9, 7, 5, 2],
+    'visibility_risk': [9, 7, 5, 2],
+    'uv_risk': [8, 6, 4, 2],
+    'condition_risk': sorted(set(CONDITION_RISK.values()) | {DEFAULT_CONDITION_RISK}),
+}
+
+
+def _build_overall_risk_table() -> np.ndarray:
+    """
+    Overall risk for every combination of factor levels, rounded exactly like the
+    scalar function (Python's round() and numpy's round() disagree on some ties)
+    """
+    levels = list(_FACTOR_LEVELS.values())
+    table = np.empty([len(l) for l in levels])
+    for index in itertools.product(*[range(len(l)) for l in levels]):
+        factors = dict(zip(_FACTOR_LEVELS, (l[i] for l, i in zip(levels, index))))
+        table[index] = round(sum(factors[key] * RISK_WEIGHTS[key] for key in RISK_WEIGHTS.keys()), 1)
+    return table
+
+
+_OVERALL_RISK_TABLE = _build_overall_risk_table()
+
+
+def calculate_weather_risk_factors_vectorized(temp, humidity, wind_speed, visibility,
+                                              uv_index, condition_codes) -> Dict[str, np.ndarray]:
+    """
+    Vectorized WeatherService._calculate_weather_risk_factors
+    
+    Every argument is an array of the same shape (e.g. forecast hours x tiles).
+    condition_codes are integers from CONDITION_CODES (-1 for unknown); condition
+    strings are also accepted and encoded first.
+    
+    Returns:
+        Dict of risk arrays with the same keys and values as the scalar function
+    """
+    temp = np.asarray(temp, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+    wind_speed = np.asarray(wind_speed, dtype=float)
+    visibility = np.asarray(visibility, dtype=float)
+    uv_index = np.asarray(uv_index, dtype=float)
+    condition_codes = np.asarray(condition_codes)
+    if condition_codes.dtype.kind not in 'iu':
+        condition_codes = encode_conditions(condition_codes.ravel()).reshape(condition_codes.shape)
+    
+    # Level index of each factor (0 = highest risk branch)
+    level_index = {
+        'temperature_risk': np.select(
+            [(temp < 0) | (temp > 40), (temp < 5) | (temp > 35), (temp < 10) | (temp > 30)], [0, 1, 2], 3),
+        'humidity_risk': np.select([humidity > 90, humidity > 80, humidity < 20], [0, 1, 2], 3),
+        'wind_risk': np.select([wind_speed > 30, wind_speed > 20, wind_speed > 10], [0, 1, 2], 3),
+        'visibility_risk': np.select([visibility < 1, visibility < 3, visibility < 5], [0, 1, 2], 3),
+        'uv_risk': np.select([uv_index > 10, uv_index > 7, uv_index > 5], [0, 1, 2], 3),
+    }
+    condition_levels = _FACTOR_LEVELS['condition_risk']
+    condition_level_of_code = np.array(
+        [condition_levels.index(risk) for risk in CONDITION_RISK.values()]
+        + [condition_levels.index(DEFAULT_CONDITION_RISK)]
+    )
+    level_index['condition_risk'] = condition_level_of_code[np.where(condition_codes >= 0, condition_codes, -1)]
+    
+    risk_factors = {
+        key: np.asarray(_FACTOR_LEVELS[key])[index] for key, index in level_index.items()
+    }
+    risk_factors['overall_weather_risk'] = _OVERALL_RISK_TABLE[tuple(level_index[key] for key in _FACTOR_LEVELS)]
+    
+    return risk_factors
+
+
 class WeatherService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[TwoTierCache] = None, budget: Optional[QuotaBudget] = None):
         self.api_key = api_key
         self.base_url = 'https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/'
-        self.cache = {}
         self.cache_duration = 1800  # 30 minutes cache
+        # Shared across workers through Redis when REDIS_URL is configured
+        self.cache = cache or TwoTierCache('weather', self.cache_duration)
+        # Daily API quota, also shared across workers; low-priority callers get defaults when it runs low
+        self.budget = budget or get_budget('visualcrossing', api_key, settings.VISUALCROSSING_DAILY_QUOTA)
+        self.session = requests.Session()
+        # Weather barely changes within a few kilometres, so lookups are keyed by 0.1 degree tiles
+        self.tile_size = 0.1
+        # Hourly forecasts stay useful for longer than current conditions
+        self.timeline_cache_duration = 10800
+        self.max_concurrent_fetches = 8
         
     def get_weather_data(self, latitude: float, longitude: float) -> Dict:
         """
-        Get weather data for a specific location
+        Get weather data for a specific location.
+        Results are shared by every point in the same tile_size x tile_size degree cell.
         
         Args:
             latitude: Location latitude
@@ -30,16 +174,79 @@ class WeatherService:
             Dict containing weather data and risk factors
         """
         try:
+            tile = self._tile_for(latitude, longitude)
+            
             # Check cache first
-            cache_key = f"weather_{latitude}_{longitude}"
-            if self._is_cache_valid(cache_key):
-                return self.cache[cache_key]['data']
+            cached = self.cache.get(self._tile_key(tile))
+            if cached is not None:
+                return cached
+            
+            processed_data = self._fetch_tile(tile)
+            if processed_data is None:
+                return self._get_default_weather_data()
+            
+            return processed_data
+            
+        except Exception as e:
+            logger.error(f"Error fetching weather data: {e}")
+            return self._get_default_weather_data()
+    
+    def get_weather_data_many(self, points: List[Tuple[float, float]]) -> List[Dict]:
+        """
+        Get weather data for many locations at once
+        
+        Points are deduplicated to tiles and only tiles missing from the cache are
+        fetched, concurrently, so a sweep over thousands of tourists costs one
+        upstream call per distinct tile.
+        
+        Args:
+            points: List of (latitude, longitude) pairs
+            
+        Returns:
+            List of weather data dicts, aligned with points
+        """
+        tiles = [self._tile_for(latitude, longitude) for latitude, longitude in points]
+        by_tile = {}
+        missing = []
+        
+        for tile in dict.fromkeys(tiles):
+            cached = self.cache.get(self._tile_key(tile))
+            if cached is not None:
+                by_tile[tile] = cached
+            else:
+                missing.append(tile)
+        
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent_fetches, len(missing))) as pool:
+                for tile, processed_data in zip(missing, pool.map(propagate_deadline(self._fetch_tile), missing)):
+                    by_tile[tile] = processed_data if processed_data is not None else self._get_default_weather_data()
+        
+        return [by_tile[tile] for tile in tiles]
+    
+    def _tile_for(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Grid cell containing the coordinate"""
+        return math.floor(latitude / self.tile_size), math.floor(longitude / self.tile_size)
+    
+    def _tile_key(self, tile: Tuple[int, int]) -> str:
+        return f"weather_tile_{self.tile_size}_{tile[0]}_{tile[1]}"
+    
+    def _timeline_key(self, tile: Tuple[int, int]) -> str:
+        return f"weather_timeline_{self.tile_size}_{tile[0]}_{tile[1]}"
+    
+    def _fetch_tile(self, tile: Tuple[int, int]) -> Optional[Dict]:
+        """
+        Fetch weather for the centre of a tile and cache both the processed
+        summary and the hourly forecast timeline. Returns None if the request failed.
+        """
+        try:
+            latitude = round((tile[0] + 0.5) * self.tile_size, 4)
+            longitude = round((tile[1] + 0.5) * self.tile_size, 4)
             
             # Construct API URL
             location = f"{latitude},{longitude}"
             url = f"{self.base_url}{location}?unitGroup=metric&contentType=json&key={self.api_key}"
             
-            response = requests.get(url, timeout=10)
+            response = get_upstream('visualcrossing').call(self.budget.metered(self.session.get), url)
             response.raise_for_status()
             
             weather_data = response.json()
@@ -47,17 +254,107 @@ class WeatherService:
             # Process weather data for safety analysis
             processed_data = self._process_weather_data(weather_data)
             
-            # Cache the result
-            self.cache[cache_key] = {
-                'data': processed_data,
-                'timestamp': datetime.now()
-            }
+            # Cache the result along with the hourly forecast from the same response
+            self.cache.set(self._tile_key(tile), processed_data)
+            self.cache.set(self._timeline_key(tile), self._extract_hourly_timeline(weather_data),
+                           ttl=self.timeline_cache_duration)
             
             return processed_data
             
+        except UpstreamUnavailable as e:
+            logger.warning(f"Weather for tile {tile} unavailable: {e}")
+            return None
         except Exception as e:
-            logger.error(f"Error fetching weather data: {e}")
-            return self._get_default_weather_data()
+            logger.error(f"Error fetching weather data for tile {tile}: {e}")
+            return None
+    
+    def _extract_hourly_timeline(self, raw_data: Dict) -> Dict:
+        """
+        Flatten the hourly forecast of every day into columns keyed by field name,
+        ordered by epoch seconds
+        """
+        timeline = {column: [] for column in HOURLY_COLUMNS}
+        
+        for day in raw_data.get('days', []):
+            for hour in day.get('hours', []) or []:
+                if hour.get('datetimeEpoch') is None:
+                    continue
+                for column, (source, default) in HOURLY_COLUMNS.items():
+                    value = hour.get(source)
+                    timeline[column].append(default if value is None else value)
+        
+        order = sorted(range(len(timeline['epoch'])), key=timeline['epoch'].__getitem__)
+        return {column: [values[i] for i in order] for column, values in timeline.items()}
+    
+    def _get_timeline(self, latitude: float, longitude: float) -> Optional[Dict]:
+        """Hourly forecast timeline for the tile containing the coordinate"""
+        tile = self._tile_for(latitude, longitude)
+        timeline = self.cache.get(self._timeline_key(tile))
+        if timeline is None and self._fetch_tile(tile) is not None:
+            timeline = self.cache.get(self._timeline_key(tile))
+        return timeline
+    
+    def get_weather_risk_timeline(self, latitude: float, longitude: float) -> Dict[str, np.ndarray]:
+        """
+        Risk factors for every hour of the cached forecast, computed in one vectorized pass
+        
+        Returns:
+            Dict with an 'epoch' array plus one array per risk factor (empty if no forecast)
+        """
+        timeline = self._get_timeline(latitude, longitude) or {column: [] for column in HOURLY_COLUMNS}
+        risk_factors = calculate_weather_risk_factors_vectorized(
+            timeline['temperature'], timeline['humidity'], timeline['wind_speed'],
+            timeline['visibility'], timeline['uv_index'], encode_conditions(timeline['conditions'])
+        )
+        risk_factors['epoch'] = np.asarray(timeline['epoch'], dtype=np.int64)
+        return risk_factors
+    
+    def get_weather_risk_at(self, latitude: float, longitude: float, timestamp) -> Dict:
+        """
+        Get weather risk factors for a location at a given hour
+        
+        Uses the cached hourly forecast of the location's tile, so any hour in the
+        forecast window is answered without another upstream call.
+        
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            timestamp: datetime, ISO 8601 string or epoch seconds
+            
+        Returns:
+            Dict with the forecast conditions and risk factors for that hour.
+            Outside the forecast window the current risk factors are returned.
+        """
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        epoch = timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+        
+        timeline = self._get_timeline(latitude, longitude)
+        epochs = timeline['epoch'] if timeline else []
+        
+        if not epochs or epoch < epochs[0] or epoch >= epochs[-1] + 3600:
+            current = self.get_weather_data(latitude, longitude)
+            return {
+                'timestamp': datetime.fromtimestamp(epoch).isoformat(),
+                'in_forecast_window': False,
+                'conditions': current.get('current_conditions', {}),
+                'risk_factors': current.get('risk_factors', {})
+            }
+        
+        i = bisect_right(epochs, epoch) - 1
+        conditions = {column: timeline[column][i] for column in HOURLY_COLUMNS if column != 'epoch'}
+        
+        return {
+            'timestamp': datetime.fromtimestamp(epoch).isoformat(),
+            'forecast_hour': datetime.fromtimestamp(epochs[i]).isoformat(),
+            'in_forecast_window': True,
+            'conditions': conditions,
+            'risk_factors': self._calculate_weather_risk_factors(
+                conditions['temperature'], conditions['humidity'], conditions['wind_speed'],
+                conditions['visibility'], conditions['uv_index'], conditions['conditions'],
+                conditions['pressure']
+            )
+        }
     
     def _process_weather_data(self, raw_data: Dict) -> Dict:
         """
@@ -174,32 +471,10 @@ class WeatherService:
             risk_factors['uv_risk'] = 2
         
         # Weather condition risk
-        condition_risk_map = {
-            'Clear': 2,
-            'Partly Cloudy': 3,
-            'Cloudy': 4,
-            'Overcast': 5,
-            'Rain': 7,
-            'Heavy Rain': 9,
-            'Thunderstorm': 9,
-            'Snow': 8,
-            'Fog': 8,
-            'Haze': 6,
-            'Dust': 7
-        }
-        risk_factors['condition_risk'] = condition_risk_map.get(conditions, 5)
+        risk_factors['condition_risk'] = CONDITION_RISK.get(conditions, DEFAULT_CONDITION_RISK)
         
         # Overall weather risk (weighted average)
-        weights = {
-            'temperature_risk': 0.2,
-            'humidity_risk': 0.15,
-            'wind_risk': 0.2,
-            'visibility_risk': 0.25,
-            'uv_risk': 0.1,
-            'condition_risk': 0.1
-        }
-        
-        overall_risk = sum(risk_factors[key] * weights[key] for key in weights.keys())
+        overall_risk = sum(risk_factors[key] * RISK_WEIGHTS[key] for key in RISK_WEIGHTS.keys())
         risk_factors['overall_weather_risk'] = round(overall_risk, 1)
         
         return risk_factors
@@ -273,16 +548,6 @@ class WeatherService:
             'data_source': 'default'
         }
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """
-        Check if cached data is still valid
-        """
-        if cache_key not in self.cache:
-            return False
-        
-        cache_time = self.cache[cache_key]['timestamp']
-        return (datetime.now() - cache_time).seconds < self.cache_duration
-    
     def get_weather_risk_score(self, latitude: float, longitude: float) -> float:
         """
         Get a single weather risk score (1-10) for the location
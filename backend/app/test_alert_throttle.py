@@ -0,0 +1,114 @@
+"""
+Test script for alert deduplication and per-tourist rate limiting
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.ai_models import GeoFencingSystem, SmartTouristSafetySystem
+from app.services.alert_throttle import AlertThrottle
+from app.services.alerts import AlertDispatcher, StubGateway
+
+
+def test_repeats_suppressed_within_cooldown():
+    print("\n=== Testing duplicate suppression ===\n")
+    throttle = AlertThrottle(cooldown=300, burst=10, per_hour=100)
+    now = 1_000_000.0
+
+    assert throttle.check("T1", "old_city", 8, now=now).allowed
+    decisions = [throttle.check("T1", "old_city", 8, now=now + i) for i in range(1, 30)]
+    assert not any(d.allowed for d in decisions)
+    assert decisions[-1] == (False, 29, 'duplicate')
+
+    # Other zones and other tourists are separate keys
+    assert throttle.check("T1", "market", 8, now=now + 30).allowed
+    assert throttle.check("T2", "old_city", 8, now=now + 30).allowed
+
+    # An escalation gets through, and the next allowed alert reports what was suppressed
+    assert throttle.check("T1", "old_city", 10, now=now + 40) == (True, 29, None)
+    after = throttle.check("T1", "old_city", 8, now=now + 400)
+    assert after == (True, 0, None)
+
+    stats = throttle.get_stats()
+    print(f"Stats: {stats}")
+    assert stats['suppressed_duplicate'] == 29 and stats['escalations'] == 1
+    assert stats['suppressed_by_kind'] == {'old_city': 29}
+
+
+def test_token_bucket_bounds_alerts_per_tourist():
+    print("\n=== Testing per-tourist rate limit ===\n")
+    throttle = AlertThrottle(cooldown=300, burst=3, per_hour=6)
+    now = 1_000_000.0
+
+    allowed = [throttle.check("T1", f"zone_{i}", 8, now=now).allowed for i in range(10)]
+    assert allowed == [True] * 3 + [False] * 7
+    assert throttle.get_stats()['suppressed_rate_limited'] == 7
+
+    # One token back every 10 minutes
+    assert not throttle.check("T1", "zone_20", 8, now=now + 300).allowed
+    assert throttle.check("T1", "zone_21", 8, now=now + 601).allowed
+
+
+def test_escalation_gets_through_spent_bucket():
+    print("\n=== Testing an escalation after the burst is spent ===\n")
+    throttle = AlertThrottle(cooldown=300, burst=5, per_hour=20)
+    now = 1_000_000.0
+
+    # Five low-level SOS texts use up the burst, the sixth is rate limited
+    kinds = ["THEFT", "LOST", "SCAM", "HARASSMENT", "OTHER"]
+    assert all(throttle.check("+911234567890", kind, 4, now=now + i).allowed for i, kind in enumerate(kinds))
+    assert throttle.check("+911234567890", "DISPUTE", 4, now=now + 60).reason == 'rate_limited'
+
+    # The same sender reporting an emergency goes through, on the same key or a new one
+    assert throttle.check("+911234567890", "THEFT", 7, now=now + 70).allowed
+    assert throttle.check("+911234567890", "MEDICAL", 10, now=now + 80).allowed
+    # ... but only once per level
+    assert throttle.check("+911234567890", "ACCIDENT", 10, now=now + 90).reason == 'rate_limited'
+    assert throttle.get_stats()['escalations_over_limit'] == 2
+
+
+def test_prune_forgets_quiet_keys():
+    print("\n=== Testing pruning ===\n")
+    throttle = AlertThrottle(cooldown=60, burst=2, per_hour=3600, prune_every=10)
+    for i in range(9):
+        throttle.check(f"T{i}", "zone", 8, now=0.0)
+    assert throttle.get_stats()['tracked_keys'] == 9
+    throttle.check("T_new", "zone", 8, now=1000.0)
+    stats = throttle.get_stats()
+    assert stats['tracked_keys'] == 1 and stats['tracked_subjects'] == 1
+
+
+def test_boundary_pacing_sends_one_alert():
+    print("\n=== Testing a tourist pacing along a zone boundary ===\n")
+    gateway = StubGateway('sms')
+    dispatcher = AlertDispatcher([gateway], workers=1)
+    system = SmartTouristSafetySystem(alert_dispatcher=dispatcher, alert_throttle=AlertThrottle())
+    system.geo_fencing.add_risk_zone("old_city", [[28.60, 77.20], [28.60, 77.25], [28.66, 77.25], [28.66, 77.20]], 8)
+
+    # In and out of the zone 20 times through the batch path, then once more through a single update
+    total = {'alerts_generated': 0, 'alerts_suppressed': 0}
+    for i in range(40):
+        result = system.process_ping_batch(["T1"], np.array([28.63]), np.array([77.249 + 0.002 * (i % 2)]),
+                                           np.array([float(i)]), np.array([-1], dtype=np.int32))
+        for key in total:
+            total[key] += result[key]
+    update = system.process_tourist_update("T1", {'latitude': 28.63, 'longitude': 77.24})
+    assert dispatcher.wait_idle(5)
+
+    print(f"Batch alerts: {total}, single update alert: {update['alerts_generated']}")
+    assert total == {'alerts_generated': 1, 'alerts_suppressed': 19}
+    assert update['alerts_generated'][0]['suppressed']
+    assert len(gateway.sent) == 1
+    dispatcher.stop()
+
+
+if __name__ == "__main__":
+    test_repeats_suppressed_within_cooldown()
+    test_token_bucket_bounds_alerts_per_tourist()
+    test_escalation_gets_through_spent_bucket()
+    test_prune_forgets_quiet_keys()
+    test_boundary_pacing_sends_one_alert()
+    print("\nAll alert throttle tests completed!")
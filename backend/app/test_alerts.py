@@ -0,0 +1,131 @@
+"""
+Test script for asynchronous alert dispatch
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.ai_models import GeoFencingSystem
+from app.services.alerts import AlertChannel, AlertDispatcher, StubGateway, WebhookChannel
+from app.services.resilience import Upstream
+
+
+def test_generate_alert_does_not_wait_for_delivery():
+    print("\n=== Testing non-blocking alert generation ===\n")
+    gateway = StubGateway('sms', delay=0.5)
+    dispatcher = AlertDispatcher([gateway], workers=2)
+    geo = GeoFencingSystem(dispatcher)
+
+    start = time.perf_counter()
+    alert = geo.generate_alert("T1", 28.6, 77.2, 9)
+    elapsed = time.perf_counter() - start
+    print(f"generate_alert returned in {elapsed * 1000:.1f} ms")
+    assert elapsed < 0.1 and alert['risk_level'] == 9
+
+    assert dispatcher.wait_idle(5)
+    assert gateway.sent[0]['alert']['tourist_id'] == "T1"
+    assert "Risk: 9/10" in gateway.sent[0]['message']
+    dispatcher.stop()
+
+
+def test_failed_sends_are_retried_per_channel():
+    print("\n=== Testing retries ===\n")
+    flaky = StubGateway('push', fail_times=2)
+    dead = StubGateway('webhook', fail_times=100)
+    sms = StubGateway('sms')
+    dispatcher = AlertDispatcher([flaky, dead, sms], workers=2, max_attempts=3, backoff=0.01)
+
+    assert dispatcher.dispatch({'tourist_id': "T1"}, "test alert")
+    assert dispatcher.wait_idle(5)
+    stats = dispatcher.get_stats()
+    print(f"Stats: {stats}")
+    assert len(flaky.sent) == 1 and flaky.attempts == 3
+    assert len(sms.sent) == 1 and dead.sent == [] and dead.attempts == 3
+    assert stats['channels']['webhook'] == {'sent': 0, 'failed': 1}
+    assert stats['sent'] == 2 and stats['retried'] == 4 and stats['pending'] == 0
+    dispatcher.stop()
+
+
+def test_alerts_held_while_circuit_open():
+    print("\n=== Testing delivery through an open circuit breaker ===\n")
+    gateway = StubGateway('sms', fail_times=2)
+
+    class BreakerChannel(AlertChannel):
+        name = 'sms'
+        upstream = Upstream('sms_test', timeout=1, failure_threshold=2, reset_timeout=0.5, max_retries=0)
+
+        def send(self, alert, message):
+            self.upstream.call(gateway.send, alert, message, pass_timeout=False)
+
+    # The breaker stays open far longer than 3 quick retries take
+    dispatcher = AlertDispatcher([BreakerChannel()], workers=2, max_attempts=3, backoff=0.01)
+    for i in range(5):
+        assert dispatcher.dispatch({'tourist_id': f"T{i}", 'emergency_level': 10}, "SOS")
+    assert dispatcher.wait_idle(10)
+    stats = dispatcher.get_stats()
+    print(f"Stats: {stats}")
+    assert len(gateway.sent) == 5 and gateway.attempts == 7
+    assert stats['failed'] == 0 and stats['held'] > 0
+    dispatcher.stop()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    print("\n=== Testing queue overflow ===\n")
+    dispatcher = AlertDispatcher([StubGateway(delay=0.2)], workers=1, max_queue=1)
+    start = time.perf_counter()
+    results = [dispatcher.dispatch({'tourist_id': f"T{i}"}, "alert") for i in range(5)]
+    assert time.perf_counter() - start < 0.1
+    assert results.count(False) >= 3 and dispatcher.get_stats()['dropped'] == results.count(False)
+    dispatcher.stop()
+
+
+def test_webhook_channel_reuses_connection():
+    print("\n=== Testing webhook channel ===\n")
+    received = []
+    clients = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            clients.add(self.client_address)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        dispatcher = AlertDispatcher([WebhookChannel(f"http://127.0.0.1:{server.server_port}/alerts")], workers=1)
+        geo = GeoFencingSystem(dispatcher)
+        for i in range(3):
+            geo.generate_alert(f"T{i}", 28.6, 77.2, 8)
+        assert dispatcher.wait_idle(5)
+        dispatcher.stop()
+    finally:
+        server.shutdown()
+
+    print(f"Received {len(received)} webhooks over {len(clients)} connection(s)")
+    assert [r['alert']['tourist_id'] for r in received] == ["T0", "T1", "T2"]
+    assert received[0]['alert']['alert_type'] == 'geo_fence_breach'
+    assert isinstance(received[0]['alert']['timestamp'], str)
+    assert len(clients) == 1
+
+
+if __name__ == "__main__":
+    test_generate_alert_does_not_wait_for_delivery()
+    test_failed_sends_are_retried_per_channel()
+    test_alerts_held_while_circuit_open()
+    test_full_queue_drops_instead_of_blocking()
+    test_webhook_channel_reuses_connection()
+    print("\nAll alert tests completed!")
@@ -0,0 +1,104 @@
+"""
+Test script for streaming behavior/health anomaly detection
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from app.ai_models import SmartTouristSafetySystem
+from app.services.anomaly import AnomalyDetector, WindowStats
+
+
+def test_window_stats_match_numpy():
+    print("\n=== Testing sliding window statistics ===\n")
+    rng = random.Random(3)
+    stats = WindowStats(window=50, alpha=0.2)
+    values = [rng.gauss(70, 8) for _ in range(500)]
+    for i, value in enumerate(values):
+        stats.push(value)
+        recent = values[max(0, i - 49):i + 1]
+        assert abs(stats.mean - np.mean(recent)) < 1e-9
+        if len(recent) > 1:
+            assert abs(stats.std - np.std(recent, ddof=1)) < 1e-6
+    print(f"mean={stats.mean:.3f} std={stats.std:.3f} ewma={stats.ewma:.3f}")
+
+
+def test_spike_and_drift_flagged():
+    print("\n=== Testing spike and drift detection ===\n")
+    detector = AnomalyDetector(window=60, warmup=20)
+    rng = random.Random(5)
+    baseline = [{'heart_rate': rng.gauss(75, 3)} for _ in range(60)]
+    for health in baseline:
+        assert detector.observe("T1", detector.readings(health_data=health)) == []
+
+    spike = detector.observe("T1", detector.readings(health_data={'heart_rate': 140, 'note': 'ok', 'alert': True}))
+    print(f"Spike: {spike}")
+    assert [a['kind'] for a in spike] == ['spike'] and spike[0]['signal'] == 'heart_rate'
+
+    # Sustained shift of ~3 std devs: no single reading is extreme, but the EWMA moves away
+    flagged = []
+    for _ in range(15):
+        flagged += detector.observe("T1", detector.readings(health_data={'heart_rate': rng.gauss(84, 1)}))
+    print(f"Shift: {flagged}")
+    assert [a['kind'] for a in flagged] == ['drift']
+
+    # Other tourists keep their own baselines
+    assert detector.observe("T2", detector.readings(health_data={'heart_rate': 140})) == []
+
+
+def test_behavior_vectors_and_eviction():
+    print("\n=== Testing behavior vectors ===\n")
+    detector = AnomalyDetector(window=30, warmup=10, max_tourists=2)
+    rng = random.Random(7)
+    rows = [[rng.gauss(1.2, 0.1), rng.gauss(0, 0.05)] for _ in range(30)]
+    assert detector.observe("T1", detector.readings(behavior_data=rows)) == []
+    anomalies = detector.observe("T1", detector.readings(behavior_data=[[1.2, 3.0]]))
+    assert [a['signal'] for a in anomalies] == ['behavior_1']
+
+    detector.observe("T2", [])
+    detector.observe("T3", [])
+    assert detector.get_stats()['tourists'] == 2 and detector.get_stats()['evicted'] == 1
+
+
+def test_process_response_includes_anomalies():
+    print("\n=== Testing anomalies in the process response ===\n")
+    system = SmartTouristSafetySystem(anomaly_detector=AnomalyDetector(warmup=5))
+    for i in range(10):
+        result = asyncio.run(system.process_tourist_data("T1", {'health_data': {'heart_rate': 72 + i % 3}}))
+        assert result['anomalies'] == []
+    result = asyncio.run(system.process_tourist_data("T1", {'health_data': {'heart_rate': 190}}))
+    print(f"Response anomalies: {result['anomalies']}")
+    assert result['anomalies'][0]['kind'] == 'spike'
+
+
+def test_update_cost_independent_of_history():
+    print("\n=== Testing per-reading cost ===\n")
+    detector = AnomalyDetector(window=256)
+    readings = detector.readings(behavior_data=[[1.0, 2.0, 3.0]], health_data={'heart_rate': 70})
+
+    timings = []
+    for history in (1000, 20000):
+        for _ in range(history):
+            detector.observe("T1", readings)
+        start = time.perf_counter()
+        for _ in range(5000):
+            detector.observe("T1", readings)
+        timings.append((time.perf_counter() - start) / 5000)
+    print(f"Per update after 1k / 20k readings: {timings[0] * 1e6:.1f} us / {timings[1] * 1e6:.1f} us")
+    assert timings[1] < timings[0] * 3
+
+
+if __name__ == "__main__":
+    test_window_stats_match_numpy()
+    test_spike_and_drift_flagged()
+    test_behavior_vectors_and_eviction()
+    test_process_response_includes_anomalies()
+    test_update_cost_independent_of_history()
+    print("\nAll anomaly tests completed!")
@@ -0,0 +1,207 @@
+"""
+Test script for the real-time dashboard fan-out
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+import fakeredis
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app.services.alerts import AlertDispatcher
+from app.services.dashboard_hub import DashboardHub, DashboardChannel, _Connection
+from app.services.streaming_analytics import combine_metrics
+
+
+def make_app(hub):
+    app = FastAPI()
+
+    @app.websocket("/ws/dashboard")
+    async def ws_dashboard(ws: WebSocket):
+        await ws.accept()
+        await hub.serve(ws)
+
+    return app
+
+
+def wait_for_connections(hub, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while hub.get_stats()['connections'] < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_events_batched_per_tick():
+    print("\n=== Testing batched fan-out ===\n")
+    hub = DashboardHub(tick=0.05, redis_client=None)
+    # Entering the client runs every websocket on one event loop, as in a server worker
+    with TestClient(make_app(hub)) as client, \
+            client.websocket_connect("/ws/dashboard") as ws1, client.websocket_connect("/ws/dashboard") as ws2:
+        assert ws1.receive_json()['type'] == 'hello' and ws2.receive_json()['type'] == 'hello'
+        wait_for_connections(hub, 2)
+
+        hub.publish("efir", {"efir_number": "EFIR1"})
+        hub.publish("metrics", {"active_tourists": 10}, key="metrics")
+        hub.publish("efir", {"efir_number": "EFIR2"})
+        hub.publish("metrics", {"active_tourists": 11}, key="metrics")
+
+        for ws in (ws1, ws2):
+            frame = ws.receive_json()
+            print(f"Frame: {frame}")
+            assert frame['type'] == 'batch'
+            assert [(e['type'], e['data']) for e in frame['events']] == [
+                ("efir", {"efir_number": "EFIR1"}),
+                ("efir", {"efir_number": "EFIR2"}),
+                ("metrics", {"active_tourists": 11}),   # Only the latest keyed event
+            ]
+    assert hub.get_stats()['frames'] == 1
+    hub.stop()
+
+
+def test_events_cross_workers_through_redis():
+    print("\n=== Testing Redis pub/sub between workers ===\n")
+    server = fakeredis.FakeServer()
+    publisher = DashboardHub(tick=0.05, redis_client=fakeredis.FakeRedis(server=server))
+    subscriber = DashboardHub(tick=0.05, redis_client=fakeredis.FakeRedis(server=server))
+    subscriber.start()
+    time.sleep(0.2)   # Let the listener subscribe
+
+    dispatcher = AlertDispatcher([DashboardChannel(publisher)], workers=1)
+    with TestClient(make_app(subscriber)) as client, client.websocket_connect("/ws/dashboard") as ws:
+        ws.receive_json()
+        wait_for_connections(subscriber, 1)
+        dispatcher.dispatch({'tourist_id': "T1", 'alert_type': 'geo_fence_breach'}, "ALERT: T1")
+        frame = ws.receive_json()
+        print(f"Frame from the other worker: {frame}")
+        event = frame['events'][0]
+        assert event['type'] == 'alert' and event['data']['tourist_id'] == "T1"
+        assert event['data']['message'] == "ALERT: T1"
+    dispatcher.stop()
+    subscriber.stop()
+
+
+def test_worker_metrics_added_up():
+    print("\n=== Testing metrics combined across workers ===\n")
+    hub = DashboardHub(tick=60, redis_client=None)
+    hub.add_periodic("metrics", lambda: {}, 10, combine=combine_metrics)
+
+    def from_worker(worker, active, published_at=None):
+        # What another worker's periodic publish looks like once it arrives over Redis
+        message = json.dumps({'type': 'metrics', 'key': f"metrics:{worker}", 'worker': worker,
+                              'data': {'active_tourists': active, 'unique_tourists_by_region': {'28.5,77.0': active}},
+                              'published_at': published_at or time.time()})
+        hub._receive(message, f"metrics:{worker}")
+
+    hub.publish("metrics", {'active_tourists': 3, 'unique_tourists_by_region': {'28.5,77.0': 3}},
+                key=f"metrics:{hub.worker_id}")
+    from_worker("other", 4)
+    events = json.loads(hub._take_batch())['events']
+    print(f"Events: {events}")
+    assert len(events) == 1 and events[0]['workers'] == 2
+    assert events[0]['data']['active_tourists'] == 7
+    assert events[0]['data']['unique_tourists_by_region'] == {'28.5,77.0': 7}
+
+    # Nothing new, nothing sent; a worker that stopped publishing drops out
+    assert hub._take_batch() is None
+    from_worker("other", 5, published_at=time.time() - 60)
+    events = json.loads(hub._take_batch())['events']
+    assert events[0]['workers'] == 1 and events[0]['data']['active_tourists'] == 3
+    assert hub.get_stats()['workers'] == {'metrics': 1}
+
+
+class StalledSocket:
+    """A dashboard that never finishes receiving"""
+
+    def __init__(self):
+        self.closed_with = None
+        self._never = asyncio.Event()
+
+    async def send_text(self, text):
+        await self._never.wait()
+
+    async def send_json(self, data):
+        pass
+
+    async def receive_text(self):
+        await self._never.wait()
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class FastSocket:
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, text):
+        self.frames += 1
+
+
+def test_slow_dashboard_dropped():
+    print("\n=== Testing slow consumer handling ===\n")
+
+    async def scenario():
+        hub = DashboardHub(tick=60, queue_size=4, max_dropped=3, redis_client=None)
+        slow = StalledSocket()
+        serving = asyncio.create_task(hub.serve(slow))
+        await asyncio.sleep(0)
+        fast = [FastSocket() for _ in range(3)]
+        connections = [_Connection(socket, 4) for socket in fast]
+        hub._connections.extend(connections)
+        senders = [asyncio.create_task(c.send_loop()) for c in connections]
+        await asyncio.sleep(0)
+
+        for i in range(10):
+            hub.publish("efir", {"n": i})
+            hub.broadcast_pending()
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        stats = hub.get_stats()
+        print(f"Stats: {stats}")
+        # One frame is in flight, four are queued, then three drops disconnect the dashboard
+        assert stats['slow_disconnects'] == 1 and stats['frames_dropped'] == 3
+        assert slow.closed_with == 1013 and stats['connections'] == 3
+        assert all(socket.frames == 10 for socket in fast)
+        for task in senders + [serving]:
+            task.cancel()
+        hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_publish_cost_independent_of_dashboards():
+    print("\n=== Testing fan-out cost ===\n")
+
+    async def scenario():
+        hub = DashboardHub(tick=60, queue_size=1000, redis_client=None)
+        for _ in range(500):
+            hub._connections.append(_Connection(FastSocket(), 1000))
+
+        start = time.perf_counter()
+        for i in range(1000):
+            hub.publish("alert", {"tourist_id": f"T{i}", "risk_level": 8})
+        publish_us = (time.perf_counter() - start) / 1000 * 1e6
+
+        start = time.perf_counter()
+        reached = hub.broadcast_pending()
+        broadcast_ms = (time.perf_counter() - start) * 1000
+        print(f"publish: {publish_us:.1f} us/event, one tick to 500 dashboards: {broadcast_ms:.2f} ms")
+        assert reached == 500 and hub.get_stats()['frames'] == 1
+        assert all(c.queue.qsize() == 1 for c in hub._connections)
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_events_batched_per_tick()
+    test_events_cross_workers_through_redis()
+    test_worker_metrics_added_up()
+    test_slow_dashboard_dropped()
+    test_publish_cost_independent_of_dashboards()
+    print("\nAll dashboard hub tests completed!")
@@ -0,0 +1,173 @@
+"""
+Test script for snowflake EFIR numbers and the append-only EFIR log
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import threading
+import time
+
+import fakeredis
+
+from app.ai_models import AutomatedEFIRGenerator
+from app.services.efir_ids import SnowflakeIdGenerator, id_timestamp, id_worker
+from app.services.efir_log import EFIRLog, open_worker_log
+
+
+def test_ids_unique_and_increasing_under_threads():
+    print("\n=== Testing snowflake ids from many threads ===\n")
+    generator = SnowflakeIdGenerator(worker_id=7, redis_client=None)
+    per_thread = {}
+
+    def issue(name):
+        per_thread[name] = [generator.next_id() for _ in range(20000)]
+
+    threads = [threading.Thread(target=issue, args=(i,)) for i in range(4)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [i for issued in per_thread.values() for i in issued]
+    print(f"{len(ids)} ids, stats {generator.get_stats()}")
+    assert len(set(ids)) == len(ids)
+    assert all(issued == sorted(issued) for issued in per_thread.values())
+    assert all(id_worker(i) == 7 for i in ids)
+    assert start - 1 <= id_timestamp(ids[0]) <= time.time() + 1
+
+
+def test_workers_lease_distinct_ids():
+    print("\n=== Testing worker id leases through Redis ===\n")
+    redis = fakeredis.FakeStrictRedis()
+    workers = [SnowflakeIdGenerator(redis_client=redis) for _ in range(5)]
+    worker_ids = [w.worker_id for w in workers]
+    print(f"Leased worker ids: {worker_ids}")
+    assert len(set(worker_ids)) == 5
+
+    # Same millisecond, different workers: still no collision
+    ids = [w.next_id() for w in workers for _ in range(1000)]
+    assert len(set(ids)) == len(ids)
+
+    # A released id is free again; a lease lost to another worker is replaced on the next id
+    workers[0].release()
+    assert not redis.exists(f"saferove:snowflake-worker:{worker_ids[0]}")
+    redis.set(f"saferove:snowflake-worker:{worker_ids[1]}", "someone-else")
+    workers[1]._renew_at = 0
+    workers[1].next_id()
+    assert workers[1].worker_id != worker_ids[1]
+
+
+def test_workers_without_redis_lock_distinct_ids():
+    print("\n=== Testing host-local worker id leases ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        workers = [SnowflakeIdGenerator(redis_client=None, lease_dir=directory) for _ in range(3)]
+        print(f"Worker ids: {[w.worker_id for w in workers]}")
+        assert [w.worker_id for w in workers] == [0, 1, 2]
+        assert all(w.get_stats()['host_leased'] for w in workers)
+
+        # A released id goes to the next worker to start
+        workers[1].release()
+        assert SnowflakeIdGenerator(redis_client=None, lease_dir=directory).worker_id == 1
+
+
+def test_log_append_get_and_scan():
+    print("\n=== Testing EFIR log lookups and range scans ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        log = EFIRLog(directory, segment_bytes=2000, fsync=False)
+        base = 1_750_000_000
+        efirs = [{'complaint_number': f"EFIR{i}", 'date_time': base + i * 60, 'incident_details': {'n': i}}
+                 for i in range(50)]
+        for efir in efirs[:10]:
+            log.append(efir)
+        log.append_many(efirs[10:])
+        stats = log.get_stats()
+        print(f"Stats: {stats}")
+        assert len(log) == 50 and stats['segments_rolled'] >= 1
+
+        assert log.get("EFIR42")['incident_details'] == {'n': 42}
+        assert log.get("EFIR999") is None
+        window = log.scan(base + 600, base + 1200)
+        assert [e['complaint_number'] for e in window] == [f"EFIR{i}" for i in range(10, 20)]
+        newest = log.scan(limit=3, newest_first=True)
+        assert [e['complaint_number'] for e in newest] == ["EFIR49", "EFIR48", "EFIR47"]
+
+        try:
+            log.append(efirs[0])
+            raise AssertionError("Expected a duplicate complaint number to be rejected")
+        except ValueError:
+            pass
+
+        # A second process cannot write the same directory
+        try:
+            EFIRLog(directory)
+            raise AssertionError("Expected the directory to be locked")
+        except RuntimeError as e:
+            print(f"Second writer: {e}")
+        log.close()
+
+
+def test_log_recovers_after_crash():
+    print("\n=== Testing index rebuild and torn-write recovery ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        log = EFIRLog(directory, fsync=False)
+        for i in range(5):
+            log.append({'complaint_number': f"EFIR{i}", 'date_time': 1_750_000_000 + i})
+        log.close()
+        # Half-written record at the end, as after a crash mid-append
+        segment = os.path.join(directory, sorted(f for f in os.listdir(directory) if f.endswith('.seg'))[-1])
+        with open(segment, 'ab') as f:
+            f.write(b'\x00\x00\x01\x00garbage')
+
+        reopened = EFIRLog(directory, fsync=False)
+        print(f"Stats after reopen: {reopened.get_stats()}")
+        assert len(reopened) == 5 and reopened.get_stats()['truncated_bytes'] == 11
+        reopened.append({'complaint_number': "EFIR5", 'date_time': 1_750_000_005})
+        reopened.close()
+        assert [e['complaint_number'] for e in EFIRLog(directory).scan()] == [f"EFIR{i}" for i in range(6)]
+
+
+def test_workers_reclaim_their_directories():
+    print("\n=== Testing per-worker log directories across restarts ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        logs = [open_worker_log(directory, fsync=False) for _ in range(3)]
+        print(f"Directories: {[log.directory for log in logs]}")
+        assert [os.path.relpath(log.directory, directory) for log in logs] == ['.', 'worker-1', 'worker-2']
+        for i, log in enumerate(logs):
+            log.append({'complaint_number': f"EFIR{i}", 'date_time': 1_750_000_000 + i})
+            log.close()
+
+        # Restarted workers get the same directories back, with what they wrote
+        restarted = [open_worker_log(directory, fsync=False) for _ in range(3)]
+        assert [log.get(f"EFIR{i}") is not None for i, log in enumerate(restarted)] == [True] * 3
+        assert len(restarted[0]) == 1
+        for log in restarted:
+            log.close()
+
+
+def test_generator_numbers_and_logs_efirs():
+    print("\n=== Testing EFIR generation ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        log = EFIRLog(directory, fsync=False)
+        generator = AutomatedEFIRGenerator(SnowflakeIdGenerator(worker_id=1, redis_client=None), log)
+        numbers = [generator.generate_efir({'incident_type': 'THEFT', 'circumstances': 'Bag snatched'})['complaint_number']
+                   for _ in range(200)]
+        print(f"First numbers: {numbers[:2]}")
+        # The old timestamp numbers collided within a second; these never do
+        assert len(set(numbers)) == 200 and all(n.startswith("EFIR") for n in numbers)
+        assert log.get(numbers[-1])['incident_details']['type'] == 'THEFT'
+        log.close()
+
+
+if __name__ == "__main__":
+    test_ids_unique_and_increasing_under_threads()
+    test_workers_lease_distinct_ids()
+    test_workers_without_redis_lock_distinct_ids()
+    test_log_append_get_and_scan()
+    test_log_recovers_after_crash()
+    test_workers_reclaim_their_directories()
+    test_generator_numbers_and_logs_efirs()
+    print("\nAll EFIR log tests completed!")
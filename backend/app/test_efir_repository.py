@@ -0,0 +1,114 @@
+"""
+Test script for MongoDB EFIR storage: bulk writes, indexes and paginated queries
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+
+import mongomock
+
+from app.ai_models import AutomatedEFIRGenerator
+from app.services.efir_ids import SnowflakeIdGenerator
+from app.services.efir_repository import EFIRRepository, SUMMARY_FIELDS
+
+BASE = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def _efir(i, status='REGISTERED', tourist='T0'):
+    return {
+        'complaint_number': f"EFIR{i:06d}",
+        'date_time': (BASE + timedelta(minutes=i // 2)).isoformat(),   # pairs share a timestamp
+        'status': status,
+        'complainant_details': {'tourist_id': tourist, 'passport_number': 'P123'},
+        'incident_details': {'type': 'THEFT', 'severity': 'HIGH', 'description': 'Bag snatched'},
+        'evidence': ['photo.jpg'],
+    }
+
+
+def _repository(**kwargs):
+    return EFIRRepository(mongomock.MongoClient().db.efirs, **kwargs)
+
+
+def test_bulk_writes_and_indexes():
+    print("\n=== Testing batched EFIR writes ===\n")
+    repository = _repository(batch_size=100)
+    repository.ensure_indexes()
+    indexes = repository.collection.index_information()
+    print(f"Indexes: {sorted(indexes)}")
+    assert {'status_date_time', 'date_time', 'tourist_id'} <= set(indexes)
+
+    repository.add_many(_efir(i) for i in range(250))
+    # Two full batches written inline, the rest waits for the next flush
+    assert repository.collection.count_documents({}) == 200
+    assert repository.get("EFIR000240")['evidence'] == ['photo.jpg']
+    assert repository.flush() == 50
+    stats = repository.get_stats()
+    print(f"Stats: {stats}")
+    assert stats['written'] == 250 and stats['batches'] == 3 and stats['pending'] == 0
+
+    # Already stored EFIRs (a retried batch) count as duplicates, not errors
+    repository.add_many([_efir(0), _efir(1), _efir(250)])
+    repository.flush()
+    stats = repository.get_stats()
+    assert stats['duplicates'] == 2 and stats['write_errors'] == 0
+    assert repository.collection.count_documents({}) == 251
+
+
+def test_pagination_and_filters():
+    print("\n=== Testing keyset pagination ===\n")
+    repository = _repository()
+    repository.add_many(_efir(i, status='CLOSED' if i % 3 == 0 else 'REGISTERED', tourist=f"T{i % 4}")
+                        for i in range(95))
+    repository.flush()
+
+    seen, cursor = [], None
+    while True:
+        page = repository.query(limit=20, cursor=cursor)
+        seen += [efir['complaint_number'] for efir in page['efirs']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    print(f"{len(seen)} EFIRs over {len(seen) // 20 + 1} pages")
+    assert seen == [f"EFIR{i:06d}" for i in reversed(range(95))]
+
+    page = repository.query(status='CLOSED', limit=200)
+    assert len(page['efirs']) == 32 and all(e['status'] == 'CLOSED' for e in page['efirs'])
+    page = repository.query(tourist_id='T1', start=BASE, end=(BASE + timedelta(minutes=10)).isoformat())
+    assert [e['complaint_number'] for e in page['efirs']] == ["EFIR000017", "EFIR000013", "EFIR000009",
+                                                              "EFIR000005", "EFIR000001"]
+
+    # Summary fields only unless asked for more; evidence is never returned by queries
+    summary = page['efirs'][0]
+    assert set(summary) == set(SUMMARY_FIELDS) and summary['incident_type'] == 'THEFT'
+    detailed = repository.query(limit=1, fields=['complaint_number', 'incident_details'])['efirs'][0]
+    assert detailed['incident_details']['description'] == 'Bag snatched'
+
+    for bad in ({'limit': 0}, {'cursor': '???'}, {'fields': ['evidence']}):
+        try:
+            repository.query(**bad)
+            raise AssertionError(f"Expected ValueError for {bad}")
+        except ValueError as e:
+            print(f"{bad}: {e}")
+
+
+def test_generator_writes_through():
+    print("\n=== Testing EFIR generation into MongoDB ===\n")
+    repository = _repository()
+    generator = AutomatedEFIRGenerator(SnowflakeIdGenerator(worker_id=2, redis_client=None),
+                                       efir_repository=repository)
+    number = generator.generate_efir({'tourist_id': 'T9', 'incident_type': 'ASSAULT'})['complaint_number']
+    # Readable before the background flush
+    assert repository.get(number)['incident_details']['type'] == 'ASSAULT'
+    repository.start()
+    repository.stop()
+    assert repository.query(tourist_id='T9')['efirs'][0]['complaint_number'] == number
+
+
+if __name__ == "__main__":
+    test_bulk_writes_and_indexes()
+    test_pagination_and_filters()
+    test_generator_writes_through()
+    print("\nAll EFIR repository tests completed!")
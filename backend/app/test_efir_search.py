@@ -0,0 +1,181 @@
+"""
+Test script for full-text EFIR search
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+import random
+import tempfile
+import time
+
+import mongomock
+
+from app.ai_models import AutomatedEFIRGenerator
+from app.services.efir_ids import SnowflakeIdGenerator
+from app.services.efir_log import EFIRLog
+from app.services.efir_repository import EFIRRepository
+from app.services.efir_search import EFIRSearchIndex, tokenize
+
+BASE = 1_750_000_000
+
+TEXTS = [
+    ("MEDICAL", "HIGH", "Tourist fell from the fort wall, bleeding heavily from the head"),
+    ("MEDICAL", "MEDIUM", "Minor bleeding after a fall near the market"),
+    ("THEFT", "LOW", "Wallet stolen near the fort gate"),
+    ("THEFT", "MEDIUM", "Phone snatched by two men on a bike near the lake"),
+    ("MISSING_PERSON", "HIGH", "Child missing since evening near the fort, last seen at the ticket counter"),
+    ("ASSAULT", "HIGH", "Tourist assaulted near the lake, bleeding from a cut on the arm"),
+]
+
+
+def _efir(i, incident_type, severity, text):
+    return {
+        'complaint_number': f"EFIR{i}",
+        'date_time': BASE + i * 3600,
+        'incident_details': {'type': incident_type, 'severity': severity, 'description': text, 'circumstances': ''},
+    }
+
+
+def _index():
+    index = EFIRSearchIndex()
+    index.add_many(_efir(i, *entry) for i, entry in enumerate(TEXTS))
+    return index
+
+
+def _bm25(query, documents, k1=1.2, b=0.75):
+    """Reference BM25 straight from the formula"""
+    tokenized = [tokenize(text) for text in documents]
+    average = sum(map(len, tokenized)) / len(tokenized)
+    scores = []
+    for tokens in tokenized:
+        score = 0.0
+        for term in dict.fromkeys(tokenize(query)):
+            df = sum(term in t for t in tokenized)
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / average))
+        scores.append(score)
+    return scores
+
+
+def test_ranking_matches_bm25():
+    print("\n=== Testing BM25 ranking ===\n")
+    index = _index()
+    result = index.search("bleeding near fort")
+    print(f"Hits: {[(h['complaint_number'], h['score']) for h in result['hits']]}")
+    expected = _bm25("bleeding near fort", [text for _, _, text in TEXTS])
+    assert result['total'] == sum(score > 0 for score in expected)
+    for hit in result['hits']:
+        assert abs(hit['score'] - expected[int(hit['complaint_number'][4:])]) < 1e-3
+    assert [h['score'] for h in result['hits']] == sorted((h['score'] for h in result['hits']), reverse=True)
+    assert result['hits'][0]['complaint_number'] in ("EFIR0", "EFIR4")
+
+    assert [h['complaint_number'] for h in index.search("bleeding fort", match_all=True)['hits']] == ["EFIR0"]
+    assert index.search("volcano")['total'] == 0
+    assert index.search("bleeding volcano", match_all=True)['total'] == 0
+
+
+def test_filters_and_incremental_updates():
+    print("\n=== Testing filters and incremental indexing ===\n")
+    index = _index()
+    assert {h['complaint_number'] for h in index.search("near", incident_type='THEFT')['hits']} == {"EFIR2", "EFIR3"}
+    assert [h['complaint_number'] for h in index.search("bleeding", severity='MEDIUM')['hits']] == ["EFIR1"]
+    window = index.search("near", start=BASE + 3 * 3600, end=BASE + 5 * 3600)
+    assert {h['complaint_number'] for h in window['hits']} == {"EFIR3", "EFIR4"}
+    assert index.search("near", incident_type='FRAUD')['total'] == 0
+
+    assert index.search("pickpocket")['total'] == 0
+    assert index.add(_efir(6, "THEFT", "LOW", "Pickpocket at the bus stand"))
+    assert not index.add(_efir(6, "THEFT", "LOW", "Pickpocket at the bus stand"))
+    assert [h['complaint_number'] for h in index.search("pickpocket")['hits']] == ["EFIR6"]
+    print(f"Stats: {index.get_stats()}")
+    assert index.get_stats()['duplicates'] == 1
+
+    for bad in ({'query': 'the and of'}, {'query': 'fort', 'limit': 0}):
+        try:
+            index.search(**bad)
+            raise AssertionError(f"Expected ValueError for {bad}")
+        except ValueError as e:
+            print(f"{bad}: {e}")
+
+
+def test_generated_efirs_are_searchable_and_rebuilt_from_log():
+    print("\n=== Testing search over generated EFIRs ===\n")
+    with tempfile.TemporaryDirectory() as directory:
+        log = EFIRLog(directory, fsync=False)
+        index = EFIRSearchIndex()
+        generator = AutomatedEFIRGenerator(SnowflakeIdGenerator(worker_id=3, redis_client=None), log,
+                                           search_index=index)
+        number = generator.generate_efir({'incident_type': 'MEDICAL', 'severity': 'HIGH',
+                                          'circumstances': 'Collapsed from heatstroke at the stepwell'})['complaint_number']
+        generator.generate_efir({'incident_type': 'THEFT', 'circumstances': 'Camera stolen'})
+        hits = index.search("heatstroke stepwell", incident_type='MEDICAL')['hits']
+        assert [h['complaint_number'] for h in hits] == [number]
+
+        # A restarted worker rebuilds the same index from its log
+        rebuilt = EFIRSearchIndex()
+        assert rebuilt.add_many(log) == 2
+        assert rebuilt.search("heatstroke stepwell") == index.search("heatstroke stepwell")
+        log.close()
+
+
+def test_index_follows_other_workers_through_repository():
+    print("\n=== Testing search across workers through MongoDB ===\n")
+    repository = EFIRRepository(mongomock.MongoClient().db.efirs)
+    workers = []
+    for worker_id in (1, 2):
+        index = EFIRSearchIndex()
+        generator = AutomatedEFIRGenerator(SnowflakeIdGenerator(worker_id=worker_id, redis_client=None),
+                                           efir_repository=repository, search_index=index)
+        workers.append((index, generator))
+
+    first = workers[0][1].generate_efir({'incident_type': 'MEDICAL', 'circumstances': 'Fainted at the stepwell'})
+    second = workers[1][1].generate_efir({'incident_type': 'THEFT', 'circumstances': 'Camera stolen at the stepwell'})
+    repository.flush()
+    index = workers[0][0]
+    assert index.search("stepwell")['total'] == 1
+
+    assert index.sync(repository) == 1
+    assert {h['complaint_number'] for h in index.search("stepwell")['hits']} == {first['complaint_number'],
+                                                                                  second['complaint_number']}
+    # Later syncs only re-read the overlap window and index nothing twice
+    third = workers[1][1].generate_efir({'incident_type': 'THEFT', 'circumstances': 'Phone stolen at the fort'})
+    repository.flush()
+    assert index.sync(repository) == 1
+    assert index.search("fort")['hits'][0]['complaint_number'] == third['complaint_number']
+    stats = index.get_stats()
+    print(f"Stats: {stats}")
+    assert stats['scope'] == 'all_workers' and stats['efirs'] == 3
+
+
+def test_search_over_many_efirs():
+    print("\n=== Testing search over many EFIRs ===\n")
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(2000)] + ["bleeding", "fort", "lake", "stolen", "missing"]
+    index = EFIRSearchIndex()
+    n = 200_000
+    for i in range(n):
+        index.add({'complaint_number': f"EFIR{i}", 'date_time': BASE + i,
+                   'incident_details': {'type': rng.choice(["THEFT", "MEDICAL"]), 'severity': 'LOW',
+                                        'description': " ".join(rng.choices(words, k=12))}})
+
+    start = time.perf_counter()
+    result = index.search("bleeding near fort", incident_type='MEDICAL', start=BASE + n // 2)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"{result['total']} matches among {n} EFIRs in {elapsed_ms:.1f} ms; stats {index.get_stats()}")
+    assert result['total'] > 0 and len(result['hits']) == 20
+    assert all(h['incident_type'] == 'MEDICAL' for h in result['hits'])
+    assert all(int(h['complaint_number'][4:]) >= n // 2 for h in result['hits'])
+
+
+if __name__ == "__main__":
+    test_ranking_matches_bm25()
+    test_filters_and_incremental_updates()
+    test_generated_efirs_are_searchable_and_rebuilt_from_log()
+    test_index_follows_other_workers_through_repository()
+    test_search_over_many_efirs()
+    print("\nAll EFIR search tests completed!")
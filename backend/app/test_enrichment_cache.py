@@ -0,0 +1,77 @@
+"""
+Test script for the two-tier (in-process + Redis) enrichment cache
+Uses fakeredis so no Redis server is needed
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeredis
+
+from app.services.cache import TwoTierCache, dumps, loads
+from app.services.ncrb_service import NCRBService
+
+
+def test_serialization_roundtrip():
+    print("\n=== Testing compact serialization ===\n")
+    small = {'a': 1, 'b': [1, 2, 3]}
+    large = {'records': [{'crime_type': 'theft', 'date': '2024-01-01'}] * 100}
+
+    assert loads(dumps(small)) == small
+    assert loads(dumps(large)) == large
+    assert dumps(large)[:1] == b'z'
+    print(f"Small payload: {len(dumps(small))} bytes, large payload: {len(dumps(large))} bytes")
+
+
+def test_shared_between_workers():
+    print("\n=== Testing L2 sharing between two workers ===\n")
+    server = fakeredis.FakeServer()
+    worker_a = TwoTierCache('test', ttl=60, redis_client=fakeredis.FakeStrictRedis(server=server))
+    worker_b = TwoTierCache('test', ttl=60, redis_client=fakeredis.FakeStrictRedis(server=server))
+
+    worker_a.set('k', {'value': 42})
+    assert worker_b.get('k') == {'value': 42}
+    assert worker_b.get('k') == {'value': 42}
+
+    stats = worker_b.get_stats()
+    print(f"Worker B stats: {stats}")
+    assert stats['l2_hits'] == 1 and stats['l1_hits'] == 1
+
+
+def test_l1_only_without_redis():
+    print("\n=== Testing L1-only mode ===\n")
+    cache = TwoTierCache('test', ttl=60, redis_client=None)
+    assert cache.get('missing') is None
+    cache.set('k', [1, 2])
+    assert cache.get('k') == [1, 2]
+    print(f"Stats: {cache.get_stats()}")
+
+
+def test_ncrb_service_uses_shared_cache():
+    print("\n=== Testing NCRBService with shared cache ===\n")
+    server = fakeredis.FakeServer()
+    calls = []
+
+    def make_worker():
+        service = NCRBService('test-key', cache=TwoTierCache(
+            'ncrb', ttl=3600, redis_client=fakeredis.FakeStrictRedis(server=server)))
+        service._get_location_details = lambda lat, lng: calls.append((lat, lng)) or ('Delhi', 'New Delhi')
+        service._fetch_crime_data = lambda state, district: {'total_crimes': 10, 'recent_crimes': 2,
+                                                             'crime_categories': {'theft': 10}}
+        return service
+
+    first = make_worker().get_crime_data_by_location(28.6139, 77.2090)
+    second = make_worker().get_crime_data_by_location(28.6139, 77.2090)
+
+    print(f"Upstream lookups: {len(calls)}")
+    assert len(calls) == 1
+    assert first == second
+
+
+if __name__ == "__main__":
+    test_serialization_roundtrip()
+    test_shared_between_workers()
+    test_l1_only_without_redis()
+    test_ncrb_service_uses_shared_cache()
+    print("\nAll enrichment cache tests completed!")
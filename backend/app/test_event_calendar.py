@@ -0,0 +1,71 @@
+"""
+Test script for the event calendar interval index
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import time
+
+import pandas as pd
+
+from app.ai_models import TouristFlowPredictor
+from app.services.event_calendar import EventCalendar
+
+CALENDAR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'event_calendar.json')
+
+
+def brute_force_score(events, location_id, ts, default=5):
+    active = [e['impact'] for e in events
+              if e.get('location_id') in (None, location_id)
+              and pd.Timestamp(e['start']) <= ts < pd.Timestamp(e['end'])]
+    return max(active) if active else default
+
+
+def test_lookup_matches_brute_force():
+    print("\n=== Testing event calendar lookups ===\n")
+    rng = random.Random(7)
+    base = pd.Timestamp('2026-01-01')
+    events = []
+    for i in range(300):
+        start = base + pd.Timedelta(hours=rng.randint(0, 24 * 365))
+        end = start + pd.Timedelta(hours=rng.randint(1, 24 * 10))
+        events.append({'name': f'event {i}', 'location_id': rng.choice([None, 1, 2, 3]),
+                       'start': start.isoformat(), 'end': end.isoformat(), 'impact': rng.randint(1, 10)})
+    calendar = EventCalendar(events)
+
+    for _ in range(2000):
+        location_id = rng.choice([1, 2, 3, 42])
+        ts = base + pd.Timedelta(minutes=rng.randint(0, 60 * 24 * 370))
+        assert calendar.score(location_id, ts) == brute_force_score(events, location_id, ts), (location_id, ts)
+
+    times = pd.date_range(base, periods=24 * 365, freq='h')
+    start = time.perf_counter()
+    scores = calendar.scores(2, times)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert all(scores[i] == calendar.score(2, times[i]) for i in range(0, len(times), 97))
+    print(f"{len(times)} batch lookups in {elapsed_ms:.2f} ms")
+
+
+def test_calendar_file_and_flow_scores():
+    print("\n=== Testing event calendar file ===\n")
+    calendar = EventCalendar.from_file(CALENDAR_PATH)
+    print(f"Loaded: {calendar.get_stats()}")
+    assert calendar.score(3, '2026-11-08T12:00') == 10       # Diwali, city-wide, whole day
+    assert calendar.score(4, '2026-07-15T12:00') == 2        # location-specific closure
+    assert calendar.score(3, '2026-07-15T12:00') == 5
+    assert EventCalendar.from_file('/nonexistent/events.json').score(1, '2026-11-08') == 5
+
+    predictor = TouristFlowPredictor(event_calendar=calendar)
+    times = pd.date_range('2026-11-06', periods=96, freq='h')
+    batch = predictor._get_event_scores(1, times)
+    assert batch.tolist() == [predictor._get_event_score(1, t) for t in times]
+    assert batch.max() == 10 and batch.min() == 5
+
+
+if __name__ == "__main__":
+    test_lookup_matches_brute_force()
+    test_calendar_file_and_flow_scores()
+    print("\nAll event calendar tests completed!")
@@ -0,0 +1,89 @@
+"""
+Test script for the workload executor used by CPU-bound endpoints
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import math
+import time
+
+from app.services.executor import WorkloadExecutor, ExecutorSaturated, THREAD, PROCESS
+from app.services.resilience import deadline, remaining_time
+
+
+def busy_sum(n):
+    """Pure-Python CPU work for the process lane (module level so it can be pickled)"""
+    return sum(math.isqrt(i) for i in range(n))
+
+
+def test_event_loop_stays_responsive():
+    print("\n=== Testing event loop responsiveness ===\n")
+    executor = WorkloadExecutor({'vision': (THREAD, 2, 4)})
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run('vision', time.sleep, 0.3))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        ticked_ms = (time.perf_counter() - start) * 1000
+        await slow
+        return ticked_ms
+
+    ticked_ms = asyncio.run(scenario())
+    print(f"Event loop ticked after {ticked_ms:.1f} ms while a 300 ms job ran")
+    assert ticked_ms < 100
+    assert executor.get_stats()['vision']['completed'] == 1
+
+
+def test_full_lane_rejects():
+    print("\n=== Testing bounded queue ===\n")
+    executor = WorkloadExecutor({'vision': (THREAD, 1, 2)})
+
+    async def scenario():
+        jobs = [asyncio.ensure_future(executor.run('vision', time.sleep, 0.1)) for _ in range(5)]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        return results
+
+    results = asyncio.run(scenario())
+    stats = executor.get_stats()['vision']
+    print(f"Stats: {stats}")
+    assert sum(isinstance(r, ExecutorSaturated) for r in results) == 2
+    assert stats['completed'] == 3 and stats['rejected'] == 2 and stats['queued'] == 0
+    assert stats['max_wait_ms'] >= 100
+
+
+def test_request_context_reaches_workers():
+    print("\n=== Testing deadline propagation ===\n")
+    executor = WorkloadExecutor({'inference': (THREAD, 1, 1)})
+
+    async def scenario():
+        with deadline(5):
+            return await executor.run('inference', remaining_time)
+
+    remaining = asyncio.run(scenario())
+    assert remaining is not None and 0 < remaining <= 5
+
+
+def test_process_lane():
+    print("\n=== Testing process lane ===\n")
+    executor = WorkloadExecutor({'cpu': (PROCESS, 2, 2)})
+
+    async def scenario():
+        return await asyncio.gather(*[executor.run('cpu', busy_sum, 20000) for _ in range(3)])
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert results == [busy_sum(20000)] * 3
+    assert executor.get_stats()['cpu']['completed'] == 3
+
+
+if __name__ == "__main__":
+    test_event_loop_stays_responsive()
+    test_full_lane_rejects()
+    test_request_context_reaches_workers()
+    test_process_lane()
+    print("\nAll executor tests completed!")
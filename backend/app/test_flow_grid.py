@@ -0,0 +1,90 @@
+"""
+Test script for the vectorized tourist flow forecast grid
+Trains a small flow model on synthetic data so no saved model files are needed
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.ai_models import TouristFlowPredictor
+from app.services.flow_forecast import FlowForecastTable
+from app.train_predictive_models import generate_synthetic_tourist_flow_data
+from app.test_weather_service import make_service, FORECAST_START
+
+
+def make_predictor(weather_service=None):
+    df = generate_synthetic_tourist_flow_data(500)
+    X = df.drop('tourist_flow', axis=1).values
+    y = df['tourist_flow'].values
+
+    predictor = TouristFlowPredictor(weather_service)
+    predictor.model.set_params(n_estimators=20)
+    predictor.model.fit(predictor.scaler.fit_transform(X), y)
+    predictor.is_trained = True
+    return predictor
+
+
+def test_grid_matches_single_predictions():
+    print("\n=== Testing flow grid against single predictions ===\n")
+    predictor = make_predictor(make_service())
+    predictor.register_location(1, 28.6139, 77.2090)
+    predictor.register_location(2, 19.0760, 72.8777)
+
+    # Spans the 48 hour forecast window so both forecast and fallback weather are used
+    start = FORECAST_START + timedelta(hours=30)
+    times, grid = predictor.predict_flow_grid([1, 2, 3], start, hours=24)
+
+    assert grid.shape == (3, 24)
+    assert times[0] == start
+    for i, location_id in enumerate([1, 2, 3]):
+        for j, t in enumerate(times):
+            assert grid[i, j] == predictor.predict_tourist_flow(location_id, t.isoformat()), (location_id, t)
+    print(f"Grid row for location 1: {grid[0].tolist()}")
+
+
+def test_grid_speed():
+    print("\n=== Testing flow grid speed ===\n")
+    predictor = make_predictor()
+
+    start = time.perf_counter()
+    times, grid = predictor.predict_flow_grid(hours=72)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{grid.size} predictions in {elapsed_ms:.1f} ms")
+    assert grid.shape == (len(TouristFlowPredictor.DEFAULT_LOCATION_IDS), 72)
+    assert (grid >= 0).all() and grid.dtype.kind == 'i'
+
+
+def test_precomputed_forecast_lookup():
+    print("\n=== Testing precomputed flow forecast ===\n")
+    predictor = make_predictor()
+    table = FlowForecastTable(predictor, horizon_hours=24, refresh_interval=60)
+    assert table.lookup(1, datetime.now().isoformat()) is None
+
+    table.start()
+    for _ in range(100):
+        if table.stats['refreshes']:
+            break
+        time.sleep(0.01)
+    table.stop()
+
+    now = datetime.now()
+    for hours_ahead in (0, 5, 23):
+        at = (now + timedelta(hours=hours_ahead)).isoformat()
+        assert table.lookup(4, at) == predictor.predict_tourist_flow(4, at)
+    assert table.lookup(4, (now + timedelta(hours=30)).isoformat()) is None
+    assert table.lookup(99, now.isoformat()) is None
+    print(f"Stats: {table.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_grid_matches_single_predictions()
+    test_grid_speed()
+    test_precomputed_forecast_lookup()
+    print("\nAll flow grid tests completed!")
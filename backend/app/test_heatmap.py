@@ -0,0 +1,105 @@
+"""
+Test script for the live tourist density heatmap
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import numpy as np
+
+from app.services.heatmap import DensityHeatmap
+from app.services.tourist_store import ActiveTouristStore
+
+INDIA = dict(south=6.0, west=68.0, north=37.0, east=98.0)
+
+
+def _store_with(lats, lngs):
+    store = ActiveTouristStore()
+    ids = [f"T{i}" for i in range(len(lats))]
+    store.update_many(ids, np.zeros(len(ids)), latitude=np.asarray(lats, dtype=float),
+                      longitude=np.asarray(lngs, dtype=float))
+    return store
+
+
+def test_counts_match_histogram2d():
+    print("\n=== Testing binned counts ===\n")
+    rng = np.random.default_rng(7)
+    lats, lngs = rng.uniform(8, 35, 20000), rng.uniform(70, 95, 20000)
+    heatmap = DensityHeatmap(_store_with(lats, lngs), cells_per_tile=16)
+
+    result = heatmap.density(zoom=5, **INDIA)
+    print(f"Zoom 5: {len(result['cells'])} cells, total {result['total']}, max {result['max']}")
+    assert result['total'] == 20000
+    assert abs(result['cell_degrees'] - 360 / 2 ** 5 / 16) < 1e-12
+
+    # Same counts as numpy's histogram2d over the same cell edges
+    cell = result['cell_degrees']
+    lat_edges = np.arange(-90, 90 + cell / 2, cell)
+    lng_edges = np.arange(-180, 180 + cell / 2, cell)
+    expected, _, _ = np.histogram2d(lats, lngs, bins=[lat_edges, lng_edges])
+    got = np.zeros_like(expected)
+    for lat, lng, count in result['cells']:
+        got[int((lat + 90) // cell), int((lng + 180) // cell)] = count
+    assert np.array_equal(got, expected)
+
+
+def test_tiles_cached_until_ttl():
+    print("\n=== Testing tile cache ===\n")
+    store = _store_with([28.61, 28.62, 19.07], [77.21, 77.22, 72.88])
+    heatmap = DensityHeatmap(store, ttl=5)
+    now = 1_000_000.0
+    first = heatmap.density(zoom=6, now=now, **INDIA)
+    store.update("T_new", latitude=28.63, longitude=77.23)
+
+    # A panned view inside the same tiles is served from cache, without the new tourist
+    panned = heatmap.density(south=10.0, west=70.0, north=35.0, east=90.0, zoom=6, now=now + 1)
+    stats = heatmap.get_stats()
+    print(f"Stats: {stats}")
+    assert first['total'] == 3 and panned['total'] == 3
+    assert stats['snapshots'] == 1 and stats['tile_hits'] > 0
+
+    refreshed = heatmap.density(zoom=6, now=now + 6, **INDIA)
+    assert refreshed['total'] == 4 and heatmap.get_stats()['snapshots'] == 2
+
+
+def test_invalid_requests():
+    print("\n=== Testing invalid requests ===\n")
+    heatmap = DensityHeatmap(_store_with([28.61], [77.21]))
+    for args in (dict(INDIA, south=40.0), dict(INDIA, zoom=25), dict(INDIA, zoom=14)):
+        args.setdefault('zoom', 5)
+        try:
+            heatmap.density(**args)
+        except ValueError as e:
+            print(f"{args} -> {e}")
+            continue
+        raise AssertionError(f"Expected ValueError for {args}")
+
+
+def test_national_view_with_a_million_tourists():
+    print("\n=== Testing a national view over a million tourists ===\n")
+    rng = np.random.default_rng(1)
+    n = 1_000_000
+    heatmap = DensityHeatmap(_store_with(rng.uniform(8, 35, n), rng.uniform(70, 95, n)), ttl=60)
+
+    start = time.perf_counter()
+    cold = heatmap.density(zoom=5, **INDIA)
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    misses = heatmap.get_stats()['tile_misses']
+    heatmap.density(zoom=5, **INDIA)
+    warm_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(cold['cells'])} cells; cold {cold_ms:.1f} ms, cached {warm_ms:.1f} ms")
+    assert cold['total'] == n
+    # Served entirely from cached tiles (wall-clock times are too noisy to compare under load)
+    assert heatmap.get_stats()['tile_misses'] == misses
+
+
+if __name__ == "__main__":
+    test_counts_match_histogram2d()
+    test_tiles_cached_until_ttl()
+    test_invalid_requests()
+    test_national_view_with_a_million_tourists()
+    print("\nAll heatmap tests completed!")
@@ -0,0 +1,151 @@
+"""
+Test script for micro-batched ping ingestion and vectorized geofencing
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import random
+import time
+
+import numpy as np
+
+from app.ai_models import GeoFencingSystem, SmartTouristSafetySystem
+from app.services.ingestion import PingIngestionPipeline, IngestionOverloaded, parse_ndjson
+from app.services.tourist_store import ActiveTouristStore
+
+
+def make_system():
+    system = SmartTouristSafetySystem(ActiveTouristStore())
+    system.geo_fencing.add_risk_zone("old_city", [[28.60, 77.20], [28.60, 77.25], [28.66, 77.25], [28.66, 77.20]], 8)
+    system.geo_fencing.add_risk_zone("market", [[28.63, 77.22], [28.63, 77.30], [28.70, 77.30], [28.70, 77.22]], 5)
+    system.sent_alerts = []
+    system.geo_fencing._send_emergency_alert = system.sent_alerts.append
+    return system
+
+
+def test_vectorized_geofencing_matches_scalar():
+    print("\n=== Testing vectorized geofencing ===\n")
+    geo = make_system().geo_fencing
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(28.55, 28.75, 2000)
+    lngs = rng.uniform(77.15, 77.35, 2000)
+
+    zone_ids, inside, risk = geo.zones_for_points(lats, lngs)
+    for i in range(len(lats)):
+        expected = geo.zones_at(lats[i], lngs[i])
+        assert [zone_ids[j] for j in np.flatnonzero(inside[i])] == expected
+        assert risk[i] == geo.check_location_risk(lats[i], lngs[i])
+    print(f"Points per zone: {dict(zip(zone_ids, inside.sum(axis=0).tolist()))}")
+
+    empty_ids, empty_inside, empty_risk = GeoFencingSystem().zones_for_points(lats, lngs)
+    assert empty_ids == [] and (empty_risk == 1).all()
+
+
+def test_pings_coalesce_per_tourist():
+    print("\n=== Testing ping coalescing ===\n")
+    batches = []
+    pipeline = PingIngestionPipeline(lambda *batch: batches.append(batch))
+    body = b"\n".join(json.dumps(p).encode() for p in [
+        {'tourist_id': 'T1', 'latitude': 1.0, 'longitude': 1.0, 'timestamp': 100},
+        {'tourist_id': 'T1', 'latitude': 3.0, 'longitude': 3.0, 'timestamp': 300},
+        {'tourist_id': 'T1', 'latitude': 2.0, 'longitude': 2.0, 'timestamp': 200},   # late arrival, older
+        {'tourist_id': 'T2', 'latitude': 5.0, 'longitude': 5.0, 'location_id': 4},
+        {'tourist_id': 'T3', 'latitude': 'north'},
+    ]) + b"\n"
+
+    result = pipeline.submit(parse_ndjson(body))
+    assert result == {'accepted': 4, 'invalid': 1}
+    assert pipeline.flush() == 2
+
+    tourist_ids, lats, lngs, timestamps, location_ids = batches[0]
+    assert tourist_ids == ['T1', 'T2']
+    assert lats.tolist() == [3.0, 5.0] and timestamps[0] == 300
+    assert location_ids.tolist() == [-1, 4]
+    print(f"Stats: {pipeline.get_stats()}")
+
+    pipeline.max_pending = 1
+    pipeline.submit([{'tourist_id': 'T9', 'latitude': 0, 'longitude': 0}])
+    try:
+        pipeline.submit([{'tourist_id': 'T10', 'latitude': 0, 'longitude': 0}])
+        assert False, "full pipeline should refuse pings"
+    except IngestionOverloaded:
+        pass
+
+
+def test_batch_updates_store_and_alerts():
+    print("\n=== Testing batch scoring ===\n")
+    system = make_system()
+    pipeline = PingIngestionPipeline(system.process_ping_batch)
+    pipeline.submit([
+        {'tourist_id': 'inside', 'latitude': 28.62, 'longitude': 77.21, 'location_id': 2},
+        {'tourist_id': 'both', 'latitude': 28.65, 'longitude': 77.23},
+        {'tourist_id': 'outside', 'latitude': 19.07, 'longitude': 72.87, 'location_id': 5},
+    ])
+    pipeline.flush()
+
+    store = system.tourist_store
+    assert store.get('inside')['zones'] == ['old_city']
+    assert sorted(store.get('both')['zones']) == ['market', 'old_city']
+    assert store.get('outside')['zones'] == [] and store.get('outside')['location_id'] == 5
+    assert store.get('inside')['incident_probability'] == system.incident_predictor.predict_incident_probabilities(
+        [store.get('inside')['incident_features']])[0]
+    assert np.isnan(store.get('both')['incident_probability'])
+    assert sorted(alert['tourist_id'] for alert in system.sent_alerts) == ['both', 'inside']
+
+
+def test_location_less_ping_keeps_incident_state():
+    print("\n=== Testing pings without a location_id ===\n")
+    system = make_system()
+    store = system.tourist_store
+    system.process_ping_batch(["T1"], np.array([28.62]), np.array([77.21]), np.array([time.time()]),
+                              np.array([2], dtype=np.int32))
+    before = store.get('T1')
+
+    # Moved, but no location_id: position changes, incident state stays
+    system.process_ping_batch(["T1"], np.array([19.07]), np.array([72.87]), np.array([time.time()]),
+                              np.array([-1], dtype=np.int32))
+    after = store.get('T1')
+    assert after['latitude'] == 19.07 and after['zones'] == []
+    assert after['location_id'] == 2 and after['incident_features'] == before['incident_features']
+    assert after['incident_probability'] == before['incident_probability']
+
+    # Future and millisecond timestamps are recorded as now, so the tourist still goes idle
+    system.process_ping_batch(["T1", "T2"], np.array([28.62, 28.62]), np.array([77.21, 77.21]),
+                              np.array([time.time() * 1000, np.nan]), np.array([-1, -1], dtype=np.int32))
+    assert store.get('T1')['last_seen'] <= time.time() and store.get('T2')['last_seen'] <= time.time()
+    assert store.evict_idle(60, now=time.time() + 120) == 2
+
+
+def test_ingestion_throughput():
+    print("\n=== Testing ingestion throughput ===\n")
+    system = make_system()
+    pipeline = PingIngestionPipeline(system.process_ping_batch)
+    rng = random.Random(1)
+    now = time.time()
+    pings = [{'tourist_id': f"T{i % 20000}", 'latitude': rng.uniform(28.5, 28.8),
+              'longitude': rng.uniform(77.1, 77.4), 'timestamp': now + i, 'location_id': rng.randint(1, 10)}
+             for i in range(100000)]
+    body = "\n".join(json.dumps(p) for p in pings).encode()
+
+    start = time.perf_counter()
+    for chunk in range(0, len(pings), 10000):
+        pipeline.submit(parse_ndjson(b"\n".join(body.split(b"\n")[chunk:chunk + 10000])))
+    pipeline.flush()
+    elapsed = time.perf_counter() - start
+
+    stats = pipeline.get_stats()
+    print(f"{len(pings)} pings in {elapsed * 1000:.0f} ms ({len(pings) / elapsed:.0f} pings/s), stats: {stats}")
+    assert stats['processed'] == 20000 and stats['batch_errors'] == 0
+    assert len(system.tourist_store) == 20000
+
+
+if __name__ == "__main__":
+    test_vectorized_geofencing_matches_scalar()
+    test_pings_coalesce_per_tourist()
+    test_batch_updates_store_and_alerts()
+    test_location_less_ping_keeps_incident_state()
+    test_ingestion_throughput()
+    print("\nAll ingestion tests completed!")
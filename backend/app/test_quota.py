@@ -0,0 +1,78 @@
+"""
+Test script for outbound API quota budgets
+Redis is replaced by fakeredis so the shared bucket can be exercised without a server
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeredis
+
+from app.services.cache import TwoTierCache
+from app.services.quota import QuotaBudget, QuotaExceeded, Priority, priority
+from app.services.weather_service import WeatherService
+from app.test_weather_service import FakeVisualCrossingSession
+
+
+def test_priority_reserves():
+    print("\n=== Testing priority reserves ===\n")
+    budget = QuotaBudget('test', 'key', daily_quota=0, burst=10, redis_client=None)
+
+    background = sum(budget.try_acquire(level=Priority.BACKGROUND) for _ in range(10))
+    interactive = sum(budget.try_acquire(level=Priority.INTERACTIVE) for _ in range(10))
+    emergency = sum(budget.try_acquire(level=Priority.EMERGENCY) for _ in range(10))
+
+    print(f"Granted: background {background}, interactive {interactive}, emergency {emergency}")
+    assert (background, interactive, emergency) == (5, 4, 1)
+    try:
+        budget.acquire(level=Priority.EMERGENCY)
+        assert False, "empty bucket should refuse"
+    except QuotaExceeded:
+        pass
+    print(f"Stats: {budget.get_stats()}")
+
+
+def test_budget_shared_across_workers():
+    print("\n=== Testing shared budget ===\n")
+    server = fakeredis.FakeServer()
+    worker_a = QuotaBudget('test', 'key', daily_quota=0, burst=6,
+                           redis_client=fakeredis.FakeStrictRedis(server=server))
+    worker_b = QuotaBudget('test', 'key', daily_quota=0, burst=6,
+                           redis_client=fakeredis.FakeStrictRedis(server=server))
+
+    granted = 0
+    for _ in range(4):
+        granted += worker_a.try_acquire(level=Priority.EMERGENCY)
+        granted += worker_b.try_acquire(level=Priority.EMERGENCY)
+    print(f"Granted {granted} of 8 requests from two workers, remaining {worker_a.remaining()}")
+    assert granted == 6
+    assert worker_b.remaining() == 0
+
+
+def test_low_priority_falls_back_to_defaults():
+    print("\n=== Testing quota fallback in WeatherService ===\n")
+    budget = QuotaBudget('visualcrossing', 'key', daily_quota=0, burst=4, redis_client=None)
+    service = WeatherService('test-key', cache=TwoTierCache('weather', 1800, redis_client=None), budget=budget)
+    service.session = FakeVisualCrossingSession()
+
+    # Half the bucket is reserved, so background batch work gets two tiles and defaults after that
+    with priority(Priority.BACKGROUND):
+        results = service.get_weather_data_many([(10.05, 70.05), (11.05, 70.05), (12.05, 70.05)])
+    sources = sorted(result['data_source'] for result in results)
+    print(f"Background batch sources: {sources}")
+    assert sources == ['VisualCrossing', 'VisualCrossing', 'default']
+    assert len(service.session.locations) == 2
+
+    # Emergency callers may still spend what is left, and cached tiles cost nothing
+    with priority(Priority.EMERGENCY):
+        assert service.get_weather_data(13.05, 70.05)['data_source'] == 'VisualCrossing'
+        assert service.get_weather_data(10.05, 70.05)['data_source'] == 'VisualCrossing'
+    assert len(service.session.locations) == 3
+
+
+if __name__ == "__main__":
+    test_priority_reserves()
+    test_budget_shared_across_workers()
+    test_low_priority_falls_back_to_defaults()
+    print("\nAll quota tests completed!")
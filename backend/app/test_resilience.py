@@ -0,0 +1,153 @@
+"""
+Test script for the outbound-call resilience layer
+Circuit breakers, retry budgets, hedged requests and deadlines
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from app.services.cache import TwoTierCache
+from app.services.resilience import Upstream, CircuitOpenError, DeadlineExceeded, deadline, get_upstream
+from app.services.weather_service import WeatherService
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+def test_breaker_trips_and_recovers():
+    print("\n=== Testing circuit breaker ===\n")
+    upstream = Upstream('test', timeout=1, failure_threshold=3, reset_timeout=0.2, max_retries=0)
+    calls = []
+
+    def failing(timeout=None):
+        calls.append(timeout)
+        raise ConnectionError("upstream down")
+
+    for _ in range(3):
+        try:
+            upstream.call(failing)
+        except ConnectionError:
+            pass
+    assert upstream.breaker.state == 'open'
+
+    start = time.perf_counter()
+    try:
+        upstream.call(failing)
+        assert False, "breaker should reject"
+    except CircuitOpenError:
+        pass
+    print(f"Rejected in {(time.perf_counter() - start) * 1000:.2f} ms without calling upstream")
+    assert len(calls) == 3
+
+    time.sleep(0.25)
+    assert upstream.call(lambda timeout=None: FakeResponse(200)).status_code == 200
+    assert upstream.breaker.state == 'closed'
+    print(f"Stats: {upstream.get_stats()}")
+
+
+def test_retry_budget_limits_retries():
+    print("\n=== Testing retry budget ===\n")
+    upstream = Upstream('test', timeout=1, failure_threshold=1000, max_retries=3, retry_ratio=0.1)
+    attempts = []
+
+    def flaky(timeout=None):
+        attempts.append(1)
+        return FakeResponse(503)
+
+    for _ in range(20):
+        upstream.call(flaky)
+    retries = len(attempts) - 20
+    print(f"20 calls, {retries} retries")
+    # 3 starting tokens plus 0.1 per call, far below 3 retries per call
+    assert retries <= 5
+
+
+def test_last_outcome_is_reported():
+    print("\n=== Testing the outcome of the last attempt ===\n")
+    upstream = Upstream('test', timeout=1, failure_threshold=1000, max_retries=1, retry_ratio=1.0)
+    outcomes = [FakeResponse(503), ConnectionError("reset")]
+
+    def flaky(timeout=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    try:
+        upstream.call(flaky)
+        raise AssertionError("Expected the last attempt's error")
+    except ConnectionError as e:
+        print(f"Raised: {e!r}")
+    assert not outcomes
+
+
+def test_hedged_request_wins():
+    print("\n=== Testing hedged requests ===\n")
+    upstream = Upstream('test', timeout=2, hedge_after=0.05, max_retries=0)
+    delays = [0.5, 0.0]
+
+    def slow_then_fast(timeout=None):
+        time.sleep(delays.pop(0))
+        return FakeResponse(200)
+
+    start = time.perf_counter()
+    upstream.call(slow_then_fast)
+    elapsed = time.perf_counter() - start
+    print(f"Answered in {elapsed * 1000:.0f} ms with {upstream.stats['hedges']} hedge")
+    assert elapsed < 0.4
+    assert upstream.stats['hedges'] == 1
+
+
+def test_deadline_caps_timeout():
+    print("\n=== Testing request deadline ===\n")
+    upstream = Upstream('test', timeout=10, max_retries=0)
+    seen = []
+
+    with deadline(0.5):
+        upstream.call(lambda timeout=None: seen.append(timeout) or FakeResponse(200))
+    assert seen[0] <= 0.5
+
+    with deadline(0.01):
+        time.sleep(0.02)
+        try:
+            upstream.call(lambda timeout=None: FakeResponse(200))
+            assert False, "deadline should be exceeded"
+        except DeadlineExceeded:
+            pass
+    print(f"Attempt timeout under a 0.5 s deadline: {seen[0]:.3f} s")
+
+
+def test_service_falls_back_when_open():
+    print("\n=== Testing fallback to default weather data ===\n")
+
+    class DownSession:
+        def get(self, url, timeout=None):
+            raise ConnectionError("Visual Crossing down")
+
+    service = WeatherService('test-key', cache=TwoTierCache('weather', 1800, redis_client=None))
+    service.session = DownSession()
+    for i in range(10):
+        result = service.get_weather_data(10 + i, 70)
+        assert result['data_source'] == 'default'
+    upstream = get_upstream('visualcrossing')
+    print(f"Weather service returned defaults while the upstream was down: {upstream.get_stats()}")
+    assert upstream.breaker.state == 'open'
+    assert upstream.stats['rejected'] > 0
+
+    # The breaker is process-wide; close it again for other tests in this run
+    upstream.breaker.record_success()
+
+
+if __name__ == "__main__":
+    test_breaker_trips_and_recovers()
+    test_retry_budget_limits_retries()
+    test_last_outcome_is_reported()
+    test_hedged_request_wins()
+    test_deadline_caps_timeout()
+    test_service_falls_back_when_open()
+    print("\nAll resilience tests completed!")
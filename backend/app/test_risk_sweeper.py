@@ -0,0 +1,98 @@
+"""
+Test script for the periodic incident risk sweep
+Trains a small incident model on synthetic data so no saved model files are needed
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import random
+import time
+
+from app.ai_models import IncidentPredictor, SmartTouristSafetySystem
+from app.services.risk_sweeper import IncidentRiskSweeper
+from app.services.tourist_store import ActiveTouristStore
+from app.train_predictive_models import generate_synthetic_incident_data
+
+
+def make_predictor():
+    df = generate_synthetic_incident_data(500)
+    predictor = IncidentPredictor()
+    predictor.model.set_params(n_estimators=20)
+    predictor.model.fit(df.drop('incident', axis=1).values, df['incident'].values)
+    predictor.is_trained = True
+    return predictor
+
+
+def random_features(rng):
+    return [rng.randint(1, 10), rng.randint(10, 100), rng.randint(1, 10), rng.randint(1, 10),
+            rng.randint(1, 10), rng.randint(1, 10), rng.randint(1, 10)]
+
+
+def test_sweep_ranks_tourists():
+    print("\n=== Testing incident risk sweep ===\n")
+    predictor = make_predictor()
+    store = ActiveTouristStore()
+    sweeper = IncidentRiskSweeper(predictor, store, top_k=10)
+    rng = random.Random(3)
+    for i in range(5000):
+        store.update(f"T{i}", incident_features=random_features(rng), latitude=28.6, longitude=77.2, location_id=1)
+    store.update("no-location", safety_score=6)
+
+    top = sweeper.sweep()
+    print(f"Swept {sweeper.stats['last_sweep_size']} tourists in {sweeper.stats['last_sweep_ms']} ms")
+    assert len(top) == 10
+    probabilities = [t['incident_probability'] for t in top]
+    assert probabilities == sorted(probabilities, reverse=True)
+
+    # The top entry agrees with a single prediction using the current time of day risk
+    assert sweeper.stats['last_sweep_size'] == 5000
+    best = store.get(top[0]['tourist_id'])['incident_features']
+    best[predictor.FEATURES.index('time_of_day_risk')] = predictor.time_of_day_risk(time.localtime().tm_hour)
+    single = predictor.predict_incident_probabilities([best])[0]
+    assert abs(single - top[0]['incident_probability']) < 1e-4
+    assert sweeper.top(3) == top[:3]
+    for bad in (0, -1, sweeper.top_k + 1):
+        try:
+            sweeper.top(bad)
+            raise AssertionError(f"Expected ValueError for limit {bad}")
+        except ValueError as e:
+            print(f"limit {bad}: {e}")
+
+
+def test_inactive_tourists_are_dropped():
+    print("\n=== Testing active tourist window ===\n")
+    store = ActiveTouristStore()
+    sweeper = IncidentRiskSweeper(make_predictor(), store, active_window=60)
+    rng = random.Random(5)
+    store.update("stale", timestamp=time.time() - 120, incident_features=random_features(rng))
+    store.update("fresh", incident_features=random_features(rng))
+
+    top = sweeper.sweep()
+    assert [t['tourist_id'] for t in top] == ["fresh"]
+    assert "stale" not in store
+    assert sweeper.get_stats()['active_tourists'] == 1
+
+
+def test_process_update_feeds_sweeper():
+    print("\n=== Testing sweeper input from tourist updates ===\n")
+    system = SmartTouristSafetySystem(ActiveTouristStore())
+    system.incident_predictor = make_predictor()
+    sweeper = IncidentRiskSweeper(system.incident_predictor, system.tourist_store)
+
+    result = asyncio.run(system.process_tourist_data("T1", {
+        'location_data': {'latitude': 28.6139, 'longitude': 77.2090, 'location_id': 3}
+    }))
+    assert result['incident_probability'] is not None
+    top = sweeper.sweep()
+    print(f"Sweep result: {top}")
+    assert top[0]['tourist_id'] == "T1" and top[0]['location_id'] == 3
+
+
+if __name__ == "__main__":
+    test_sweep_ranks_tourists()
+    test_inactive_tourists_are_dropped()
+    test_process_update_feeds_sweeper()
+    print("\nAll risk sweeper tests completed!")
@@ -0,0 +1,140 @@
+"""
+Test script for the streaming dashboard analytics
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.ai_models import RealTimeTourismAnalytics, SmartTouristSafetySystem
+from app.services.streaming_analytics import HyperLogLog, SlidingWindowCounter, StreamingAnalytics
+from app.services.tourist_store import ActiveTouristStore
+
+
+def test_sliding_window_counter():
+    print("\n=== Testing sliding window counter ===\n")
+    counter = SlidingWindowCounter(window=60, buckets=60)
+    now = 1_000_000.0
+    for i in range(120):
+        counter.add(1, now=now + i * 0.5)   # 2 events a second for a minute
+    assert counter.value(now=now + 59.9) == 120
+    # 30 seconds later only the events from seconds 31-59 are still in the window
+    assert counter.value(now=now + 90) == 58
+    # A long gap clears the whole ring
+    assert counter.value(now=now + 10_000) == 0
+    counter.add(3, now=now + 10_000)
+    assert counter.value(now=now + 10_001) == 3
+
+
+def test_hyperloglog_accuracy():
+    print("\n=== Testing HyperLogLog distinct counts ===\n")
+    for n in (10, 1000, 50_000):
+        sketch = HyperLogLog(12)
+        for i in range(n):
+            sketch.add(f"tourist-{i}")
+            sketch.add(f"tourist-{i}")   # Repeats do not count
+        estimate = sketch.count()
+        print(f"{n} distinct -> estimate {estimate}")
+        assert abs(estimate - n) <= max(1, 0.05 * n)
+
+
+def test_active_and_high_risk_tourists_expire():
+    print("\n=== Testing active and high-risk tourists ===\n")
+    stream = StreamingAnalytics(active_window=900)
+    now = 1_000_000.0
+    stream.record_ping("T1", 28.61, 77.21, location_risk=9, now=now)
+    stream.record_ping("T2", 28.61, 77.21, incident_probability=0.8, location_id=3, now=now + 100)
+    stream.record_ping("T3", 28.61, 77.21, now=now + 200)
+    metrics = stream.get_metrics(now=now + 300)
+    assert metrics['active_tourists'] == 3 and metrics['high_risk_tourists'] == 2
+
+    # T2 moves somewhere safe; T1 stops pinging and drops out of both counts
+    stream.record_ping("T2", 28.70, 77.30, now=now + 800)
+    metrics = stream.get_metrics(now=now + 1000)
+    print(f"Metrics: {metrics}")
+    assert metrics['active_tourists'] == 2 and metrics['high_risk_tourists'] == 0
+    assert metrics['unique_tourists_today'] == 3
+    assert metrics['unique_tourists_by_region']['location:3'] == 1
+    assert metrics['unique_tourists_by_region']['cell:28.50,77.00'] == 2
+
+
+def test_alert_and_efir_windows():
+    print("\n=== Testing alert and EFIR windows ===\n")
+    stream = StreamingAnalytics()
+    now = 1_000_000.0
+    for i in range(5):
+        stream.record_alert({'alert_type': 'geofence_risk'}, now=now + i * 20)
+    stream.record_efir({'complaint_number': 'EFIR-1'}, now=now + 90)
+    metrics = stream.get_metrics(now=now + 100)
+    assert metrics['alerts_per_minute'] == 2    # The alerts at +60 and +80 seconds
+    assert metrics['recent_alerts'] == 5 and metrics['efirs_last_hour'] == 1
+    metrics = stream.get_metrics(now=now + 4000)
+    assert metrics['recent_alerts'] == 0 and metrics['efirs_last_hour'] == 0
+    assert metrics['totals'] == {'pings': 0, 'alerts': 5, 'efirs': 1}
+
+
+def test_busiest_regions_kept_at_ingest():
+    print("\n=== Testing busiest regions over many regions ===\n")
+    stream = StreamingAnalytics(top_regions=5)
+    rng = np.random.default_rng(3)
+    now = 1_000_000.0
+    # 2000 locations with skewed traffic; the busiest ones are not the first seen
+    location_ids = rng.zipf(1.5, 20000) % 2000
+    for i, location_id in enumerate(location_ids.tolist()):
+        stream.record_ping(f"T{i % 7000}", location_id=location_id, now=now)
+    exact = sorted(((region, sketch.count()) for region, sketch in stream._unique_by_region.items()),
+                   key=lambda item: item[1], reverse=True)
+    regions = stream.get_metrics(now=now)['unique_tourists_by_region']
+    print(f"{len(exact)} regions, busiest {regions}")
+    assert sorted(regions.values(), reverse=True) == [count for _, count in exact[:5]]
+    assert len(stream.get_metrics(now=now, top_regions=2)['unique_tourists_by_region']) == 2
+
+
+def test_safety_system_feeds_dashboard_metrics():
+    print("\n=== Testing dashboard metrics from tourist updates and ping batches ===\n")
+    stream = StreamingAnalytics()
+    analytics = RealTimeTourismAnalytics(stream)
+    system = SmartTouristSafetySystem(analytics=stream)
+    system.geo_fencing.add_risk_zone("old_city", [[28.60, 77.20], [28.60, 77.25], [28.66, 77.25], [28.66, 77.20]], 8)
+
+    system.process_tourist_update("T1", {'latitude': 28.63, 'longitude': 77.22})
+    system.process_tourist_update("T2", {'behavior_data': {}})
+    system.process_ping_batch(["T3", "T4"], np.array([28.63, 28.90]), np.array([77.22, 77.60]),
+                              np.array([0.0, 0.0]), np.array([-1, 5], dtype=np.int32))
+
+    metrics = analytics.get_dashboard_metrics()
+    print(f"Metrics: {metrics}")
+    assert metrics['active_tourists'] == 4
+    assert metrics['high_risk_tourists'] == 2          # T1 and T3 are inside the risk-8 zone
+    assert metrics['recent_alerts'] == 2
+    assert metrics['pings_per_minute'] == 4
+    assert metrics['unique_tourists_by_region']['location:5'] == 1
+    assert metrics['system_status'] == 'operational'
+
+
+def test_string_location_id_from_json():
+    print("\n=== Testing a location_id sent as a JSON string ===\n")
+    stream = StreamingAnalytics()
+    store = ActiveTouristStore()
+    system = SmartTouristSafetySystem(store, analytics=stream)
+
+    result = system.process_tourist_update("T1", {'location_data': {'latitude': 28.6, 'longitude': 77.2, 'location_id': "1"}})
+    assert result['incident_probability'] is not None and store.get("T1")['location_id'] == 1
+    assert stream.get_metrics()['unique_tourists_by_region'] == {'location:1': 1}
+
+    # Not a number: treated as no location_id
+    result = system.process_tourist_update("T2", {'location_data': {'latitude': 28.6, 'longitude': 77.2, 'location_id': "fort"}})
+    assert result['incident_probability'] is None and store.get("T2")['location_id'] == -1
+
+
+if __name__ == "__main__":
+    test_sliding_window_counter()
+    test_hyperloglog_accuracy()
+    test_active_and_high_risk_tourists_expire()
+    test_alert_and_efir_windows()
+    test_busiest_regions_kept_at_ingest()
+    test_safety_system_feeds_dashboard_metrics()
+    test_string_location_id_from_json()
+    print("\nAll streaming analytics tests completed!")
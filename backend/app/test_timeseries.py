@@ -0,0 +1,124 @@
+"""
+Test script for the minute/hour/day metric rollups
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai_models import RealTimeTourismAnalytics
+from app.services.streaming_analytics import StreamingAnalytics
+from app.services.timeseries import TimeSeriesStore
+
+WEEK = 7 * 86400
+# Day-aligned, so 5-minute, hourly and daily buckets all line up with it
+T0 = 1_700_006_400.0
+
+
+def test_alerts_per_five_minutes_over_a_week():
+    print("\n=== Testing alerts per 5 minutes over the last week ===\n")
+    store = TimeSeriesStore()
+    for minute in range(7 * 24 * 60):
+        store.record('alerts', 1 + minute % 3, now=T0 + minute * 60 + 5)
+    now = T0 + WEEK
+
+    result = store.query('alerts', now - WEEK, now, step=300, agg='sum', now=now)
+    points = result['points']
+    print(f"Resolution {result['resolution']}, {len(points)} points, first {points[:2]}")
+    assert result['resolution'] == '1m' and result['step'] == 300
+    assert len(points) == 7 * 24 * 12
+    assert points[0] == {'t': T0, 'value': 1 + 2 + 3 + 1 + 2}
+    assert sum(p['value'] for p in points) == sum(1 + m % 3 for m in range(7 * 24 * 60))
+
+    # The daily rollup agrees with the minute data
+    daily = store.query('alerts', now - WEEK, now, step=86400, now=now)['points']
+    assert [p['value'] for p in daily] == [(1 + 2 + 3) * 480] * 7
+
+
+def test_downsampled_history_outlives_minute_ring():
+    print("\n=== Testing hourly and daily rollups past the minute retention ===\n")
+    store = TimeSeriesStore()
+    for day in range(30):
+        store.record_gauge('active_tourists', 100 + day, now=T0 + day * 86400 + 3600)
+        store.record_gauge('active_tourists', 200 + day, now=T0 + day * 86400 + 7200)
+    now = T0 + 30 * 86400
+
+    result = store.query('active_tourists', T0, now, step=86400, agg='avg', now=now)
+    assert result['resolution'] == '1h'
+    assert [p['value'] for p in result['points']][:3] == [150.0, 151.0, 152.0]
+    peak = store.query('active_tourists', T0, now, step=86400 * 2, agg='max', now=now)['points']
+    assert len(peak) == 15 and [p['value'] for p in peak][:3] == [201.0, 203.0, 205.0]
+    # Gauges default to the last reading of each bucket and cannot be summed
+    latest = store.query('active_tourists', T0, now, step=86400 * 2, now=now)
+    assert latest['agg'] == 'last' and [p['value'] for p in latest['points']][:3] == [201.0, 203.0, 205.0]
+    daily = store.query('active_tourists', T0, now, step=86400, now=now)['points']
+    assert [p['value'] for p in daily][:3] == [200.0, 201.0, 202.0]
+    try:
+        store.query('active_tourists', T0, now, step=86400, agg='sum', now=now)
+        raise AssertionError("Expected ValueError for a summed gauge")
+    except ValueError as e:
+        print(f"sum over a gauge: {e}")
+
+    # Empty buckets: zero for sums, None for gauges
+    hourly = store.query('active_tourists', T0, T0 + 86400, step=3600, agg='avg', now=now)['points']
+    assert hourly[0]['value'] is None and hourly[1]['value'] == 100.0
+    assert store.query('active_tourists', T0, T0 + 3600, step=3600, agg='count', now=now)['points'][0]['value'] == 0
+
+
+def test_memory_stays_bounded():
+    print("\n=== Testing bounded memory ===\n")
+    store = TimeSeriesStore()
+    before = store.get_stats()
+    for hour in range(3 * 366 * 24):   # Three years of hourly points
+        store.record('pings', 10, now=T0 + hour * 3600)
+    stats = store.get_stats()
+    print(f"Stats: {stats}")
+    assert stats['bytes'] == before['bytes'] + 40 * sum(slots for _, _, slots in store.resolutions)
+    # Slots reused by later points read as empty for the buckets they used to hold
+    now = T0 + 3 * 366 * 86400
+    stale = store.query('pings', T0, T0 + 3600, step=60, now=T0 + 86400)
+    assert stale['resolution'] == '1m' and stale['points'][0]['value'] == 0
+    assert store.query('pings', now - 3 * 86400, now, step=86400, now=now)['resolution'] == '1m'
+
+
+def test_query_errors_and_analytics_history():
+    print("\n=== Testing query errors and history through the analytics ===\n")
+    store = TimeSeriesStore(max_points=100)
+    stream = StreamingAnalytics(timeseries=store)
+    analytics = RealTimeTourismAnalytics(stream, store)
+    # get_history queries relative to the current time
+    t0 = (time.time() // 86400 - 2) * 86400
+    stream.record_alert({'alert_type': 'geofence_risk'}, now=t0 + 10)
+    stream.record_pings(["T1", "T2"], [28.6, 28.7], [77.2, 77.3], [1, 9], [float('nan'), 0.1], [-1, -1], now=t0 + 20)
+    store.record_gauge('active_tourists', stream.gauges(now=t0 + 30)['active_tourists'], now=t0 + 30)
+
+    history = analytics.get_history('pings', t0, t0 + 60, step=60)
+    assert history['resolution'] == '1m' and history['points'] == [{'t': t0, 'value': 2.0}]
+    assert analytics.get_history('active_tourists', t0, t0 + 60, step=60, agg='avg')['points'][0]['value'] == 2.0
+    assert analytics.get_history('active_tourists', t0, t0 + 60, step=60)['points'][0]['value'] == 2.0
+
+    for bad in (dict(metric='unknown'), dict(metric='alerts', agg='median'), dict(metric='alerts', agg='last'),
+                dict(metric='alerts', step=1), dict(metric='alerts', end=t0 - 1),
+                dict(metric='alerts', step=float('nan')),
+                dict(metric='alerts', step=-60), dict(metric='alerts', start=float('-inf')),
+                dict(metric='alerts', start=0, end=1e12, step=1e12)):
+        args = {'start': t0, 'end': t0 + 86400, 'step': 3600, 'agg': 'sum', **bad}
+        try:
+            analytics.get_history(**args)
+        except (KeyError, ValueError) as e:
+            print(f"{bad} -> {type(e).__name__}: {e}")
+            continue
+        raise AssertionError(f"Expected an error for {bad}")
+
+    # A step wider than the range is one bucket, read without materializing the step
+    history = analytics.get_history('alerts', t0, t0 + 86400, step=1e12)
+    assert sum(p['value'] for p in history['points']) == 1.0 and len(history['points']) <= 2
+
+
+if __name__ == "__main__":
+    test_alerts_per_five_minutes_over_a_week()
+    test_downsampled_history_outlives_minute_ring()
+    test_memory_stays_bounded()
+    test_query_errors_and_analytics_history()
+    print("\nAll time-series tests completed!")
@@ -0,0 +1,186 @@
+"""
+Test script for live per-tourist safety subscriptions
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+import fakeredis
+import numpy as np
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app.ai_models import SmartTouristSafetySystem
+from app.services.alert_throttle import AlertThrottle
+from app.services.alerts import AlertDispatcher, StubGateway
+from app.services.tourist_feed import TouristFeed, diff_views
+from app.services.tourist_store import ActiveTouristStore
+
+OLD_CITY = [[28.60, 77.20], [28.60, 77.25], [28.66, 77.25], [28.66, 77.20]]
+
+
+def make_system(feed):
+    store = ActiveTouristStore()
+    feed.snapshot = lambda tourist_id: (
+        TouristFeed.view(**{k: store.get(tourist_id)[k] for k in ('safety_score', 'zones', 'incident_probability')})
+        if store.get(tourist_id) else None
+    )
+    system = SmartTouristSafetySystem(store, alert_dispatcher=AlertDispatcher([StubGateway()]),
+                                      alert_throttle=AlertThrottle(), tourist_feed=feed)
+    system.geo_fencing.add_risk_zone("old_city", OLD_CITY, 8)
+    return system
+
+
+def make_app(feed):
+    app = FastAPI()
+
+    @app.websocket("/ws/tourist/{tourist_id}")
+    async def ws_tourist(ws: WebSocket, tourist_id: str):
+        await ws.accept()
+        await feed.serve(ws, tourist_id)
+
+    return app
+
+
+def wait_for_subscribers(feed, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while feed.get_stats()['connections'] < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_diff_views():
+    print("\n=== Testing view diffs ===\n")
+    old = {'safety_score': 7.0, 'zones': ['a'], 'incident_probability': 0.2}
+    assert diff_views(old, dict(old)) == {}
+    assert diff_views(old, dict(old, zones=['a', 'b'])) == {'zones': ['a', 'b']}
+    assert diff_views({}, old) == old
+    assert diff_views(old, {'safety_score': 7.0}) == {'zones': None, 'incident_probability': None}
+
+
+def test_subscriber_gets_only_changes():
+    print("\n=== Testing change-only pushes ===\n")
+    feed = TouristFeed(redis_client=None)
+    system = make_system(feed)
+    outside = {'location_data': {'latitude': 28.70, 'longitude': 77.30}}
+    inside = {'location_data': {'latitude': 28.62, 'longitude': 77.22}}
+    system.process_tourist_update("T1", outside)
+
+    with TestClient(make_app(feed)) as client, client.websocket_connect("/ws/tourist/T1") as ws:
+        snapshot = ws.receive_json()
+        print(f"Snapshot: {snapshot}")
+        assert snapshot['type'] == 'snapshot' and snapshot['state']['zones'] == []
+        wait_for_subscribers(feed, 1)
+
+        polled = system.process_tourist_update("T1", inside)
+        update = ws.receive_json()
+        print(f"Update: {update}")
+        assert update['version'] == 1 and update['changes'] == {'zones': ['old_city']}
+        assert update['alerts'][0]['zone_ids'] == ['old_city']
+
+        # Same position again: nothing changes, so nothing is published or sent
+        system.process_tourist_update("T1", inside)
+        assert feed.get_stats()['unchanged'] == 1
+        system.process_tourist_update("T1", outside)
+        update = ws.receive_json()
+        assert update['version'] == 2 and update['changes'] == {'zones': []} and 'alerts' not in update
+
+        polled_bytes = len(json.dumps(polled, default=str))
+        pushed_bytes = len(json.dumps(update))
+        print(f"Polled response: {polled_bytes} bytes, pushed update: {pushed_bytes} bytes")
+        assert pushed_bytes < polled_bytes
+    assert feed.get_stats()['messages_sent'] == 2
+
+
+def test_ping_batches_publish_only_changed_tourists():
+    print("\n=== Testing batch change detection ===\n")
+    feed = TouristFeed(redis_client=None)
+    system = make_system(feed)
+    rng = np.random.default_rng(2)
+    tourist_ids = [f"T{i}" for i in range(1000)]
+    lats, lngs = rng.uniform(28.55, 28.70, 1000), rng.uniform(77.15, 77.30, 1000)
+    no_location = np.full(1000, -1, dtype=np.int32)
+
+    _, inside_before, _ = system.geo_fencing.zones_for_points(lats, lngs)
+    system.process_ping_batch(tourist_ids, lats, lngs, np.zeros(1000), no_location)
+    first = feed.get_stats()['published']
+
+    lngs[:50] = 77.225                        # Fifty tourists move into the zone's longitude band
+    _, inside_after, _ = system.geo_fencing.zones_for_points(lats, lngs)
+    system.process_ping_batch(tourist_ids, lats, lngs, np.ones(1000), no_location)
+    second = feed.get_stats()['published'] - first
+    print(f"First batch published {first}, second batch published {second}")
+
+    # New tourists outside every zone have nothing to show yet; afterwards only zone changes count
+    assert first == inside_before.any(axis=1).sum()
+    assert second == (inside_before != inside_after).any(axis=1).sum() > 0
+
+
+def test_views_cross_workers_through_redis():
+    print("\n=== Testing Redis pub/sub between workers ===\n")
+    server = fakeredis.FakeServer()
+    publisher = TouristFeed(redis_client=fakeredis.FakeRedis(server=server))
+    subscriber = TouristFeed(redis_client=fakeredis.FakeRedis(server=server))
+    subscriber.start()
+    time.sleep(0.2)   # Let the listener subscribe
+
+    with TestClient(make_app(subscriber)) as client, client.websocket_connect("/ws/tourist/T7") as ws:
+        assert ws.receive_json()['state'] is None
+        wait_for_subscribers(subscriber, 1)
+        publisher.publish("T8", TouristFeed.view(5, ['market'], 0.1))   # Nobody watches T8
+        publisher.publish("T7", TouristFeed.view(6.04, ['old_city'], 0.3))
+        update = ws.receive_json()
+        print(f"Update from the other worker: {update}")
+        assert update['tourist_id'] == "T7"
+        assert update['changes'] == {'safety_score': 6.0, 'zones': ['old_city'], 'incident_probability': 0.3}
+    assert subscriber.get_stats()['delivered'] == 1
+    subscriber.stop()
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+        self._never = asyncio.Event()
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def receive_text(self):
+        await self._never.wait()
+
+
+def test_backlog_merged_into_one_diff():
+    print("\n=== Testing coalescing for a slow client ===\n")
+
+    async def scenario():
+        feed = TouristFeed(redis_client=None)
+        socket = RecordingSocket()
+        serving = asyncio.create_task(feed.serve(socket, "T1"))
+        await asyncio.sleep(0)
+
+        # Three updates land before the sender gets to run
+        feed._apply("T1", TouristFeed.view(7, ['a'], 0.1), [])
+        feed._apply("T1", TouristFeed.view(7, ['a', 'b'], 0.1), [{'alert_type': 'geo_fence_breach'}])
+        feed._apply("T1", TouristFeed.view(6, ['a', 'b'], 0.1), [])
+        await asyncio.sleep(0.01)
+
+        print(f"Sent: {socket.sent}")
+        assert len(socket.sent) == 2   # Snapshot plus one merged update
+        assert socket.sent[1]['changes'] == {'safety_score': 6.0, 'zones': ['a', 'b'], 'incident_probability': 0.1}
+        assert len(socket.sent[1]['alerts']) == 1
+        serving.cancel()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_diff_views()
+    test_subscriber_gets_only_changes()
+    test_ping_batches_publish_only_changed_tourists()
+    test_views_cross_workers_through_redis()
+    test_backlog_merged_into_one_diff()
+    print("\nAll tourist feed tests completed!")
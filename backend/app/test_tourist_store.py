@@ -0,0 +1,104 @@
+"""
+Test script for the active tourist state store
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+
+import numpy as np
+
+from app.ai_models import SmartTouristSafetySystem
+from app.services.tourist_store import ActiveTouristStore, MAX_TRACKED_ZONES, parse_location_id
+
+
+def test_update_and_get():
+    print("\n=== Testing tourist state updates ===\n")
+    store = ActiveTouristStore(initial_capacity=2)
+    store.update("T1", latitude=28.61, longitude=77.20, safety_score=7, zones=["red_fort"])
+    store.update("T1", safety_score=4)
+    for i in range(10):
+        store.update(f"T{i + 2}", latitude=19.0 + i, longitude=72.8)
+
+    state = store.get("T1")
+    print(f"T1: {state}")
+    assert state['latitude'] == 28.61 and state['safety_score'] == 4
+    assert state['zones'] == ["red_fort"]
+    assert np.isnan(state['incident_probability']) and state['location_id'] == -1
+    assert len(store) == 11 and store.get("unknown") is None
+
+
+def test_eviction_reuses_rows():
+    print("\n=== Testing idle eviction ===\n")
+    store = ActiveTouristStore(initial_capacity=4)
+    now = time.time()
+    for i in range(4):
+        store.update(f"T{i}", timestamp=now - 600 * i, latitude=float(i), longitude=0.0)
+
+    assert store.evict_idle(900, now=now) == 2
+    ids, records = store.snapshot()
+    assert sorted(ids) == ["T0", "T1"]
+    assert records['latitude'].tolist() == [float(ids[0][1]), float(ids[1][1])]
+
+    store.update("T9", latitude=9.0, longitude=0.0)
+    assert store.memory_usage()['capacity'] == 4   # Freed rows are reused before growing
+
+
+def test_process_update_populates_store():
+    print("\n=== Testing store updates from tourist pings ===\n")
+    system = SmartTouristSafetySystem(ActiveTouristStore())
+    system.geo_fencing.add_risk_zone("zone_a", [[28.0, 77.0], [28.0, 78.0], [29.0, 78.0], [29.0, 77.0]], 8)
+    system.geo_fencing._send_emergency_alert = lambda alert_data: None
+    # Fixed score: whether the trained model loads depends on the working directory
+    system.safety_model.predict_safety_score = lambda tourist_data: 7
+
+    asyncio.run(system.process_tourist_data("T1", {'location_data': {'latitude': 28.5, 'longitude': 77.5}}))
+    state = system.tourist_store.get("T1")
+    print(f"Stored state: {state}")
+    assert state['zones'] == ["zone_a"]
+    assert (state['latitude'], state['longitude']) == (28.5, 77.5)
+    assert state['safety_score'] == 7
+
+
+def test_removed_zones_free_their_bits():
+    print("\n=== Testing zone bit recycling ===\n")
+    store = ActiveTouristStore()
+    for i in range(MAX_TRACKED_ZONES):
+        assert store.zone_bit(f"zone_{i}") == i
+    # Past the cap a zone is left out of zone_mask (and logged once) until a bit frees up
+    store.update("T1", zones=["zone_3", "late_zone"])
+    assert store.zone_bit("late_zone") is None
+    assert store.get("T1")['zones'] == ["zone_3"]
+    assert store.memory_usage()['untracked_zones'] == 1
+
+    assert store.release_zone("zone_3") and not store.release_zone("zone_3")
+    assert store.get("T1")['zones'] == []
+    assert store.zone_bit("late_zone") == 3
+    store.update("T1", zones=["late_zone"])
+    assert store.get("T1")['zones'] == ["late_zone"]
+    usage = store.memory_usage()
+    print(f"Usage: {usage}")
+    assert usage['tracked_zones'] == MAX_TRACKED_ZONES and usage['untracked_zones'] == 0
+
+
+def test_location_id_validation():
+    print("\n=== Testing location_id validation ===\n")
+    assert parse_location_id("7") == 7 and parse_location_id(7.0) == 7
+    for bad in ("fort", 2.5, -1, 2 ** 31, None, True, float('nan')):
+        try:
+            parse_location_id(bad)
+            raise AssertionError(f"Expected ValueError for {bad!r}")
+        except ValueError as e:
+            print(f"{bad!r}: {e}")
+
+
+if __name__ == "__main__":
+    test_update_and_get()
+    test_eviction_reuses_rows()
+    test_process_update_populates_store()
+    test_removed_zones_free_their_bits()
+    test_location_id_validation()
+    print("\nAll tourist store tests completed!")
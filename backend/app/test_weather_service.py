@@ -0,0 +1,194 @@
+"""
+Test script for WeatherService tile caching and batch fetch
+The Visual Crossing endpoint is replaced by an in-memory fake so no network access is needed
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.ai_models import TouristFlowPredictor
+from app.services.cache import TwoTierCache
+from app.services.weather_service import WeatherService, calculate_weather_risk_factors_vectorized, CONDITION_RISK
+
+FORECAST_START = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class FakeVisualCrossingSession:
+    """Returns a fixed timeline payload and records the requested locations"""
+    def __init__(self):
+        self.locations = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        location = url.split('/timeline/')[1].split('?')[0]
+        with self._lock:
+            self.locations.append(location)
+        return FakeResponse({
+            'currentConditions': {'temp': 31, 'humidity': 70, 'windspeed': 12, 'visibility': 8,
+                                  'uvindex': 6, 'conditions': 'Partly Cloudy', 'pressure': 1010},
+            'days': [{'tempmax': 34, 'tempmin': 26, 'precipprob': 10, 'precip': 0, 'conditions': 'Clear',
+                      'hours': [make_hour(FORECAST_START + timedelta(hours=h)) for h in range(48)]}]
+        })
+
+
+def make_hour(dt):
+    """Clear days, stormy low-visibility hours before 06:00"""
+    night = dt.hour < 6
+    return {
+        'datetimeEpoch': int(dt.timestamp()),
+        'temp': 24 if night else 30,
+        'humidity': 95 if night else 50,
+        'windspeed': 35 if night else 5,
+        'visibility': 0.5 if night else 10,
+        'uvindex': 0 if night else 5,
+        'conditions': 'Thunderstorm' if night else 'Clear',
+        'pressure': 1005,
+    }
+
+
+def make_service():
+    service = WeatherService('test-key', cache=TwoTierCache('weather', 1800, redis_client=None))
+    service.session = FakeVisualCrossingSession()
+    return service
+
+
+def test_nearby_points_share_a_tile():
+    print("\n=== Testing tile-level weather cache ===\n")
+    service = make_service()
+
+    first = service.get_weather_data(28.6139, 77.2090)
+    second = service.get_weather_data(28.6201, 77.2155)   # ~1 km away, same 0.1 degree tile
+
+    print(f"Upstream requests: {service.session.locations}")
+    assert len(service.session.locations) == 1
+    assert first == second
+    assert first['data_source'] == 'VisualCrossing'
+
+
+def test_batch_fetch_dedupes_tiles():
+    print("\n=== Testing batch weather fetch ===\n")
+    service = make_service()
+    service.get_weather_data(28.6139, 77.2090)   # Delhi tile already cached
+
+    points = [
+        (28.6139, 77.2090), (28.6150, 77.2100),  # Delhi
+        (19.0760, 72.8777), (19.0800, 72.8800),  # Mumbai
+        (12.9716, 77.5946),                      # Bengaluru
+    ]
+    results = service.get_weather_data_many(points)
+
+    print(f"Upstream requests: {service.session.locations}")
+    assert len(results) == len(points)
+    assert len(service.session.locations) == 3
+    assert all(result['data_source'] == 'VisualCrossing' for result in results)
+
+
+def test_hourly_risk_from_cached_timeline():
+    print("\n=== Testing time-indexed weather risk ===\n")
+    service = make_service()
+
+    for h in range(48):
+        at = FORECAST_START + timedelta(hours=h, minutes=30)
+        forecast = service.get_weather_risk_at(28.6139, 77.2090, at)
+        assert forecast['in_forecast_window']
+        expected_storm = at.hour < 6
+        assert (forecast['conditions']['conditions'] == 'Thunderstorm') == expected_storm
+
+    outside = service.get_weather_risk_at(28.6139, 77.2090, FORECAST_START + timedelta(days=10))
+    print(f"Upstream requests for 49 lookups: {len(service.session.locations)}")
+    assert len(service.session.locations) == 1
+    assert not outside['in_forecast_window']
+
+
+def test_flow_predictor_weather_score():
+    print("\n=== Testing TouristFlowPredictor weather score ===\n")
+    service = make_service()
+    predictor = TouristFlowPredictor(service)
+    predictor.register_location(1, 28.6139, 77.2090)
+
+    day = FORECAST_START.replace(hour=12) + timedelta(days=1)
+    night = FORECAST_START.replace(hour=3) + timedelta(days=1)
+    day_score = predictor._get_weather_score(day.isoformat(), 1)
+    night_score = predictor._get_weather_score(night.isoformat(), 1)
+
+    print(f"Day score: {day_score}, night score: {night_score}")
+    assert day_score > night_score
+    assert predictor._get_weather_score(day.isoformat(), 99) == 7
+
+
+def test_known_locations_and_timeline_lifetime():
+    print("\n=== Testing shipped location coordinates and forecast cache lifetime ===\n")
+    predictor = TouristFlowPredictor(make_service())
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'locations.json')
+    assert predictor.load_locations(path) == len(TouristFlowPredictor.DEFAULT_LOCATION_IDS)
+    assert sorted(predictor.location_coordinates) == TouristFlowPredictor.DEFAULT_LOCATION_IDS
+    assert predictor.load_locations('/nonexistent/locations.json') == 0
+
+    # Without Redis the in-process tier is the only copy: a 3 h forecast is kept 3 h, not 30 minutes
+    cache = TwoTierCache('weather_test', 1800, redis_client=None)
+    cache.set('timeline', [1, 2, 3], ttl=3 * 3600)
+    expires_at = cache._l1['timeline'][0]
+    assert expires_at - time.monotonic() > 3 * 3600 - 60
+
+
+def test_vectorized_risk_matches_scalar():
+    print("\n=== Testing vectorized weather risk ===\n")
+    service = make_service()
+    rng = np.random.default_rng(42)
+    n = 20000
+    temp = rng.uniform(-10, 50, n).round()
+    humidity = rng.uniform(0, 100, n).round()
+    wind = rng.uniform(0, 50, n).round()
+    visibility = rng.uniform(0, 12, n).round(1)
+    uv = rng.integers(0, 13, n)
+    conditions = rng.choice(list(CONDITION_RISK) + ['Sandstorm'], n)
+
+    vectorized = calculate_weather_risk_factors_vectorized(temp, humidity, wind, visibility, uv, conditions)
+    for i in range(n):
+        scalar = service._calculate_weather_risk_factors(
+            temp[i], humidity[i], wind[i], visibility[i], uv[i], conditions[i], 1013)
+        for key, value in scalar.items():
+            assert vectorized[key][i] == value, (key, i, value, vectorized[key][i])
+    print(f"{n} random hours match the scalar computation")
+
+
+def test_risk_timeline():
+    print("\n=== Testing forecast risk timeline ===\n")
+    service = make_service()
+    timeline = service.get_weather_risk_timeline(28.6139, 77.2090)
+
+    assert len(timeline['epoch']) == 48
+    at = FORECAST_START + timedelta(hours=30)
+    single = service.get_weather_risk_at(28.6139, 77.2090, at)
+    i = int(np.searchsorted(timeline['epoch'], at.timestamp()))
+    assert timeline['overall_weather_risk'][i] == single['risk_factors']['overall_weather_risk']
+    print(f"Overall risk range: {timeline['overall_weather_risk'].min()} - {timeline['overall_weather_risk'].max()}")
+
+
+if __name__ == "__main__":
+    test_nearby_points_share_a_tile()
+    test_batch_fetch_dedupes_tiles()
+    test_hourly_risk_from_cached_timeline()
+    test_flow_predictor_weather_score()
+    test_known_locations_and_timeline_lifetime()
+    test_vectorized_risk_matches_scalar()
+    test_risk_timeline()
+    print("\nAll weather service tests completed!")
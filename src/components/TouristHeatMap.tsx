@@ -1,5 +1,6 @@
 import { Loader } from '@googlemaps/js-api-loader';
 import React, { useCallback, useEffect, useRef, useState } from 'react';
+import { api } from '@/lib/api';
 
 // Type definitions
 interface Position {
@@ -355,17 +356,32 @@ const TouristHeatMap: React.FC<TouristHeatMapProps> = ({
     });
   }, [cityConfig.touristLocations, onTouristLocationClick]);
 
-  const createHeatmap = useCallback((map: google.maps.Map) => {
+  const createHeatmap = useCallback(async (map: google.maps.Map) => {
     try {
-      // Clear previous heatmap
-      if (heatLayerRef.current) {
-        heatLayerRef.current.setMap(null);
-        heatLayerRef.current = null;
-      }
-      const points = cityConfig.touristLocations.map((l) => ({
+      let points = cityConfig.touristLocations.map((l) => ({
         location: new google.maps.LatLng(l.position.lat, l.position.lng),
         weight: Math.max(1, l.touristCount)
       }));
+      // Live density from the backend when it has tourists in view; the city sample data otherwise
+      const bounds = map.getBounds();
+      if (bounds) {
+        try {
+          const density = await api.getDensityHeatmap({
+            south: bounds.getSouthWest().lat(),
+            west: bounds.getSouthWest().lng(),
+            north: bounds.getNorthEast().lat(),
+            east: bounds.getNorthEast().lng()
+          }, map.getZoom() ?? DEFAULT_ZOOM);
+          if (density.cells.length > 0) {
+            points = density.cells.map(([lat, lng, count]) => ({
+              location: new google.maps.LatLng(lat, lng),
+              weight: count
+            }));
+          }
+        } catch (e) {
+          console.warn('Live density unavailable, showing sample data:', e);
+        }
+      }
       // @ts-expect-error visualization library is loaded at runtime
       const layer = new google.maps.visualization.HeatmapLayer({
         data: points as any,
@@ -373,6 +389,11 @@ const TouristHeatMap: React.FC<TouristHeatMapProps> = ({
         radius: 30,
         opacity: 0.6
       });
+      // Clear previous heatmap (only now, so overlapping reloads leave a single layer)
+      if (heatLayerRef.current) {
+        heatLayerRef.current.setMap(null);
+        heatLayerRef.current = null;
+      }
       layer.setMap(map);
       heatLayerRef.current = layer;
     } catch (e) {
@@ -428,6 +449,8 @@ const TouristHeatMap: React.FC<TouristHeatMapProps> = ({
       createSafetyZones(mapInstance);
       createHeatmap(mapInstance);
       createTouristMarkers(mapInstance);
+      // Reload live density for the new bounds after every pan or zoom
+      mapInstance.addListener('idle', () => createHeatmap(mapInstance));
 
       setSafetyZones(cityConfig.safetyZones);
       setTouristLocations(cityConfig.touristLocations);
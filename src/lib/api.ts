@@ -118,11 +118,26 @@ export interface DashboardMetrics {
   active_tourists: number;
   recent_alerts: number;
   high_risk_tourists: number;
-  avg_response_time_minutes: number;
+  avg_response_time_minutes: number | null;
+  alerts_per_minute: number;
+  pings_per_minute: number;
+  efirs_last_hour: number;
+  unique_tourists_today: number;
+  unique_tourists_by_region: Record<string, number>;
   system_status: string;
   last_updated: string;
 }
 
+export interface DensityHeatmap {
+  status: string;
+  zoom: number;
+  cell_degrees: number;
+  total: number;
+  max: number;
+  cells: Array<[number, number, number]>; // [lat, lng, tourists]
+  as_of_seconds_ago: number;
+}
+
 export interface EFIRResponse { status: string; efir_number?: string }
 
 export interface TripData {
@@ -172,6 +187,12 @@ export const api = {
   // Metrics for dashboards
   getDashboardMetrics: () => http<DashboardMetrics>(`/api/dashboard/metrics`),
 
+  // Live tourist density per grid cell inside the visible map bounds
+  getDensityHeatmap: (bounds: { south: number; west: number; north: number; east: number }, zoom: number) =>
+    http<DensityHeatmap>(
+      `/api/heatmap/density?south=${bounds.south}&west=${bounds.west}&north=${bounds.north}&east=${bounds.east}&zoom=${Math.round(zoom)}`
+    ),
+
   // Create e-FIR from complaint
   createEFIR: (body: Record<string, unknown>) =>
     http<EFIRResponse>(`/api/efir/create`, { method: "POST", body: JSON.stringify(body) }),
@@ -326,4 +347,36 @@ export function connectDashboardWS(onMessage: (msg: any) => void): WebSocket {
   return ws;
 }
 
+// Live safety feed of one tourist: a "snapshot" message, then "update" messages carrying only changed fields.
+// Reconnects with backoff after a network drop; every new connection starts with a fresh snapshot
+export function connectTouristWS(touristId: string, onMessage: (msg: any) => void): { close: () => void } {
+  const wsUrl = (API_BASE_URL.startsWith("https") ? "wss" : "ws") + API_BASE_URL.slice(API_BASE_URL.indexOf(":"));
+  let ws: WebSocket | null = null;
+  let retryTimer: ReturnType<typeof setTimeout> | null = null;
+  let delay = 1000;
+  let closed = false;
+
+  const connect = () => {
+    ws = new WebSocket(`${wsUrl}/ws/tourist/${encodeURIComponent(touristId)}`);
+    ws.onopen = () => { delay = 1000; };
+    ws.onmessage = (e) => {
+      try { onMessage(JSON.parse(e.data)); } catch { /* ignore */ }
+    };
+    ws.onclose = () => {
+      if (closed) return;
+      retryTimer = setTimeout(connect, delay * (0.8 + Math.random() * 0.4));
+      delay = Math.min(delay * 2, 30000);
+    };
+  };
+  connect();
+
+  return {
+    close: () => {
+      closed = true;
+      if (retryTimer) clearTimeout(retryTimer);
+      try { ws?.close(); } catch { /* ignore */ }
+    },
+  };
+}
+
 
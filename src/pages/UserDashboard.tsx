@@ -8,7 +8,7 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, Di
 import { Progress } from "@/components/ui/progress";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { Switch } from "@/components/ui/switch";
-import { api } from "@/lib/api";
+import { api, connectTouristWS } from "@/lib/api";
 import { SITE_NAME } from "@/lib/brand";
 import { motion } from "framer-motion";
 import { AlertTriangle, Cloud, Compass, Droplets, Loader2, LogOut, MapPin, Navigation, Settings, Shield, Star, Thermometer, User, Users, Watch, Wind, Zap } from "lucide-react";
@@ -244,15 +244,24 @@ const UserDashboard = () => {
     // Initial fetch
     fetchSafetyScore();
     
-    // Set up polling every 5 minutes if we have a valid API URL
-    let interval: NodeJS.Timeout | null = null;
+    // Score changes are pushed by the server; a slow re-post keeps the score recomputed for a
+    // tourist who is not moving (nothing else sends updates then)
+    let feed: { close: () => void } | null = null;
+    let interval: ReturnType<typeof setInterval> | null = null;
     if (import.meta.env.VITE_API_URL && import.meta.env.VITE_API_URL !== 'http://localhost:8000') {
-      interval = setInterval(fetchSafetyScore, 300000); // Poll every 5 minutes
+      feed = connectTouristWS(blockchainId, (msg) => {
+        const score = msg?.type === 'snapshot' ? msg.state?.safety_score : msg?.changes?.safety_score;
+        if (!cancelled && score != null) {
+          setSafetyScore(score);
+        }
+      });
+      interval = setInterval(fetchSafetyScore, 900000); // Every 15 minutes
     }
 
     return () => {
       cancelled = true;
       if (interval) clearInterval(interval);
+      feed?.close();
     };
   }, [currentLocation]);
 